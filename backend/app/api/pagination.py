@@ -0,0 +1,112 @@
+import base64
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Type
+
+from fastapi import HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import DateTime, and_, or_, select
+from sqlalchemy.orm import Session
+
+# Clients written before pagination send no limit and read only the first
+# page, so the default is set high enough to hold a whole real project's
+# characters / scenes / shots / render jobs. Callers that page pass a
+# smaller limit and follow the cursor.
+PAGE_DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", "1000"))
+PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "5000"))
+
+# Response header carrying the cursor of the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass
+class PageParams:
+    limit: int
+    cursor: Optional[str]
+    fields: Optional[List[str]]
+
+
+def page_params(
+    limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header"),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields to return, e.g. id,status"),
+) -> PageParams:
+    names = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    return PageParams(limit=limit, cursor=cursor, fields=names)
+
+
+def encode_cursor(sort_value, row_id: int) -> str:
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_key) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        if isinstance(sort_key.type, DateTime):
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(
+    db: Session,
+    page: PageParams,
+    response: Response,
+    schema: Type[BaseModel],
+    model,
+    where: Sequence,
+    sort_key,
+    descending: bool = False,
+    computed: Optional[Dict[str, object]] = None,
+):
+    """
+    One keyset page of `model` rows as `schema` items, ordered by
+    (sort_key, id).
+
+    Only the columns the response needs are selected (never heavy ones like
+    Project.script); `computed` supplies SQL expressions for schema fields
+    that aren't plain columns. The next page's cursor goes in the
+    X-Next-Cursor header. With `page.fields` the items are trimmed to those
+    fields and returned as a JSONResponse, bypassing response_model.
+    """
+    computed = computed or {}
+    names = list(schema.model_fields)
+    if page.fields:
+        unknown = [f for f in page.fields if f not in names]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        names = page.fields
+
+    columns = [computed[n].label(n) if n in computed else getattr(model, n).label(n) for n in names]
+    stmt = select(*columns, sort_key.label("_cursor_sort"), model.id.label("_cursor_id")).where(*where)
+
+    if page.cursor:
+        sort_value, row_id = decode_cursor(page.cursor, sort_key)
+        if descending:
+            stmt = stmt.where(or_(sort_key < sort_value, and_(sort_key == sort_value, model.id < row_id)))
+        else:
+            stmt = stmt.where(or_(sort_key > sort_value, and_(sort_key == sort_value, model.id > row_id)))
+
+    order = (sort_key.desc(), model.id.desc()) if descending else (sort_key.asc(), model.id.asc())
+    rows = db.execute(stmt.order_by(*order).limit(page.limit + 1)).all()
+
+    headers = {}
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        last = rows[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(last._cursor_sort, last._cursor_id)
+
+    items = [{n: row._mapping[n] for n in names} for row in rows]
+    if page.fields:
+        return JSONResponse(jsonable_encoder(items), headers=headers)
+    response.headers.update(headers)
+    return items
@@ -1,11 +1,14 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Response, status, UploadFile, File
+from sqlalchemy import Boolean, type_coerce
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.api.dependencies import get_db
+from app.api.pagination import PageParams, page_params, paginate
 from app import models, schemas
 from app.core.files import save_character_image
-from app.services.embedding import extract_character_dna, to_json_str
+from app.core.queue import dna_queue
 
 router = APIRouter(prefix="/characters", tags=["characters"])
 
@@ -22,6 +25,21 @@ def create_character(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
+    duplicate = HTTPException(
+        status_code=409,
+        detail=f"Character '{character_in.name}' already exists in this project",
+    )
+    exists = (
+        db.query(models.Character.id)
+        .filter(
+            models.Character.project_id == character_in.project_id,
+            models.Character.name == character_in.name,
+        )
+        .first()
+    )
+    if exists:
+        raise duplicate
+
     character = models.Character(
         project_id=character_in.project_id,
         name=character_in.name,
@@ -29,7 +47,12 @@ def create_character(
         description=character_in.description,
     )
     db.add(character)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent create (unique project_id + name)
+        db.rollback()
+        raise duplicate
     db.refresh(character)
 
     return _to_schema_character(character)
@@ -37,18 +60,41 @@ def create_character(
 
 @router.get("/project/{project_id}", response_model=List[schemas.Character])
 def list_characters_for_project(
-    project_id: int, db: Session = Depends(get_db)
+    project_id: int,
+    response: Response,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db),
 ):
-    characters = (
+    # has_embeddings is computed in SQL so the embedding blobs are never loaded
+    has_embeddings = type_coerce(
+        models.Character.embedding.isnot(None) | models.Character.face_embedding.isnot(None),
+        Boolean,
+    )
+    return paginate(
+        db, page, response, schemas.Character, models.Character,
+        where=[models.Character.project_id == project_id],
+        sort_key=models.Character.created_at,
+        computed={"has_embeddings": has_embeddings},
+    )
+
+
+@router.get("/{character_id}", response_model=schemas.Character)
+def get_character(character_id: int, db: Session = Depends(get_db)):
+    character = (
         db.query(models.Character)
-        .filter(models.Character.project_id == project_id)
-        .order_by(models.Character.created_at)
-        .all()
+        .filter(models.Character.id == character_id)
+        .first()
     )
-    return [_to_schema_character(c) for c in characters]
+    if not character:
+        raise HTTPException(status_code=404, detail="Character not found")
+    return _to_schema_character(character)
 
 
-@router.post("/{character_id}/image", response_model=schemas.Character)
+@router.post(
+    "/{character_id}/image",
+    response_model=schemas.Character,
+    status_code=status.HTTP_202_ACCEPTED,
+)
 def upload_character_image(
     character_id: int,
     file: UploadFile = File(...),
@@ -65,23 +111,76 @@ def upload_character_image(
     # Save file
     path = save_character_image(character_id, file)
     character.ref_image_path = path
-
-    # Extract embeddings
-    dna = extract_character_dna(path)
-    character.face_embedding = to_json_str(dna["face_embedding"])
-    character.style_embedding = to_json_str(dna["style_embedding"])
-    character.dominant_colors = to_json_str(dna["dominant_colors"])
-
+    character.dna_status = models.DnaStatus.pending
     db.add(character)
     db.commit()
+
+    # Extract embeddings in the worker; poll GET /characters/{id} for dna_status.
+    # Enqueued by path so the API process never imports the embedding stack.
+    try:
+        job = dna_queue.enqueue("app.workers.tasks.extract_dna_task", character.id)
+    except Exception as e:
+        # No worker will ever see it; don't leave the character pending forever
+        character.dna_status = models.DnaStatus.failed
+        db.commit()
+        raise HTTPException(status_code=503, detail=f"Could not queue DNA extraction: {e}")
+    character.dna_job_id = job.get_id()
+    db.commit()
     db.refresh(character)
 
     return _to_schema_character(character)
 
 
+@router.get("/{character_id}/similar", response_model=List[schemas.CharacterMatch])
+def find_similar_characters(
+    character_id: int, k: int = 5, db: Session = Depends(get_db)
+):
+    """Existing characters (any project) whose anchor looks like this one."""
+    character = (
+        db.query(models.Character)
+        .filter(models.Character.id == character_id)
+        .first()
+    )
+    if not character:
+        raise HTTPException(status_code=404, detail="Character not found")
+    if character.embedding is None:
+        raise HTTPException(status_code=409, detail="Character DNA not extracted yet")
+
+    from app.services.vector_index import character_index  # numpy; load on first use
+
+    try:
+        matches = character_index.search(
+            character.embedding_vector, k=k, exclude_ids=[character_id], model=character.embedding_model
+        )
+    except ValueError as e:
+        # Embedded by another CLIP backend than the index; re-extract or rebuild
+        raise HTTPException(status_code=409, detail=str(e))
+    return _to_schema_matches(db, matches)
+
+
+def _to_schema_matches(db: Session, matches) -> List[schemas.CharacterMatch]:
+    scores = dict(matches)
+    chars = (
+        db.query(models.Character)
+        .filter(models.Character.id.in_(list(scores)))
+        .all()
+    )
+    results = [
+        schemas.CharacterMatch(
+            id=c.id,
+            project_id=c.project_id,
+            name=c.name,
+            ref_image_path=c.ref_image_path,
+            score=scores[c.id],
+        )
+        for c in chars
+    ]
+    return sorted(results, key=lambda m: m.score, reverse=True)
+
+
 def _to_schema_character(c: models.Character) -> schemas.Character:
     # derive flag
-    has_embeddings = bool(c.face_embedding and c.style_embedding)
+    has_embeddings = bool(c.embedding or c.face_embedding)
     return schemas.Character(
         id=c.id,
         project_id=c.project_id,
@@ -91,4 +190,6 @@ def _to_schema_character(c: models.Character) -> schemas.Character:
         created_at=c.created_at,
         ref_image_path=c.ref_image_path,
         has_embeddings=has_embeddings,
+        dna_status=c.dna_status,
+        dna_job_id=c.dna_job_id,
     )
@@ -1,8 +1,9 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 
 from app.api.dependencies import get_db
+from app.api.pagination import PageParams, page_params, paginate
 from app import models, schemas
 
 router = APIRouter(prefix="/projects", tags=["projects"])
@@ -23,9 +24,17 @@ def create_project(
     return project
 
 
-@router.get("/", response_model=List[schemas.Project])
-def list_projects(db: Session = Depends(get_db)):
-    return db.query(models.Project).order_by(models.Project.created_at.desc()).all()
+@router.get("/", response_model=List[schemas.ProjectSummary])
+def list_projects(
+    response: Response,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db),
+):
+    """Newest first, as before pagination (id breaks ties); GET /projects/{id} for the script."""
+    return paginate(
+        db, page, response, schemas.ProjectSummary, models.Project,
+        where=[], sort_key=models.Project.created_at, descending=True,
+    )
 
 
 @router.get("/{project_id}", response_model=schemas.Project)
@@ -1,53 +1,111 @@
+import json
+
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from rq.job import Job
-
 from app.api.dependencies import get_db
 from app import models, schemas
-from app.core.queue import render_queue
-from app.workers.tasks import render_shot_task   # we will define next
+from app.core.config import settings
+from app.core.queue import enqueue_chains, render_queue
+from app.services.render_planner import plan_render_chains
 
 
 router = APIRouter(prefix="/render", tags=["render"])
 
 
 @router.post("/project/{project_id}")
-def enqueue_project_render(project_id: int, db: Session = Depends(get_db)):
+def enqueue_project_render(project_id: int, use_cache: bool = True, db: Session = Depends(get_db)):
+    """
+    Render every shot as a DAG: shots in one scene run in order (each needs
+    the previous shot's last frame), separate scenes render concurrently.
+
+    use_cache=false re-renders every shot with Veo instead of reusing
+    identical earlier renders from the render cache.
+    """
 
     project = db.query(models.Project).filter(models.Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    shots = (
-        db.query(models.Shot)
-        .filter(models.Shot.project_id == project_id)
-        .order_by(models.Shot.index.asc())
-        .all()
-    )
+    chains = plan_render_chains(db, project_id)
 
-    if not shots:
+    if not chains:
         raise HTTPException(status_code=400, detail="No shots to render for this project")
 
-    job_ids = []
+    # All RenderJob rows in one transaction: a multi-row INSERT ... RETURNING.
+    # sort_by_parameter_order guarantees the IDs come back in row order, even
+    # when the insert is split into batches, so they map straight onto chains.
+    ids = iter(db.execute(
+        insert(models.RenderJob).returning(models.RenderJob.id, sort_by_parameter_order=True),
+        [
+            {
+                "project_id": project_id,
+                "shot_id": shot.id,
+                "status": models.RenderJobStatus.pending,
+                # placeholder until the job runs; read by render_uses_cache
+                "payload": "{}" if use_cache else json.dumps({"use_cache": False}),
+            }
+            for chain in chains
+            for shot in chain
+        ],
+    ).scalars().all())
+    id_chains = [[next(ids) for _ in chain] for chain in chains]
+    scene_chains = [[shot.scene_id for shot in chain] for chain in chains]
+    db.commit()
 
-    for shot in shots:
-        # Store initial job record
-        rj = models.RenderJob(
-            project_id=project_id,
-            shot_id=shot.id,
-            status=models.RenderJobStatus.pending,
-            payload="{}",  # placeholder
-        )
-        db.add(rj)
-        db.commit()
-        db.refresh(rj)
+    rq_ids = [[None] * len(chain) for chain in id_chains]
 
-        # Enqueue worker job
-        job = render_queue.enqueue(render_shot_task, rj.id)
-        job_ids.append({"render_job_id": rj.id, "rq_job_id": job.get_id()})
+    # The async render executor claims pending rows itself, one per scene
+    # chain at a time
+    if settings.RENDER_EXECUTOR != "async":
+        try:
+            # One Redis round trip; each shot runs after the previous one in
+            # its scene. By dotted path: importing app.workers.tasks here
+            # would pull the video/embedding stack into every API process
+            rq_ids = enqueue_chains(
+                render_queue,
+                "app.workers.tasks.render_shot_task",
+                id_chains,
+            )
+        except Exception as e:
+            # Nothing was queued (MULTI/EXEC), so drop the rows rather than
+            # leave pending jobs no worker will ever pick up
+            db.query(models.RenderJob).filter(
+                models.RenderJob.id.in_([i for chain in id_chains for i in chain])
+            ).delete(synchronize_session=False)
+            db.commit()
+            raise HTTPException(status_code=503, detail=f"Could not queue render jobs: {e}")
+
+    job_ids = [
+        {"render_job_id": rj_id, "rq_job_id": rq_id, "scene_id": scene_id}
+        for rj_ids, rq_chain, scene_ids in zip(id_chains, rq_ids, scene_chains)
+        for rj_id, rq_id, scene_id in zip(rj_ids, rq_chain, scene_ids)
+    ]
 
     return {
         "status": "queued",
         "jobs": job_ids,
-        "total_shots": len(shots),
+        "total_shots": len(job_ids),
+        "chains": len(id_chains),
     }
+
+
+@router.get("/cache/stats")
+def render_cache_stats():
+    """Render result cache size, plus hit rate across workers when Redis is up."""
+    from app.services.video.render_cache import render_cache
+    return render_cache.stats()
+
+
+@router.get("/embedding-cache/stats")
+def render_embedding_cache_stats():
+    """DNA embedding / palette cache size, plus hit rate across workers when Redis is up."""
+    from app.services.embedding import embedding_cache_stats
+    return embedding_cache_stats()
+
+
+@router.get("/http/stats")
+def render_http_stats():
+    """Veo API call counts, errors, retries and latency, per endpoint."""
+    from app.services.video.http_client import http_metrics
+    return http_metrics()
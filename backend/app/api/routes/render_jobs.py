@@ -1,34 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 
 from app.api.dependencies import get_db
+from app.api.pagination import PageParams, page_params, paginate
 from app import models, schemas
 
 router = APIRouter(prefix="/render_jobs", tags=["render_jobs"])
 
 
 # 1. List jobs for a project
-@router.get("/project/{project_id}", response_model=list[schemas.RenderJob])
-def list_jobs_for_project(project_id: int, db: Session = Depends(get_db)):
-    jobs = (
-        db.query(models.RenderJob)
-        .filter(models.RenderJob.project_id == project_id)
-        .order_by(models.RenderJob.created_at)
-        .all()
+@router.get("/project/{project_id}", response_model=list[schemas.RenderJobSummary])
+def list_jobs_for_project(
+    project_id: int,
+    response: Response,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db),
+):
+    return paginate(
+        db, page, response, schemas.RenderJobSummary, models.RenderJob,
+        where=[models.RenderJob.project_id == project_id],
+        sort_key=models.RenderJob.created_at,
     )
-    return jobs
 
 
 # 2. List jobs for a single shot
-@router.get("/shot/{shot_id}", response_model=list[schemas.RenderJob])
-def list_jobs_for_shot(shot_id: int, db: Session = Depends(get_db)):
-    jobs = (
-        db.query(models.RenderJob)
-        .filter(models.RenderJob.shot_id == shot_id)
-        .order_by(models.RenderJob.created_at)
-        .all()
+@router.get("/shot/{shot_id}", response_model=list[schemas.RenderJobSummary])
+def list_jobs_for_shot(
+    shot_id: int,
+    response: Response,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db),
+):
+    return paginate(
+        db, page, response, schemas.RenderJobSummary, models.RenderJob,
+        where=[models.RenderJob.shot_id == shot_id],
+        sort_key=models.RenderJob.created_at,
     )
-    return jobs
 
 
 # 3. Get a single render job
@@ -1,11 +1,13 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Response, status, UploadFile, File
+from sqlalchemy import Boolean, type_coerce
 from sqlalchemy.orm import Session
 
 from app.api.dependencies import get_db
+from app.api.pagination import PageParams, page_params, paginate
 from app import models, schemas
 from app.core.files import save_scene_image
-from app.services.embedding import extract_scene_dna, to_json_str
+from app.core.queue import dna_queue
 
 router = APIRouter(prefix="/scenes", tags=["scenes"])
 
@@ -32,17 +34,42 @@ def create_scene(scene_in: schemas.SceneCreate, db: Session = Depends(get_db)):
 
 
 @router.get("/project/{project_id}", response_model=List[schemas.Scene])
-def list_scenes_for_project(project_id: int, db: Session = Depends(get_db)):
-    scenes = (
+def list_scenes_for_project(
+    project_id: int,
+    response: Response,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db),
+):
+    # has_embeddings is computed in SQL so the embedding blobs are never loaded
+    has_embeddings = type_coerce(
+        models.Scene.embedding.isnot(None) | models.Scene.scene_embedding.isnot(None),
+        Boolean,
+    )
+    return paginate(
+        db, page, response, schemas.Scene, models.Scene,
+        where=[models.Scene.project_id == project_id],
+        sort_key=models.Scene.created_at,
+        computed={"has_embeddings": has_embeddings},
+    )
+
+
+@router.get("/{scene_id}", response_model=schemas.Scene)
+def get_scene(scene_id: int, db: Session = Depends(get_db)):
+    scene = (
         db.query(models.Scene)
-        .filter(models.Scene.project_id == project_id)
-        .order_by(models.Scene.created_at)
-        .all()
+        .filter(models.Scene.id == scene_id)
+        .first()
     )
-    return [_to_schema_scene(s) for s in scenes]
+    if not scene:
+        raise HTTPException(status_code=404, detail="Scene not found")
+    return _to_schema_scene(scene)
 
 
-@router.post("/{scene_id}/image", response_model=schemas.Scene)
+@router.post(
+    "/{scene_id}/image",
+    response_model=schemas.Scene,
+    status_code=status.HTTP_202_ACCEPTED,
+)
 def upload_scene_image(
     scene_id: int,
     file: UploadFile = File(...),
@@ -58,20 +85,27 @@ def upload_scene_image(
 
     path = save_scene_image(scene_id, file)
     scene.ref_image_path = path
-
-    dna = extract_scene_dna(path)
-    scene.scene_embedding = to_json_str(dna["scene_embedding"])
-    scene.palette = to_json_str(dna["palette"])
-
+    scene.dna_status = models.DnaStatus.pending
     db.add(scene)
     db.commit()
+
+    # Scene DNA runs in the worker; poll GET /scenes/{id} for dna_status
+    try:
+        job = dna_queue.enqueue("app.workers.tasks.extract_scene_dna_task", scene.id)
+    except Exception as e:
+        # No worker will ever see it; don't leave the scene pending forever
+        scene.dna_status = models.DnaStatus.failed
+        db.commit()
+        raise HTTPException(status_code=503, detail=f"Could not queue DNA extraction: {e}")
+    scene.dna_job_id = job.get_id()
+    db.commit()
     db.refresh(scene)
 
     return _to_schema_scene(scene)
 
 
 def _to_schema_scene(s: models.Scene) -> schemas.Scene:
-    has_embeddings = bool(s.scene_embedding)
+    has_embeddings = bool(s.embedding or s.scene_embedding)
     return schemas.Scene(
         id=s.id,
         project_id=s.project_id,
@@ -80,4 +114,6 @@ def _to_schema_scene(s: models.Scene) -> schemas.Scene:
         created_at=s.created_at,
         ref_image_path=s.ref_image_path,
         has_embeddings=has_embeddings,
+        dna_status=s.dna_status,
+        dna_job_id=s.dna_job_id,
     )
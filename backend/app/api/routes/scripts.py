@@ -8,7 +8,15 @@ from app.services.script_analysis import ScriptAnalysisService
 
 router = APIRouter(prefix="/scripts", tags=["scripts"])
 
-script_analysis_service = ScriptAnalysisService()
+# Built on first request: constructing it imports the LLM provider SDK
+_script_analysis_service = None
+
+
+def get_script_analysis_service() -> ScriptAnalysisService:
+    global _script_analysis_service
+    if _script_analysis_service is None:
+        _script_analysis_service = ScriptAnalysisService()
+    return _script_analysis_service
 
 
 @router.post("/project/{project_id}", response_model=ScriptCreateResponse)
@@ -52,7 +60,7 @@ def submit_script(
     )
 
     # 5. Analyze script → scenes + shots
-    structure = script_analysis_service.analyze_script(
+    structure = get_script_analysis_service().analyze_script(
         script_text=payload.script_text,
         characters=characters,
         language=payload.language,
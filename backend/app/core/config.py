@@ -15,9 +15,26 @@ class Settings(BaseSettings):
         "DATABASE_URL", "sqlite:///./app.db"
     )
 
+    # Connection pool (Postgres / other server databases; ignored for SQLite)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800  # seconds; stay under server/proxy idle timeouts
+    DB_POOL_PRE_PING: bool = True
+
+    # SQLite: ms a writer waits for the lock before "database is locked"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+
     GOOGLE_CLOUD_PROJECT_ID: str
     GOOGLE_CLOUD_LOCATION: str = "us-central1"
 
+    # Worker: max pending DNA jobs folded into one CLIP batch (1 = no batching)
+    DNA_BATCH_SIZE: int = 1
+
+    # Render backend: "rq" = one RQ task per shot, "async" = jobs stay pending
+    # in the DB for app.workers.render_executor to multiplex
+    RENDER_EXECUTOR: str = "rq"
+
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -1,4 +1,50 @@
+from typing import List, Sequence
+from uuid import uuid4
+
 from rq import Queue
+from rq.job import Dependency, JobStatus
+
 from app.core.redis import redis_client
 
 render_queue = Queue("render_queue", connection=redis_client)
+# Character / scene DNA extraction; kept off render_queue so batching
+# workers only scan DNA jobs when claiming a batch
+dna_queue = Queue("dna_queue", connection=redis_client)
+
+
+def enqueue_chains(queue: Queue, func: str, chains: Sequence[Sequence[int]]) -> List[List[str]]:
+    """
+    Enqueue `func(arg)` for every arg in `chains`, each job depending on the
+    previous one in its chain, in a single MULTI/EXEC round trip: either all
+    jobs are queued or none are. Dependencies use allow_failure=True so a
+    failed predecessor doesn't leave its chain deferred forever.
+    Returns the RQ job IDs, chain by chain.
+    """
+    pipe = queue.connection.pipeline()
+    heads = []
+    ids: List[List[str]] = []
+
+    for chain in chains:
+        chain_ids: List[str] = []
+        for arg in chain:
+            job_id = str(uuid4())
+            if not chain_ids:
+                heads.append(Queue.prepare_data(func, args=(arg,), job_id=job_id))
+            else:
+                job = queue.create_job(
+                    func,
+                    args=(arg,),
+                    job_id=job_id,
+                    depends_on=Dependency(jobs=[chain_ids[-1]], allow_failure=True),
+                    status=JobStatus.DEFERRED,
+                )
+                job.save(pipeline=pipe)
+                job.register_dependency(pipeline=pipe)
+            chain_ids.append(job_id)
+        ids.append(chain_ids)
+
+    # Heads go onto the queue in the same transaction as their dependents,
+    # so no worker can finish a head before its dependents are registered
+    queue.enqueue_many(heads, pipeline=pipe)
+    pipe.execute()
+    return ids
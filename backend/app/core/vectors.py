@@ -0,0 +1,25 @@
+import os
+from typing import Optional, Sequence
+
+# Storage precision for packed embeddings: "float32" (default) or "float16"
+EMBEDDING_DTYPE = os.getenv("EMBEDDING_DTYPE", "float32")
+
+SUPPORTED_DTYPES = ("float32", "float16")
+
+
+def to_bytes(values: Sequence[float], dtype: str = EMBEDDING_DTYPE) -> bytes:
+    """Pack a vector as little-endian float32/float16 bytes for LargeBinary columns."""
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"Unsupported embedding dtype: {dtype}")
+    import numpy as np  # models import this module; keep numpy off the API startup path
+
+    return np.asarray(values, dtype=np.dtype(dtype).newbyteorder("<")).tobytes()
+
+
+def from_bytes(blob: Optional[bytes], dtype: Optional[str] = None) -> Optional["np.ndarray"]:
+    """Zero-copy read-only view over packed bytes (no JSON parsing)."""
+    if blob is None:
+        return None
+    import numpy as np
+
+    return np.frombuffer(blob, dtype=np.dtype(dtype or "float32").newbyteorder("<"))
@@ -0,0 +1,161 @@
+"""
+Bring an existing database up to the current schema revision.
+
+create_all() only creates missing tables, so changes to existing tables
+are applied here as numbered revisions. The applied revision is stored in
+the `schema_revision` table; each revision runs once, in order.
+
+Usage (from backend/):
+    python -m app.db.migrate_schema            # apply pending revisions
+    python -m app.db.migrate_schema --status   # print current / latest
+"""
+
+import argparse
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+
+from app.db.base import Base
+from app.db.session import engine
+from app import models  # This imports all models, registering their tables
+
+
+def _add_columns(conn):
+    from app.db.migrate_vectors import _add_missing_columns
+
+    _add_missing_columns(conn)
+
+
+def _dedupe_character_names(conn):
+    """Suffix duplicate (project_id, name) pairs so the unique index can be built."""
+    duplicates = conn.execute(text(
+        "SELECT c.id, c.name FROM characters c"
+        " JOIN (SELECT project_id, name, MIN(id) AS keep_id FROM characters"
+        "       GROUP BY project_id, name HAVING COUNT(*) > 1) d"
+        " ON c.project_id = d.project_id AND c.name = d.name AND c.id <> d.keep_id"
+    )).fetchall()
+    for char_id, name in duplicates:
+        conn.execute(
+            text("UPDATE characters SET name = :name WHERE id = :id"),
+            {"name": f"{name} #{char_id}", "id": char_id},
+        )
+        print(f"[MIGRATE] Renamed duplicate character {char_id} to '{name} #{char_id}'")
+
+
+def _create_model_indexes(conn):
+    """Create every index the models declare that the database lacks."""
+    inspector = inspect(conn)
+    tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(conn)
+                print(f"[MIGRATE] Created index {index.name}")
+
+
+def _tag_embedding_model(conn):
+    """
+    Add embedding_model and fill it for existing vectors. Which backend made
+    them isn't recorded anywhere, so they are tagged with the configured
+    one; re-extract if the deployment switched CLIP_BACKEND before.
+    """
+    from app.services.embedding import clip_cache_namespace
+
+    _add_columns(conn)
+    model = clip_cache_namespace()
+    for table in ("characters", "scenes"):
+        tagged = conn.execute(
+            text(f"UPDATE {table} SET embedding_model = :model WHERE embedding IS NOT NULL AND embedding_model IS NULL"),
+            {"model": model},
+        ).rowcount
+        if tagged:
+            print(f"[MIGRATE] Tagged {tagged} {table} embeddings as {model}")
+
+
+def _session_states(conn):
+    """
+    Sessions used to be found by Project.description == "Session: <id>";
+    give every such project without a ContinuityState one, so it keeps its
+    cast. Then move states the REST API created as "session_<project_id>"
+    to sessions.rest_session_id(), which no MCP session can claim.
+    """
+    from app.services.sessions import rest_session_id
+
+    legacy = conn.execute(text(
+        "SELECT MIN(p.id), SUBSTR(p.description, 10) FROM projects p"
+        " WHERE p.description LIKE 'Session: %'"
+        " AND NOT EXISTS (SELECT 1 FROM continuity_states c WHERE c.project_id = p.id)"
+        " AND NOT EXISTS (SELECT 1 FROM continuity_states c WHERE c.session_id = SUBSTR(p.description, 10))"
+        " GROUP BY SUBSTR(p.description, 10)"
+    )).fetchall()
+    for project_id, session_id in legacy:
+        conn.execute(
+            text("INSERT INTO continuity_states (project_id, session_id, narrative_context) VALUES (:p, :s, '{}')"),
+            {"p": project_id, "s": session_id},
+        )
+        print(f"[MIGRATE] Session '{session_id}' -> project {project_id}")
+
+    rest = conn.execute(text(
+        "SELECT c.project_id FROM continuity_states c JOIN projects p ON p.id = c.project_id"
+        " WHERE c.session_id = 'session_' || c.project_id"
+        " AND (p.description IS NULL OR p.description <> 'Session: ' || c.session_id)"
+    )).scalars().all()
+    for project_id in rest:
+        conn.execute(
+            text("UPDATE continuity_states SET session_id = :s WHERE project_id = :p"),
+            {"s": rest_session_id(project_id), "p": project_id},
+        )
+    if rest:
+        print(f"[MIGRATE] Moved {len(rest)} REST project states to '{rest_session_id('<id>')}'")
+
+
+# (revision, description, apply(conn)); append only, never renumber
+REVISIONS: List[Tuple[int, str, Callable]] = [
+    (1, "columns added since the first release (embeddings, DNA status, fingerprint)", _add_columns),
+    (2, "deduplicate character names per project", _dedupe_character_names),
+    (3, "composite indexes for shots / render jobs, unique character name per project", _create_model_indexes),
+    (4, "record which CLIP model / backend produced each embedding", _tag_embedding_model),
+    (5, "continuity states for legacy MCP sessions; REST states out of the session namespace", _session_states),
+]
+
+LATEST_REVISION = REVISIONS[-1][0]
+
+
+def current_revision(conn) -> int:
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_revision (revision INTEGER NOT NULL)"))
+    row = conn.execute(text("SELECT MAX(revision) FROM schema_revision")).fetchone()
+    return row[0] or 0
+
+
+def migrate() -> int:
+    """Apply pending revisions. All of them are idempotent, so a fresh database just records them."""
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        revision = current_revision(conn)
+
+    for number, description, apply in REVISIONS:
+        if number <= revision:
+            continue
+        print(f"[MIGRATE] Revision {number}: {description}")
+        with engine.begin() as conn:
+            apply(conn)
+            conn.execute(text("INSERT INTO schema_revision (revision) VALUES (:r)"), {"r": number})
+        revision = number
+
+    print(f"[MIGRATE] Schema at revision {revision}")
+    return revision
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--status", action="store_true", help="Print current and latest revision only")
+    args = parser.parse_args()
+    if args.status:
+        with engine.begin() as conn:
+            print(f"current={current_revision(conn)} latest={LATEST_REVISION}")
+    else:
+        migrate()
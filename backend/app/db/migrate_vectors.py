@@ -0,0 +1,102 @@
+"""
+Migrate JSON-text embeddings to packed binary vectors.
+
+Adds columns the models define but an existing database predates (e.g.
+`embedding` / `embedding_dtype`), converts every legacy `face_embedding`
+(characters) and `scene_embedding` (scenes) row, then clears the legacy
+text columns.
+
+Usage (from backend/):
+    python -m app.db.migrate_vectors [--dtype float16] [--keep-json]
+"""
+
+import argparse
+import json
+
+from sqlalchemy import inspect, text
+
+from app.core import vectors
+from app.db.session import SessionLocal, engine
+from app.services.embedding import CLIP_MODEL_ID
+from app import models
+
+BATCH_SIZE = 500
+
+# table -> (model, legacy JSON columns; the first one holds the vector)
+LEGACY_COLUMNS = {
+    "characters": (models.Character, ["face_embedding", "style_embedding"]),
+    "scenes": (models.Scene, ["scene_embedding"]),
+}
+
+
+def _add_missing_columns(conn=None):
+    """
+    create_all() never alters existing tables, so add any nullable column the
+    models define but an older database lacks (embedding, palette weights, ...).
+    """
+    if conn is None:
+        with engine.begin() as conn:
+            return _add_missing_columns(conn)
+
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in models.Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable:
+                print(f"[MIGRATE] Skipping NOT NULL column {table.name}.{column.name}; add it manually")
+                continue
+            col_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+            print(f"[MIGRATE] Added {table.name}.{column.name}")
+
+
+def migrate(dtype: str = vectors.EMBEDDING_DTYPE, keep_json: bool = False) -> dict:
+    _add_missing_columns()
+    counts = {}
+
+    db = SessionLocal()
+    try:
+        for table, (model, legacy) in LEGACY_COLUMNS.items():
+            source = getattr(model, legacy[0])
+            migrated = 0
+            last_id = 0
+            while True:
+                rows = (
+                    db.query(model)
+                    .filter(source.isnot(None), model.id > last_id)
+                    .order_by(model.id)
+                    .limit(BATCH_SIZE)
+                    .all()
+                )
+                if not rows:
+                    break
+                for row in rows:
+                    if row.embedding is None:
+                        # JSON vectors predate the ONNX backend: all fp32 torch
+                        row.set_embedding(json.loads(getattr(row, legacy[0])), dtype, model=CLIP_MODEL_ID)
+                        migrated += 1
+                    if not keep_json:
+                        for column in legacy:
+                            setattr(row, column, None)
+                last_id = rows[-1].id
+                db.commit()
+            counts[table] = migrated
+            print(f"[MIGRATE] {table}: {migrated} rows converted to {dtype}")
+    finally:
+        db.close()
+
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dtype", default=vectors.EMBEDDING_DTYPE, choices=vectors.SUPPORTED_DTYPES)
+    parser.add_argument("--keep-json", action="store_true", help="Do not clear legacy JSON columns")
+    args = parser.parse_args()
+    migrate(dtype=args.dtype, keep_json=args.keep_json)
@@ -0,0 +1,80 @@
+"""
+Query-plan regression check: the hot lookups must be served by their indexes.
+
+Runs EXPLAIN for each query below against the configured database (SQLite
+or Postgres) and exits non-zero if the planner doesn't use the expected
+index, e.g. after a model change drops one or a migration wasn't applied.
+
+Usage (from backend/):
+    python -m app.db.query_plans
+    DATABASE_URL=postgresql://... python -m app.db.query_plans
+"""
+
+import sys
+from typing import List, Tuple
+
+from sqlalchemy import select, text
+
+from app.db.base import Base
+from app.db.session import engine
+from app import models
+
+# (name, statement, index the plan must mention)
+HOT_QUERIES: List[Tuple[str, object, str]] = [
+    (
+        "shots of a project in order",
+        select(models.Shot).where(models.Shot.project_id == 1).order_by(models.Shot.index),
+        "ix_shots_project_id_index",
+    ),
+    (
+        "render jobs of a project by created_at",
+        select(models.RenderJob).where(models.RenderJob.project_id == 1).order_by(models.RenderJob.created_at),
+        "ix_render_jobs_project_id_created_at",
+    ),
+    (
+        "render jobs of a shot by created_at",
+        select(models.RenderJob).where(models.RenderJob.shot_id == 1).order_by(models.RenderJob.created_at),
+        "ix_render_jobs_shot_id_created_at",
+    ),
+    (
+        "character by name within a project",
+        select(models.Character).where(models.Character.project_id == 1, models.Character.name == "x"),
+        "uq_characters_project_id_name",
+    ),
+    (
+        "session -> project",
+        select(models.ContinuityState.project_id).where(models.ContinuityState.session_id == "x"),
+        "ix_continuity_states_session_id",
+    ),
+]
+
+
+def explain(conn, statement) -> str:
+    sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    if engine.dialect.name == "sqlite":
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+        return "\n".join(row[-1] for row in rows)
+    if engine.dialect.name == "postgresql":
+        # Test tables are tiny; make the planner show which index it *would* use
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        rows = conn.execute(text(f"EXPLAIN {sql}")).fetchall()
+        return "\n".join(row[0] for row in rows)
+    raise RuntimeError(f"No plan check for dialect {engine.dialect.name}")
+
+
+def check() -> bool:
+    Base.metadata.create_all(bind=engine)
+    ok = True
+    with engine.begin() as conn:
+        for name, statement, index in HOT_QUERIES:
+            plan = explain(conn, statement)
+            used = index in plan
+            ok &= used
+            print(f"[PLAN] {'OK  ' if used else 'MISS'} {name}: expected {index}")
+            if not used:
+                print("       " + plan.replace("\n", "\n       "))
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check() else 1)
@@ -1,13 +1,46 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
 
-engine = create_engine(
-    settings.SQLALCHEMY_DATABASE_URI,
-    connect_args={"check_same_thread": False}
-    if settings.SQLALCHEMY_DATABASE_URI.startswith("sqlite")
-    else {},
-)
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    """
+    Per-connection pragmas so the API, RQ worker and MCP server can share one
+    file: WAL lets readers run alongside the writer, NORMAL sync is safe
+    under WAL, and busy_timeout makes writers queue instead of failing with
+    "database is locked".
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.close()
+
+
+def create_db_engine(url: str = settings.SQLALCHEMY_DATABASE_URI) -> Engine:
+    if url.startswith("sqlite"):
+        db_engine = create_engine(
+            url,
+            connect_args={
+                "check_same_thread": False,
+                "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+            },
+        )
+        event.listen(db_engine, "connect", _configure_sqlite)
+        return db_engine
+
+    return create_engine(
+        url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+
+
+engine = create_db_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -1,7 +1,7 @@
 from fastapi import FastAPI
 
 from app.core.config import settings
-from app.db import Base, engine
+from app.db.migrate_schema import migrate
 from app.api.routes import health, projects, characters, scenes
 from app.api.routes import health, projects, characters, scenes, scripts, shots
 from app.api.routes import render
@@ -9,8 +9,9 @@ from app.api.routes import render_jobs
 
 
 
-# Create DB tables on startup (for dev; later replace with Alembic)
-Base.metadata.create_all(bind=engine)
+# Create DB tables and apply pending schema revisions on startup, so an
+# older database gains the columns / indexes the models now expect
+migrate()
 
 app = FastAPI(title=settings.PROJECT_NAME)
 
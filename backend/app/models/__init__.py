@@ -1,9 +1,10 @@
 from app.db.base import Base
 from .project import Project
 from .character import Character
+from .dna_status import DnaStatus
 from .scene import Scene
 from .shot import Shot
 from .render_job import RenderJob, RenderJobStatus
 from .continuity import ContinuityState
 
-__all__ = ["Base", "Project", "Character", "Scene", "Shot", "RenderJob", "RenderJobStatus", "ContinuityState"]
\ No newline at end of file
+__all__ = ["Base", "Project", "Character", "DnaStatus", "Scene", "Shot", "RenderJob", "RenderJobStatus", "ContinuityState"]
\ No newline at end of file
@@ -1,12 +1,19 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from typing import Optional
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, LargeBinary, Enum, Index
 from sqlalchemy.orm import relationship
 
+from app.core import vectors
 from app.db.base import Base
+from app.models.dna_status import DnaStatus
 
 
 class Character(Base):
     __tablename__ = "characters"
+    __table_args__ = (
+        # One character per name per project; also serves name lookups
+        Index("uq_characters_project_id_name", "project_id", "name", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), index=True)
@@ -18,11 +25,34 @@ class Character(Base):
     # NEW: reference image path (local or S3 URL)
     ref_image_path = Column(String(1024), nullable=True)
 
-    # NEW: embeddings & palette stored as JSON strings for now
-    face_embedding = Column(Text, nullable=True)     # JSON-encoded list[float]
-    style_embedding = Column(Text, nullable=True)    # JSON-encoded list[float]
-    dominant_colors = Column(Text, nullable=True)    # JSON-encoded list[[r,g,b], ...]
+    # CLIP embedding packed as float32/float16 bytes (see app.core.vectors).
+    # v1 uses the same vector for "face" and "style", so it is stored once.
+    embedding = Column(LargeBinary, nullable=True)
+    embedding_dtype = Column(String(16), nullable=True)
+    # Model + backend that produced it (embedding.clip_cache_namespace()); vectors
+    # from different backends aren't comparable. NULL = unknown (legacy row)
+    embedding_model = Column(String(128), nullable=True)
+    dominant_colors = Column(Text, nullable=True)    # JSON-encoded list[[r,g,b], ...], heaviest first
+    dominant_color_weights = Column(Text, nullable=True)  # JSON-encoded list[float], pixel share per color
+
+    # Background DNA extraction progress (NULL = no image uploaded yet)
+    dna_status = Column(Enum(DnaStatus), nullable=True)
+    dna_job_id = Column(String(64), nullable=True)   # RQ job handle
+
+    # LEGACY: JSON-encoded list[float]; no longer written, see app/db/migrate_vectors.py
+    face_embedding = Column(Text, nullable=True)
+    style_embedding = Column(Text, nullable=True)
 
     created_at = Column(DateTime, default=datetime.utcnow)
 
     project = relationship("Project", back_populates="characters")
+
+    @property
+    def embedding_vector(self):
+        """numpy view over the stored embedding, or None."""
+        return vectors.from_bytes(self.embedding, self.embedding_dtype)
+
+    def set_embedding(self, values, dtype: str = vectors.EMBEDDING_DTYPE, model: Optional[str] = None):
+        self.embedding = vectors.to_bytes(values, dtype)
+        self.embedding_dtype = dtype
+        self.embedding_model = model
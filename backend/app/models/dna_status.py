@@ -0,0 +1,9 @@
+import enum
+
+
+class DnaStatus(str, enum.Enum):
+    """Progress of background DNA (embedding + palette) extraction."""
+    pending = "pending"
+    running = "running"
+    done = "done"
+    failed = "failed"
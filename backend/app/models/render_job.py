@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
@@ -16,6 +16,11 @@ class RenderJobStatus(str, enum.Enum):
 
 class RenderJob(Base):
     __tablename__ = "render_jobs"
+    __table_args__ = (
+        # Job history per project / per shot, oldest first
+        Index("ix_render_jobs_project_id_created_at", "project_id", "created_at"),
+        Index("ix_render_jobs_shot_id_created_at", "shot_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -30,6 +35,9 @@ class RenderJob(Base):
     # Where the final video will be saved (later)
     output_path = Column(String(1024), nullable=True)
 
+    # render_fingerprint() of the Veo request; identical requests reuse the video
+    fingerprint = Column(String(64), nullable=True, index=True)
+
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow)
 
@@ -1,8 +1,11 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from typing import Optional
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, LargeBinary, Enum
 from sqlalchemy.orm import relationship
 
+from app.core import vectors
 from app.db.base import Base
+from app.models.dna_status import DnaStatus
 
 
 class Scene(Base):
@@ -19,11 +22,33 @@ class Scene(Base):
     # NEW: reference image path
     ref_image_path = Column(String(1024), nullable=True)
 
-    # NEW: scene-level embeddings
-    scene_embedding = Column(Text, nullable=True)    # JSON-encoded list[float]
-    palette = Column(Text, nullable=True)           # JSON-encoded list[[r,g,b], ...]
+    # NEW: scene-level embeddings, packed as float32/float16 bytes
+    embedding = Column(LargeBinary, nullable=True)
+    embedding_dtype = Column(String(16), nullable=True)
+    # Model + backend that produced it (embedding.clip_cache_namespace()); vectors
+    # from different backends aren't comparable. NULL = unknown (legacy row)
+    embedding_model = Column(String(128), nullable=True)
+    palette = Column(Text, nullable=True)           # JSON-encoded list[[r,g,b], ...], heaviest first
+    palette_weights = Column(Text, nullable=True)   # JSON-encoded list[float], pixel share per color
+
+    # Background DNA extraction progress (NULL = no image uploaded yet)
+    dna_status = Column(Enum(DnaStatus), nullable=True)
+    dna_job_id = Column(String(64), nullable=True)   # RQ job handle
+
+    # LEGACY: JSON-encoded list[float]; no longer written, see app/db/migrate_vectors.py
+    scene_embedding = Column(Text, nullable=True)
 
     created_at = Column(DateTime, default=datetime.utcnow)
 
     project = relationship("Project", back_populates="scenes")
     shots = relationship("Shot", back_populates="scene")
+
+    @property
+    def embedding_vector(self):
+        """numpy view over the stored embedding, or None."""
+        return vectors.from_bytes(self.embedding, self.embedding_dtype)
+
+    def set_embedding(self, values, dtype: str = vectors.EMBEDDING_DTYPE, model: Optional[str] = None):
+        self.embedding = vectors.to_bytes(values, dtype)
+        self.embedding_dtype = dtype
+        self.embedding_model = model
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
@@ -7,6 +7,10 @@ from app.db.base import Base
 
 class Shot(Base):
     __tablename__ = "shots"
+    __table_args__ = (
+        # Shots of a project in order (listing, rendering, next shot index)
+        Index("ix_shots_project_id_index", "project_id", "index"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
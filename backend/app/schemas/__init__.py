@@ -1,21 +1,24 @@
-from .project import Project, ProjectCreate, ProjectUpdate
-from .character import Character, CharacterCreate
+from .project import Project, ProjectCreate, ProjectUpdate, ProjectSummary
+from .character import Character, CharacterCreate, CharacterMatch
 from .scene import Scene, SceneCreate
 from .shot import Shot, ShotCreate
-from .render_job import RenderJob
+from .render_job import RenderJob, RenderJobSummary
 from .script import ScriptCreateRequest, ScriptCreateResponse
 
 __all__ = [
     "Project",
     "ProjectCreate",
     "ProjectUpdate",
+    "ProjectSummary",
     "Character",
     "CharacterCreate",
+    "CharacterMatch",
     "Scene",
     "SceneCreate",
     "Shot",
     "ShotCreate",
     "RenderJob",
+    "RenderJobSummary",
     "ScriptCreateRequest",
     "ScriptCreateResponse",
 ]
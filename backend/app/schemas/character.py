@@ -2,6 +2,8 @@ from datetime import datetime
 from pydantic import BaseModel
 from typing import Optional
 
+from app.models.dna_status import DnaStatus
+
 
 class CharacterBase(BaseModel):
     name: str
@@ -21,6 +23,16 @@ class Character(CharacterBase):
     # NEW: simple flags
     ref_image_path: Optional[str] = None
     has_embeddings: bool = False
+    dna_status: Optional[DnaStatus] = None  # pending -> running -> done / failed
+    dna_job_id: Optional[str] = None
 
     class Config:
         from_attributes = True
+
+
+class CharacterMatch(BaseModel):
+    id: int
+    project_id: int
+    name: str
+    ref_image_path: Optional[str] = None
+    score: float  # cosine similarity, 1.0 = identical embedding
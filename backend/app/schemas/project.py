@@ -18,6 +18,15 @@ class ProjectUpdate(BaseModel):
     script: Optional[str] = None
 
 
+class ProjectSummary(ProjectBase):
+    """List view: everything but the script text."""
+    id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 class Project(ProjectBase):
     id: int
     created_at: datetime
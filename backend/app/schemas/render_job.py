@@ -9,6 +9,18 @@ class RenderJobBase(BaseModel):
     shot_id: int
 
 
+class RenderJobSummary(RenderJobBase):
+    """List view: everything but the request payload."""
+    id: int
+    status: RenderJobStatus
+    output_path: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 class RenderJob(RenderJobBase):
     id: int
     status: RenderJobStatus
@@ -2,6 +2,8 @@ from datetime import datetime
 from pydantic import BaseModel
 from typing import Optional
 
+from app.models.dna_status import DnaStatus
+
 
 class SceneBase(BaseModel):
     name: str
@@ -19,6 +21,8 @@ class Scene(SceneBase):
 
     ref_image_path: Optional[str] = None
     has_embeddings: bool = False
+    dna_status: Optional[DnaStatus] = None  # pending -> running -> done / failed
+    dna_job_id: Optional[str] = None
 
     class Config:
         from_attributes = True
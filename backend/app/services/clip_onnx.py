@@ -0,0 +1,105 @@
+"""
+Export the CLIP image encoder to ONNX with dynamic int8 quantization, and
+check it against the fp32 PyTorch model.
+
+Usage (from backend/):
+    python -m app.services.clip_onnx export
+    python -m app.services.clip_onnx parity media/characters/*.jpg
+
+`parity` exits non-zero if any image's int8 embedding falls below
+PARITY_MIN_COSINE cosine similarity to the fp32 embedding. The repo-root
+test_clip_onnx_parity.py runs it (and checks the numpy preprocessing)
+under pytest.
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+from app.services import embedding
+
+# int8 dynamic quantization of ViT-B/32 normally stays above ~0.99
+PARITY_MIN_COSINE = 0.98
+
+
+def export(output_path: str = embedding.CLIP_ONNX_PATH, opset: int = 17) -> str:
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    model, _ = embedding._get_clip_model()
+    model.eval()
+
+    class ImageEncoder(torch.nn.Module):
+        def __init__(self, clip):
+            super().__init__()
+            self.clip = clip
+
+        def forward(self, pixel_values):
+            return self.clip.get_image_features(pixel_values=pixel_values)
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    fp32_path = output_path.replace(".onnx", "-fp32.onnx")
+
+    start = time.time()
+    torch.onnx.export(
+        ImageEncoder(model),
+        torch.zeros(1, 3, 224, 224),
+        fp32_path,
+        input_names=["pixel_values"],
+        output_names=["image_embeds"],
+        dynamic_axes={"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}},
+        opset_version=opset,
+    )
+    quantize_dynamic(fp32_path, output_path, weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+
+    size_mb = os.path.getsize(output_path) / 1e6
+    print(f"[CLIP] Exported int8 ONNX encoder to {output_path} ({size_mb:.1f} MB) in {time.time() - start:.1f}s")
+    return output_path
+
+
+def parity(image_paths: List[str], min_cosine: float = PARITY_MIN_COSINE) -> bool:
+    images = [embedding._load_image(p) for p in image_paths]
+
+    start = time.time()
+    reference = np.asarray(embedding._torch_embed(images))
+    torch_time = time.time() - start
+
+    embedding._get_onnx_session()
+    start = time.time()
+    quantized = np.asarray(embedding._onnx_embed(images))
+    onnx_time = time.time() - start
+
+    reference /= np.linalg.norm(reference, axis=1, keepdims=True)
+    quantized /= np.linalg.norm(quantized, axis=1, keepdims=True)
+    cosines = (reference * quantized).sum(axis=1)
+
+    for path, cos in zip(image_paths, cosines):
+        print(f"  {cos:.4f}  {path}")
+    print(
+        f"[CLIP] Parity over {len(images)} images: min={cosines.min():.4f} mean={cosines.mean():.4f} "
+        f"(torch {torch_time:.2f}s, onnx {onnx_time:.2f}s)"
+    )
+    return bool(cosines.min() >= min_cosine)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CLIP ONNX export / parity check")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = sub.add_parser("export")
+    export_cmd.add_argument("--output", default=embedding.CLIP_ONNX_PATH)
+
+    parity_cmd = sub.add_parser("parity")
+    parity_cmd.add_argument("images", nargs="+")
+    parity_cmd.add_argument("--min-cosine", type=float, default=PARITY_MIN_COSINE)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export(args.output)
+    else:
+        sys.exit(0 if parity(args.images, args.min_cosine) else 1)
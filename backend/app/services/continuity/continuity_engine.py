@@ -2,10 +2,19 @@
 
 from sqlalchemy.orm import Session
 from app import models
+from app.core.config_video import VEO_MODEL_ID
 from app.services.video.google_flow import GoogleFlowVideoService
-import base64
+from app.services.sessions import rest_session_id
+from app.services.continuity.reference_images import max_side_for_model, reference_image
+from app.services.video.render_cache import render_cache, render_fingerprint
+from typing import Tuple
 import json
 import os
+import tempfile
+
+# build_request default: take the flow frame from ContinuityState
+_STATE_FLOW_FRAME = object()
+
 
 class ContinuityEngine:
     
@@ -15,45 +24,107 @@ class ContinuityEngine:
     def get_or_create_state(self, db: Session, project_id: int, session_id: str = None):
         state = db.query(models.ContinuityState).filter_by(project_id=project_id).first()
         if not state:
-            state = models.ContinuityState(project_id=project_id, session_id=session_id or f"session_{project_id}")
+            state = models.ContinuityState(project_id=project_id, session_id=session_id or rest_session_id(project_id))
             db.add(state)
             db.commit()
         return state
 
-    def generate_segment(self, db: Session, project_id: int, prompt: str, session_id: str = None):
+    def generate_segment(self, db: Session, project_id: int, prompt: str, session_id: str = None, use_cache: bool = True):
         """
         The Core Logic: Multi-Anchor + Flow Generation (Path A + Path C)
         """
+        request = self.build_request(db, project_id, prompt, session_id)
+        fingerprint = self.fingerprint(request)
+
+        # --- 3. Reuse an identical earlier render, else call Veo ---
+        cached = render_cache.lookup(fingerprint) if use_cache else None
+        if cached:
+            print(f"[RENDER CACHE] Hit {fingerprint[:12]}, skipping Veo")
+            with open(cached, "rb") as f:
+                return f.read()
+
+        video_bytes = self.video_service.generate_video(**request)
+
+        with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp:
+            tmp.write(video_bytes)
+        render_cache.store(fingerprint, tmp.name)
+        os.remove(tmp.name)
+        
+        return video_bytes
+
+    def generate_segment_to_file(self, db: Session, project_id: int, prompt: str, dest: str, session_id: str = None, use_cache: bool = True) -> int:
+        """generate_segment, streaming the video to the path `dest`."""
+        request = self.build_request(db, project_id, prompt, session_id)
+        size, _ = self.render_to_file(request, dest, use_cache=use_cache)
+        return size
+
+    def fingerprint(self, request: dict) -> str:
+        """Render cache key for a build_request() result."""
+        return render_fingerprint(request, VEO_MODEL_ID)
+
+    def render_to_file(self, request: dict, dest: str, use_cache: bool = True) -> Tuple[int, bool]:
+        """
+        Render `request` to the path `dest`, reusing a cached video with the
+        same fingerprint when there is one. Returns (size, cache_hit).
+
+        Veo is not deterministic without a seed, so use_cache=False (an
+        explicit re-render) always calls it; the new video replaces the
+        cached one.
+        """
+        fingerprint = self.fingerprint(request)
+        size = render_cache.fetch(fingerprint, dest) if use_cache else None
+        if size is not None:
+            print(f"[RENDER CACHE] Hit {fingerprint[:12]}, skipping Veo")
+            return size, True
+
+        size = self.video_service.generate_video_to_file(dest=dest, **request)
+        render_cache.store(fingerprint, dest)
+        return size, False
+
+    def build_request(
+        self,
+        db: Session,
+        project_id: int,
+        prompt: str,
+        session_id: str = None,
+        flow_frame_path=_STATE_FLOW_FRAME,
+    ) -> dict:
+        """
+        Everything generate_segment sends to Veo (final prompt + reference
+        images), without calling it. Used by the async render executor.
+
+        The flow reference defaults to the project's ContinuityState last
+        frame; project renders pass their scene chain's frame instead (or
+        None at the start of a scene).
+        """
         state = self.get_or_create_state(db, project_id, session_id)
         
         # --- 1. Build Reference Images (The "Anchor + Flow" Strategy) ---
         reference_images = []
 
+        # Downscaled, metadata-free copies sized to what the model renders
+        max_side = max_side_for_model(VEO_MODEL_ID)
+
         # A. MULTI-ANCHOR CHARACTERS (Path C Logic)
         active_ids = json.loads(state.active_character_ids or "[]")
         
         for char_id in active_ids:
             char = db.query(models.Character).get(char_id)
             if char and hasattr(char, 'ref_image_path') and char.ref_image_path:
-                if os.path.exists(char.ref_image_path):
-                    # Character Anchors get a high, consistent weight
-                    # NOTE: We use the raw image even if DNA hasn't been extracted yet
-                    # The background worker will populate embeddings for future use
-                    anchor_blob = self._load_image_as_base64(char.ref_image_path)
-                    reference_images.append({
-                        "referenceType": "asset",
-                        "image": {"bytesBase64Encoded": anchor_blob, "mimeType": "image/jpeg"},
-                        "weight": 0.8  # High confidence for identity
-                    })
+                # Character Anchors get a high, consistent weight (0.8: identity)
+                # NOTE: We use the raw image even if DNA hasn't been extracted yet
+                # The background worker will populate embeddings for future use
+                anchor = reference_image(char.ref_image_path, weight=0.8, max_side=max_side)
+                if anchor:
+                    reference_images.append(anchor)
 
         # B. THE FLOW (Temporal Continuity)
-        if state.last_frame_path and os.path.exists(state.last_frame_path):
-            flow_blob = self._load_image_as_base64(state.last_frame_path)
-            reference_images.append({
-                "referenceType": "asset",
-                "image": {"bytesBase64Encoded": flow_blob, "mimeType": "image/jpeg"},
-                "weight": 0.5  # Medium confidence for motion/lighting
-            })
+        # Medium confidence (0.5) for motion/lighting
+        if flow_frame_path is _STATE_FLOW_FRAME:
+            flow_frame_path = state.last_frame_path
+        flow = reference_image(flow_frame_path, weight=0.5, max_side=max_side)
+        if flow:
+            reference_images.append(flow)
 
         # --- 2. Enhance Prompt (Path A Logic) ---
         final_prompt = f"{prompt}. Style: Consistent with previous shots."
@@ -67,16 +138,9 @@ class ContinuityEngine:
             final_prompt += "\n\nNARRATIVE FACTS TO ENFORCE:\n"
             final_prompt += " ".join(narrative_lines)
 
-        # --- 3. Call Veo ---
         print(f"DEBUG: Generating with {len(reference_images)} refs ({len(active_ids)} anchors + flow)")
         print(f"DEBUG: Narrative context: {state.narrative_context}")
-        video_bytes = self.video_service.generate_video(
-            prompt=final_prompt,
-            reference_images=reference_images if reference_images else None
-        )
-        
-        return video_bytes
-
-    def _load_image_as_base64(self, path: str) -> str:
-        with open(path, "rb") as f:
-            return base64.b64encode(f.read()).decode()
\ No newline at end of file
+        return {
+            "prompt": final_prompt,
+            "reference_images": reference_images if reference_images else None,
+        }
@@ -0,0 +1,179 @@
+import base64
+import glob
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.services.video.streaming import part_path
+
+# Encoded (base64) bytes kept across shots; anchors are reused every shot
+REFERENCE_CACHE_MAX_BYTES = int(os.getenv("REFERENCE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Prepared (uploaded) references: longest side override (0 = per model) and JPEG quality
+REFERENCE_MAX_SIDE = int(os.getenv("REFERENCE_MAX_SIDE", "0"))
+REFERENCE_JPEG_QUALITY = int(os.getenv("REFERENCE_JPEG_QUALITY", "85"))
+
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def detect_mime_type(data: bytes, path: str = "") -> str:
+    """MIME type from the file's magic bytes, falling back to its extension."""
+    for signature, mime in _SIGNATURES:
+        if data.startswith(signature):
+            return mime
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    guessed, _ = mimetypes.guess_type(path)
+    return guessed or "image/jpeg"
+
+
+def max_side_for_model(model_id: str) -> int:
+    """Longest output side the model renders at (Veo 2: 720p, Veo 3: 1080p)."""
+    if REFERENCE_MAX_SIDE:
+        return REFERENCE_MAX_SIDE
+    return 1280 if model_id.startswith("veo-2") else 1920
+
+
+def _upload_ready(img) -> bool:
+    """True for an RGB JPEG within bounds with nothing but the JFIF header to strip."""
+    return (
+        img.format == "JPEG"
+        and img.mode == "RGB"
+        and all(marker == "APP0" for marker, _ in getattr(img, "applist", []))
+    )
+
+
+def prepare_reference(path: str, max_side: int, quality: int = REFERENCE_JPEG_QUALITY) -> str:
+    """
+    Path of an upload-ready copy of `path`: EXIF-rotated, shrunk to fit
+    max_side, flattened to RGB and re-encoded as metadata-free JPEG. An
+    original that already is one (RGB JPEG within max_side, no metadata) is
+    returned as is. The copy is cached next to the original, named after
+    its mtime and size (e.g. foo.ref1280q85.5f3a...-1c2b.jpg) so an
+    overwritten original gets a new one; older copies are removed. Falls
+    back to the original if it can't be read.
+    """
+    st = os.stat(path)
+    stem = os.path.splitext(path)[0]
+    prefix = f"{stem}.ref{max_side}q{quality}"
+    derived = f"{prefix}.{st.st_mtime_ns:x}-{st.st_size:x}.jpg"
+    if os.path.exists(derived):
+        return derived
+
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(path) as img:
+            if max(img.size) <= max_side and _upload_ready(img):
+                return path
+            img = ImageOps.exif_transpose(img)
+            if img.mode in ("RGBA", "LA", "P"):
+                rgba = img.convert("RGBA")
+                img = Image.new("RGB", rgba.size, (255, 255, 255))
+                img.paste(rgba, mask=rgba.getchannel("A"))
+            else:
+                img = img.convert("RGB")
+            img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+            tmp_path = part_path(derived)
+            # No exif= / icc_profile= passed, so metadata is dropped
+            img.save(tmp_path, "JPEG", quality=quality, optimize=True)
+            os.replace(tmp_path, derived)
+    except Exception as e:
+        print(f"[REFS] Could not prepare {path}, sending original: {e}")
+        return path
+
+    for stale in glob.glob(f"{glob.escape(prefix)}*.jpg"):
+        if stale != derived:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+    print(f"[REFS] Prepared {path}: {os.path.getsize(path) // 1024} KB -> {os.path.getsize(derived) // 1024} KB")
+    return derived
+
+
+class ReferencePayloadCache:
+    """
+    In-process LRU of base64-encoded reference images, keyed by
+    (path, mtime, size) so an overwritten file (e.g. the per-session last
+    frame) is re-read. Bounded by total encoded size.
+    """
+
+    def __init__(self, max_bytes: int = REFERENCE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, int, int], Tuple[str, str]]" = OrderedDict()
+        self._bytes = 0
+
+    def get(self, path: str) -> Tuple[str, str]:
+        """(base64 payload, MIME type) for the image at `path`."""
+        st = os.stat(path)
+        key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        with open(path, "rb") as f:
+            data = f.read()
+        entry = (base64.b64encode(data).decode(), detect_mime_type(data, path))
+
+        with self._lock:
+            if key not in self._entries and len(entry[0]) <= self.max_bytes:
+                self._entries[key] = entry
+                self._bytes += len(entry[0])
+                while self._bytes > self.max_bytes:
+                    _, (old_b64, _) = self._entries.popitem(last=False)
+                    self._bytes -= len(old_b64)
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+reference_payloads = ReferencePayloadCache()
+
+
+def reference_image(
+    path: str,
+    weight: float = 1.0,
+    reference_type: str = "asset",
+    max_side: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Veo referenceImages entry for the image at `path`, or None if it is
+    missing. With `max_side`, the prepare_reference() derivative is sent.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    if max_side:
+        path = prepare_reference(path, max_side)
+    b64, mime_type = reference_payloads.get(path)
+    return {
+        "referenceType": reference_type,
+        "image": {"bytesBase64Encoded": b64, "mimeType": mime_type},
+        "weight": weight,
+    }
@@ -1,15 +1,34 @@
+import importlib.util
 import json
+import os
 import time
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union
 
-import torch
+import numpy as np
 from PIL import Image
-from transformers import CLIPProcessor, CLIPModel
 
+from app.services.embedding_cache import embedding_cache, image_digest
+from app.services.palette import extract_palettes
+
+CLIP_MODEL_ID = "openai/clip-vit-base-patch32"
+
+# Embedding backend: "torch" (fp32 PyTorch) or "onnx" (int8 ONNX Runtime).
+# "onnx" falls back to torch if onnxruntime or the exported graph is missing;
+# export one with `python -m app.services.clip_onnx export`.
+CLIP_BACKEND = os.getenv("CLIP_BACKEND", "torch")
+CLIP_ONNX_PATH = os.getenv("CLIP_ONNX_PATH", "media/models/clip-vit-b32-image-int8.onnx")
 
 # Lazy loading: Models are loaded on first use, not at import time
 _clip_model = None
 _clip_processor = None
+_onnx_session = None
+_backend = None
+
+# CLIPImageProcessor settings for CLIP_MODEL_ID, applied in numpy for the ONNX
+# backend so it needs neither transformers nor torch
+CLIP_IMAGE_SIZE = 224
+CLIP_MEAN = np.array([0.48145466, 0.4578275, 0.40821073], dtype=np.float32)
+CLIP_STD = np.array([0.26862954, 0.26130258, 0.27577711], dtype=np.float32)
 
 
 def _get_clip_model():
@@ -17,52 +36,202 @@ def _get_clip_model():
     global _clip_model, _clip_processor
     
     if _clip_model is None:
+        from transformers import CLIPProcessor, CLIPModel
+
         print("[CLIP] Loading model (first time, may take ~15-20s)...")
         start = time.time()
-        _clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-        _clip_processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
+        _clip_model = CLIPModel.from_pretrained(CLIP_MODEL_ID)
+        _clip_processor = CLIPProcessor.from_pretrained(CLIP_MODEL_ID)
         load_time = time.time() - start
         print(f"[CLIP] Model loaded in {load_time:.2f}s")
     
     return _clip_model, _clip_processor
 
 
-def _image_to_clip_embedding(image: Image.Image) -> List[float]:
+def _get_onnx_session():
+    """Lazy load the quantized ONNX image encoder on first use."""
+    global _onnx_session
+
+    if _onnx_session is None:
+        import onnxruntime as ort
+
+        print(f"[CLIP] Loading ONNX model from {CLIP_ONNX_PATH}...")
+        start = time.time()
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        _onnx_session = ort.InferenceSession(
+            CLIP_ONNX_PATH, options, providers=["CPUExecutionProvider"]
+        )
+        load_time = time.time() - start
+        print(f"[CLIP] ONNX model loaded in {load_time:.2f}s")
+
+    return _onnx_session
+
+
+def clip_backend() -> str:
+    """Backend that will actually serve embeddings. Cheap: loads nothing."""
+    global _backend
+
+    if _backend is None:
+        _backend = "torch"
+        if CLIP_BACKEND == "onnx":
+            if importlib.util.find_spec("onnxruntime") and os.path.exists(CLIP_ONNX_PATH):
+                _backend = "onnx"
+            else:
+                print(f"[CLIP] ONNX backend unavailable ({CLIP_ONNX_PATH}), falling back to torch")
+    return _backend
+
+
+def clip_cache_namespace() -> str:
+    """
+    Model + backend that produced an embedding. Quantized vectors differ
+    slightly from fp32 ones, so they are never mixed: it namespaces the
+    cache, is stored as Character/Scene.embedding_model and tags the
+    vector index.
+    """
+    return CLIP_MODEL_ID if clip_backend() == "torch" else f"{CLIP_MODEL_ID}:onnx-int8"
+
+
+def warm_up():
+    """Load the configured backend now (worker startup) instead of on first job."""
+    if clip_backend() == "onnx":
+        _get_onnx_session()
+    else:
+        _get_clip_model()
+
+
+def _torch_embed(images: List[Image.Image]) -> List[List[float]]:
+    import torch
+
     model, processor = _get_clip_model()
-    inputs = processor(images=image, return_tensors="pt")
+    inputs = processor(images=images, return_tensors="pt")
     with torch.no_grad():
         outputs = model.get_image_features(**inputs)
-    embedding = outputs[0].cpu().numpy().tolist()
-    return embedding
+    return outputs.cpu().numpy().tolist()
+
+
+def _clip_pixel_values(images: List[Image.Image]) -> np.ndarray:
+    """
+    CLIPImageProcessor's preprocessing with PIL + numpy: shortest side to
+    224 (bicubic), center crop, scale to [0, 1], normalize; NCHW float32.
+    """
+    size = CLIP_IMAGE_SIZE
+    batch = np.empty((len(images), 3, size, size), dtype=np.float32)
+    for i, img in enumerate(images):
+        img = img.convert("RGB")
+        w, h = img.size
+        resized = (size, int(size * h / w)) if w <= h else (int(size * w / h), size)
+        img = img.resize(resized, Image.BICUBIC)
+        left, top = (resized[0] - size) // 2, (resized[1] - size) // 2
+        img = img.crop((left, top, left + size, top + size))
+        pixels = (np.asarray(img, dtype=np.float64) / 255).astype(np.float32)
+        batch[i] = ((pixels - CLIP_MEAN) / CLIP_STD).transpose(2, 0, 1)
+    return batch
 
 
-def _extract_dominant_colors(image: Image.Image, k: int = 5) -> List[Tuple[int, int, int]]:
-    # Simple palette-based approach; not real k-means but good enough for MVP
-    small = image.convert("RGB").resize((64, 64))
-    palette = small.convert("P", palette=Image.ADAPTIVE, colors=k)
-    palette_colors = palette.getpalette()
-    color_counts = sorted(palette.getcolors(), reverse=True)
+def _onnx_embed(images: List[Image.Image]) -> List[List[float]]:
+    session = _get_onnx_session()
+    (outputs,) = session.run(None, {"pixel_values": _clip_pixel_values(images)})
+    return outputs.tolist()
 
-    colors = []
-    for count, idx in color_counts[:k]:
-        r = palette_colors[idx * 3]
-        g = palette_colors[idx * 3 + 1]
-        b = palette_colors[idx * 3 + 2]
-        colors.append((r, g, b))
-    return colors
+
+# Max images per CLIP forward pass; bounds peak memory on CPU workers
+CLIP_BATCH_SIZE = 32
+
+
+def _images_to_clip_embeddings(images: List[Image.Image]) -> List[List[float]]:
+    """Embed many images, running CLIP once per chunk of CLIP_BATCH_SIZE."""
+    if not images:
+        return []
+
+    embed = _onnx_embed if clip_backend() == "onnx" else _torch_embed
+    embeddings: List[List[float]] = []
+    for i in range(0, len(images), CLIP_BATCH_SIZE):
+        embeddings.extend(embed(images[i:i + CLIP_BATCH_SIZE]))
+    return embeddings
+
+
+def _image_to_clip_embedding(image: Image.Image) -> List[float]:
+    return _images_to_clip_embeddings([image])[0]
 
 
-def extract_character_dna(image_path: str) -> Dict:
+def _cached_clip_embeddings(images: List[Image.Image], digests: List[str]) -> List[List[float]]:
+    """
+    Look every image up in the embedding cache first; only misses go through
+    CLIP, so a fully cached batch never loads the model.
+    """
+    namespace = clip_cache_namespace()
+    embeddings = [embedding_cache.get(d, namespace) for d in digests]
+    missing = [i for i, e in enumerate(embeddings) if e is None]
+
+    if missing:
+        computed = _images_to_clip_embeddings([images[i] for i in missing])
+        for i, embedding in zip(missing, computed):
+            embedding_cache.put(digests[i], namespace, embedding)
+            embeddings[i] = embedding
+    return embeddings
+
+
+def _cached_palettes(images: List[Image.Image], digests: List[str], k: int = 5) -> List[Tuple[List, List[float]]]:
+    """(colors, weights) per image, computed for cache misses only."""
+    # v2: per-image seeding; v1 entries could depend on the batch they were computed in
+    namespace = f"palette-lab-kmeans:v2:k={k}"
+    cached = [embedding_cache.get(d, namespace) for d in digests]
+    missing = [i for i, p in enumerate(cached) if p is None]
+
+    if missing:
+        computed = extract_palettes([images[i] for i in missing], k=k)
+        for i, (colors, weights) in zip(missing, computed):
+            cached[i] = {"colors": colors, "weights": weights}
+            embedding_cache.put(digests[i], namespace, cached[i])
+    return [([tuple(c) for c in p["colors"]], p["weights"]) for p in cached]
+
+
+# Shortest side every DNA stage is fed: CLIP resizes to 224 and center-crops,
+# the palette sampler works on <= PALETTE_MAX_SIDE. Decoding bigger is waste.
+DNA_DECODE_SIZE = 256
+
+
+def _load_image(image_path: Union[str, Image.Image]) -> Image.Image:
+    """
+    Decode once at the smallest resolution any DNA stage needs. Already
+    decoded images (e.g. video frames) are just shrunk.
+
+    JPEGs use draft mode (DCT scaling by 1/2, 1/4 or 1/8 during decode), so a
+    12 MP phone photo never materialises at full size; the result is then
+    shrunk to DNA_DECODE_SIZE and shared by CLIP and the palette extractor.
+    """
+    img = image_path if isinstance(image_path, Image.Image) else Image.open(image_path)
+    w, h = img.size
+    scale = DNA_DECODE_SIZE / min(w, h)
+    if scale < 1:
+        target = (max(1, round(w * scale)), max(1, round(h * scale)))
+        img.draft("RGB", target)
+        img = img.convert("RGB")
+        if min(img.size) > DNA_DECODE_SIZE:
+            img = img.resize(target, Image.BICUBIC, reducing_gap=2.0)
+        return img
+    return img.convert("RGB")
+
+
+def embed_image(image_path: Union[str, Image.Image]) -> List[float]:
+    """CLIP embedding only (no palette), e.g. for identity lookups."""
+    img = _load_image(image_path)
+    return _cached_clip_embeddings([img], [image_digest(img)])[0]
+
+
+def extract_character_dna(image_path: Union[str, Image.Image]) -> Dict:
     start = time.time()
-    img = Image.open(image_path).convert("RGB")
+    img = _load_image(image_path)
+    digest = image_digest(img)
 
     # For v1, use same embedding for "face" + "style"
     clip_start = time.time()
-    clip_embedding = _image_to_clip_embedding(img)
+    clip_embedding = _cached_clip_embeddings([img], [digest])[0]
     clip_time = time.time() - clip_start
     
     color_start = time.time()
-    dominant_colors = _extract_dominant_colors(img)
+    dominant_colors, color_weights = _cached_palettes([img], [digest])[0]
     color_time = time.time() - color_start
     
     total_time = time.time() - start
@@ -72,20 +241,75 @@ def extract_character_dna(image_path: str) -> Dict:
         "face_embedding": clip_embedding,
         "style_embedding": clip_embedding,
         "dominant_colors": dominant_colors,
+        "dominant_color_weights": color_weights,
+        "embedding_model": clip_cache_namespace(),
     }
 
 
-def extract_scene_dna(image_path: str) -> Dict:
-    img = Image.open(image_path).convert("RGB")
+def extract_scene_dna(image_path: Union[str, Image.Image]) -> Dict:
+    img = _load_image(image_path)
+    digest = image_digest(img)
 
-    scene_embedding = _image_to_clip_embedding(img)
-    palette = _extract_dominant_colors(img, k=7)
+    scene_embedding = _cached_clip_embeddings([img], [digest])[0]
+    palette, palette_weights = _cached_palettes([img], [digest], k=7)[0]
 
     return {
         "scene_embedding": scene_embedding,
         "palette": palette,
+        "palette_weights": palette_weights,
+        "embedding_model": clip_cache_namespace(),
     }
 
 
+def extract_character_dna_batch(image_paths: List[str]) -> List[Dict]:
+    """Batched extract_character_dna: one CLIP pass for the whole cast."""
+    start = time.time()
+    imgs = [_load_image(p) for p in image_paths]
+    digests = [image_digest(img) for img in imgs]
+
+    clip_start = time.time()
+    clip_embeddings = _cached_clip_embeddings(imgs, digests)
+    clip_time = time.time() - clip_start
+
+    palettes = _cached_palettes(imgs, digests)
+
+    results = []
+    for clip_embedding, (colors, weights) in zip(clip_embeddings, palettes):
+        results.append({
+            "face_embedding": clip_embedding,
+            "style_embedding": clip_embedding,
+            "dominant_colors": colors,
+            "dominant_color_weights": weights,
+            "embedding_model": clip_cache_namespace(),
+        })
+
+    total_time = time.time() - start
+    print(f"[DNA] Batch of {len(imgs)} completed in {total_time:.2f}s (CLIP: {clip_time:.2f}s)")
+    return results
+
+
+def extract_scene_dna_batch(image_paths: List[str]) -> List[Dict]:
+    """Batched extract_scene_dna: one CLIP pass for all scenes."""
+    imgs = [_load_image(p) for p in image_paths]
+    digests = [image_digest(img) for img in imgs]
+    scene_embeddings = _cached_clip_embeddings(imgs, digests)
+    palettes = _cached_palettes(imgs, digests, k=7)
+
+    return [
+        {
+            "scene_embedding": scene_embedding,
+            "palette": palette,
+            "palette_weights": weights,
+            "embedding_model": clip_cache_namespace(),
+        }
+        for scene_embedding, (palette, weights) in zip(scene_embeddings, palettes)
+    ]
+
+
+def embedding_cache_stats() -> Dict:
+    """Hit/miss counters and size of the DNA embedding cache."""
+    return embedding_cache.stats()
+
+
 def to_json_str(obj) -> str:
     return json.dumps(obj)
@@ -0,0 +1,200 @@
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from PIL import Image
+
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "media/cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Other processes write to the same file; re-read the true total this often
+SIZE_RESYNC_SECONDS = 60.0
+# Eviction frees down to this fraction of max_bytes, so a full cache
+# doesn't evict again on the very next put
+EVICT_TO = 0.9
+# A hit only rewrites last_access when the stored one is older than this;
+# LRU order finer than a minute doesn't change what gets evicted
+ACCESS_RESOLUTION_SECONDS = 60.0
+# Hit/miss counts are added to the shared Redis totals at most this often
+STATS_FLUSH_SECONDS = 10.0
+
+
+def image_digest(image: Image.Image) -> str:
+    """SHA-256 of the decoded pixels, so re-encoded copies of one image collide."""
+    h = hashlib.sha256()
+    h.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode())
+    h.update(image.tobytes())
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent content-addressed cache for DNA features (CLIP vectors, palettes).
+
+    Entries are keyed by (image digest, namespace) where namespace is the model
+    ID for embeddings, or e.g. "palette:k=5" for colors. Total value size is
+    bounded; least-recently-used rows are evicted first. The size is tracked
+    as a running total (re-synced from the table every SIZE_RESYNC_SECONDS
+    and before evicting) rather than summed on every put. Hit/miss counts
+    are kept per process and, when Redis is reachable, across workers; the
+    shared totals are updated in batches, not per lookup.
+    """
+
+    REDIS_KEY = "embedding_cache:stats"
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_bytes: int = EMBEDDING_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._total: Optional[int] = None  # bytes, as of the last sync plus our own puts
+        self._synced_at = 0.0
+        self._unflushed = {"hits": 0, "misses": 0}
+        self._flushed_at = time.monotonic()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " digest TEXT NOT NULL,"
+                " namespace TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_access REAL NOT NULL,"
+                " PRIMARY KEY (digest, namespace))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_entries_last_access ON entries (last_access)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+            self._unflushed[field] += 1
+            due = time.monotonic() - self._flushed_at > STATS_FLUSH_SECONDS
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self) -> None:
+        """Add the counts since the last flush to the shared Redis totals."""
+        with self._lock:
+            pending, self._unflushed = self._unflushed, {"hits": 0, "misses": 0}
+            self._flushed_at = time.monotonic()
+        if not any(pending.values()):
+            return
+        try:
+            from app.core.redis import redis_client
+            pipe = redis_client.pipeline(transaction=False)
+            for field, n in pending.items():
+                if n:
+                    pipe.hincrby(self.REDIS_KEY, field, n)
+            pipe.execute()
+        except Exception:
+            pass
+
+    def get(self, digest: str, namespace: str) -> Optional[Any]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, last_access FROM entries WHERE digest = ? AND namespace = ?",
+                (digest, namespace),
+            ).fetchone()
+            now = time.time()
+            if row is not None and now - row[1] > ACCESS_RESOLUTION_SECONDS:
+                conn.execute(
+                    "UPDATE entries SET last_access = ? WHERE digest = ? AND namespace = ?",
+                    (now, digest, namespace),
+                )
+                conn.commit()
+        if row is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return json.loads(row[0])
+
+    def put(self, digest: str, namespace: str, value: Any) -> None:
+        encoded = json.dumps(value)
+        with self._lock:
+            conn = self._connect()
+            if self._total is None or time.monotonic() - self._synced_at > SIZE_RESYNC_SECONDS:
+                self._sync_total(conn)
+            replaced = conn.execute(
+                "SELECT size FROM entries WHERE digest = ? AND namespace = ?",
+                (digest, namespace),
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (digest, namespace, value, size, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (digest, namespace, encoded, len(encoded), time.time()),
+            )
+            self._total += len(encoded) - (replaced[0] if replaced else 0)
+            if self._total > self.max_bytes:
+                self._evict(conn)
+            conn.commit()
+
+    def _sync_total(self, conn: sqlite3.Connection) -> None:
+        self._total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        self._synced_at = time.monotonic()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        # Exact total first: other processes may already have evicted
+        self._sync_total(conn)
+        if self._total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * EVICT_TO)
+        total = self._total
+        victims = []
+        for digest, namespace, size in conn.execute(
+            "SELECT digest, namespace, size FROM entries ORDER BY last_access ASC"
+        ):
+            if total <= target:
+                break
+            victims.append((digest, namespace))
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE digest = ? AND namespace = ?", victims)
+        self._total = total
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connect()
+            entries, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        stats = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+        }
+        self.flush_stats()
+        try:
+            from app.core.redis import redis_client
+            shared = {k.decode() if isinstance(k, bytes) else k: int(v) for k, v in redis_client.hgetall(self.REDIS_KEY).items()}
+            shared_lookups = shared.get("hits", 0) + shared.get("misses", 0)
+            stats["all_workers"] = {
+                "hits": shared.get("hits", 0),
+                "misses": shared.get("misses", 0),
+                "hit_rate": shared.get("hits", 0) / shared_lookups if shared_lookups else 0.0,
+            }
+        except Exception:
+            pass
+        return stats
+
+
+embedding_cache = EmbeddingCache()
+atexit.register(embedding_cache.flush_stats)
@@ -0,0 +1,137 @@
+"""
+In-process frame extraction with PyAV (libav), replacing per-shot ffmpeg
+subprocesses. Frames come back as PIL images (or RGB ndarrays), so they can
+go straight into CLIP / palette extraction without a JPEG round trip.
+"""
+
+import os
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from PIL import Image
+
+# JPEG quality for frames saved as flow / anchor references
+FRAME_JPEG_QUALITY = 95
+
+
+@dataclass
+class VideoFrames:
+    first: Optional[Image.Image] = None
+    last: Optional[Image.Image] = None
+    samples: List[Image.Image] = field(default_factory=list)
+
+
+def _open(video_path: str):
+    import av
+
+    container = av.open(video_path)
+    stream = container.streams.video[0]
+    stream.thread_type = "AUTO"
+    return container, stream
+
+
+def _end_pts(container, stream) -> Optional[int]:
+    """Stream end in stream time_base units, if the file says."""
+    if stream.duration:
+        return (stream.start_time or 0) + stream.duration
+    if container.duration:
+        # container.duration is in AV_TIME_BASE (microseconds)
+        return int(container.duration / 1_000_000 / stream.time_base)
+    return None
+
+
+def _convert(frame, as_array: bool):
+    return frame.to_ndarray(format="rgb24") if as_array else frame.to_image()
+
+
+def first_frame(video_path: str, as_array: bool = False):
+    container, stream = _open(video_path)
+    try:
+        for frame in container.decode(stream):
+            return _convert(frame, as_array)
+    finally:
+        container.close()
+    raise ValueError(f"No video frames in {video_path}")
+
+
+def last_frame(video_path: str, as_array: bool = False):
+    """
+    Seek to the last keyframe before the end and decode forward to the final
+    frame, so only one GOP is decoded instead of the whole clip.
+    """
+    container, stream = _open(video_path)
+    try:
+        end = _end_pts(container, stream)
+        last = None
+        if end is not None:
+            container.seek(end, stream=stream, backward=True, any_frame=False)
+            for last in container.decode(stream):
+                pass
+        if last is None:
+            # No usable duration / index: decode the whole stream
+            container.seek(0)
+            for last in container.decode(stream):
+                pass
+        if last is None:
+            raise ValueError(f"No video frames in {video_path}")
+        return _convert(last, as_array)
+    finally:
+        container.close()
+
+
+def extract_frames(video_path: str, count: int = 0, first: bool = True, last: bool = True, as_array: bool = False) -> VideoFrames:
+    """
+    One decode pass for the first frame, the last frame and `count` evenly
+    spaced frames (the first and last samples sit at the clip's ends).
+    With count=0 only first/last are read, via last_frame()'s keyframe seek.
+    """
+    if count <= 0:
+        return VideoFrames(
+            first=first_frame(video_path, as_array) if first else None,
+            last=last_frame(video_path, as_array) if last else None,
+        )
+
+    container, stream = _open(video_path)
+    try:
+        start = stream.start_time or 0
+        end = _end_pts(container, stream)
+        span = (end - start) if end else 0
+        targets = [start + span * i / max(count - 1, 1) for i in range(count)] if span else []
+
+        result = VideoFrames()
+        prev = None
+        next_target = 0
+        for frame in container.decode(stream):
+            if first and result.first is None:
+                result.first = _convert(frame, as_array)
+            # Take the first frame at or past each target timestamp
+            while next_target < len(targets) and frame.pts is not None and frame.pts >= targets[next_target]:
+                result.samples.append(_convert(frame, as_array))
+                next_target += 1
+            prev = frame
+
+        if prev is None:
+            raise ValueError(f"No video frames in {video_path}")
+        # Targets at/after the final frame's pts (e.g. the clip end)
+        while len(result.samples) < count:
+            result.samples.append(_convert(prev, as_array))
+        if last:
+            result.last = _convert(prev, as_array)
+        return result
+    finally:
+        container.close()
+
+
+def save_last_frame(video_path: str, output_path: str, quality: int = FRAME_JPEG_QUALITY) -> Image.Image:
+    """Write the video's last frame to `output_path` (JPEG) and return it."""
+    image = last_frame(video_path)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    image.save(output_path, quality=quality)
+    return image
+
+
+def save_first_frame(video_path: str, output_path: str, quality: int = FRAME_JPEG_QUALITY) -> Image.Image:
+    image = first_frame(video_path)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    image.save(output_path, quality=quality)
+    return image
@@ -0,0 +1,166 @@
+import hashlib
+import os
+from typing import List, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Pixels sampled per image for clustering; more = stabler palette, slower
+PALETTE_SAMPLE_SIZE = int(os.getenv("PALETTE_SAMPLE_SIZE", "4096"))
+# Images are shrunk to this max side before sampling
+PALETTE_MAX_SIDE = 256
+
+_KMEANS_BATCH = 1024
+_KMEANS_ITERS = 40
+
+# sRGB (D65) -> XYZ
+_RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+_XYZ_TO_RGB = np.linalg.inv(_RGB_TO_XYZ)
+_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """(..., 3) uint8/float RGB in [0, 255] -> (..., 3) CIE Lab."""
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    lin = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    xyz = lin @ _RGB_TO_XYZ.T / _WHITE
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([
+        116 * f[..., 1] - 16,
+        500 * (f[..., 0] - f[..., 1]),
+        200 * (f[..., 1] - f[..., 2]),
+    ], axis=-1)
+
+
+def lab_to_rgb(lab: np.ndarray) -> np.ndarray:
+    """(..., 3) CIE Lab -> (..., 3) uint8 RGB."""
+    lab = np.asarray(lab, dtype=np.float64)
+    fy = (lab[..., 0] + 16) / 116
+    f = np.stack([fy + lab[..., 1] / 500, fy, fy - lab[..., 2] / 200], axis=-1)
+    xyz = np.where(f > 6 / 29, f ** 3, 3 * (6 / 29) ** 2 * (f - 4 / 29)) * _WHITE
+    lin = np.clip(xyz @ _XYZ_TO_RGB.T, 0, 1)
+    c = np.where(lin <= 0.0031308, 12.92 * lin, 1.055 * lin ** (1 / 2.4) - 0.055)
+    return np.clip(np.round(c * 255), 0, 255).astype(np.uint8)
+
+
+def _thumbnail(image: Image.Image) -> np.ndarray:
+    small = image.convert("RGB")
+    if max(small.size) > PALETTE_MAX_SIDE:
+        small = small.copy()
+        small.thumbnail((PALETTE_MAX_SIDE, PALETTE_MAX_SIDE))
+    return np.asarray(small)
+
+
+def _image_rng(pixels: np.ndarray, seed: int) -> np.random.Generator:
+    """RNG keyed by (seed, pixel digest): an image's palette never depends on the rest of the batch."""
+    digest = hashlib.blake2b(pixels.tobytes(), digest_size=8)
+    digest.update(np.asarray(pixels.shape, dtype=np.int64).tobytes())
+    return np.random.default_rng([seed, int.from_bytes(digest.digest(), "little")])
+
+
+def _sample_pixels(pixels: np.ndarray, sample_size: int, rng: np.random.Generator) -> np.ndarray:
+    pixels = pixels.reshape(-1, 3)
+    idx = rng.choice(len(pixels), size=sample_size, replace=len(pixels) < sample_size)
+    return pixels[idx]
+
+
+def _kmeans_pp_init(X: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """k-means++ seeding. X: (N, 3) -> (k, 3)."""
+    N = len(X)
+    centers = np.empty((k, 3))
+    centers[0] = X[rng.integers(0, N)]
+    d2 = ((X - centers[0]) ** 2).sum(-1)
+    for c in range(1, k):
+        cum = np.cumsum(d2)
+        if cum[-1] > 0:
+            pick = min(int((cum < rng.random() * cum[-1]).sum()), N - 1)
+        else:
+            # Degenerate (single-color) image: every distance is 0, pick uniformly
+            pick = rng.integers(0, N)
+        centers[c] = X[pick]
+        d2 = np.minimum(d2, ((X - centers[c]) ** 2).sum(-1))
+    return centers
+
+
+def _assign(X: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    d = ((X[:, None, :] - centers[None, :, :]) ** 2).sum(-1)
+    return d.argmin(-1)
+
+
+def _minibatch_kmeans(X: np.ndarray, k: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mini-batch k-means (Sculley 2010).
+    X: (N, 3) Lab samples -> centers (k, 3), weights (k,).
+    """
+    N = len(X)
+    centers = _kmeans_pp_init(X, k, rng)
+    counts = np.zeros(k)
+    m = min(_KMEANS_BATCH, N)
+
+    for _ in range(_KMEANS_ITERS):
+        batch = X[rng.choice(N, size=m, replace=False)]
+        onehot = np.eye(k)[_assign(batch, centers)]           # (m, k)
+        n = onehot.sum(axis=0)                                 # (k,)
+        counts += n
+        centers += (onehot.T @ batch - n[:, None] * centers) / np.maximum(counts, 1)[:, None]
+
+    weights = np.eye(k)[_assign(X, centers)].mean(axis=0)
+    return centers, weights
+
+
+def extract_palettes(
+    images: Sequence[Image.Image],
+    k: int = 5,
+    sample_size: int = PALETTE_SAMPLE_SIZE,
+    seed: int = 0,
+) -> List[Tuple[List[Tuple[int, int, int]], List[float]]]:
+    """
+    Palettes for many images. Returns, per image, (colors, weights) sorted
+    by weight (share of pixels), heaviest first. Empty clusters are dropped,
+    so flat images may return fewer than k colors.
+    Each image is clustered on its own with an RNG derived from (seed,
+    image pixels), so an image's palette doesn't depend on the batch it was
+    in or its position - required for the content-addressed palette cache.
+    """
+    results = []
+    for image in images:
+        pixels = _thumbnail(image)
+        rng = _image_rng(pixels, seed)
+        X = rgb_to_lab(_sample_pixels(pixels, sample_size, rng))
+        centers, weights = _minibatch_kmeans(X, k, rng)
+        rgb = lab_to_rgb(centers)
+
+        order = [i for i in np.argsort(-weights, kind="stable") if weights[i] > 0]
+        colors = [tuple(int(v) for v in rgb[i]) for i in order]
+        results.append((colors, [round(float(weights[i]), 4) for i in order]))
+    return results
+
+
+def extract_palette(
+    image: Image.Image,
+    k: int = 5,
+    sample_size: int = PALETTE_SAMPLE_SIZE,
+    seed: int = 0,
+) -> Tuple[List[Tuple[int, int, int]], List[float]]:
+    return extract_palettes([image], k=k, sample_size=sample_size, seed=seed)[0]
+
+
+def palette_distance(
+    colors_a: Sequence[Sequence[int]],
+    weights_a: Sequence[float],
+    colors_b: Sequence[Sequence[int]],
+    weights_b: Sequence[float],
+) -> float:
+    """
+    Symmetric weighted nearest-color distance in Lab (roughly Delta E units).
+    Cheap enough to run on stored palettes for continuity / color-match checks.
+    """
+    lab_a, lab_b = rgb_to_lab(np.asarray(colors_a)), rgb_to_lab(np.asarray(colors_b))
+    d = np.sqrt(((lab_a[:, None, :] - lab_b[None, :, :]) ** 2).sum(-1))
+    wa = np.asarray(weights_a) / np.sum(weights_a)
+    wb = np.asarray(weights_b) / np.sum(weights_b)
+    return float(0.5 * (wa @ d.min(axis=1) + wb @ d.min(axis=0)))
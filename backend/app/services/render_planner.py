@@ -0,0 +1,54 @@
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+
+CONTINUITY_DIR = "media/continuity"
+
+# (project_id, scene_id); scene_id None groups the shots without a scene
+ChainKey = Tuple[int, Optional[int]]
+
+
+def chain_key(shot: models.Shot) -> ChainKey:
+    return (shot.project_id, shot.scene_id)
+
+
+def last_frame_path(shot_id: int) -> str:
+    """Where a rendered shot's last frame is saved; the next shot in its chain uses it."""
+    return os.path.join(CONTINUITY_DIR, f"shot_{shot_id}_last_frame.jpg")
+
+
+def plan_render_chains(db: Session, project_id: int) -> List[List[models.Shot]]:
+    """
+    The project's render DAG as independent chains, one per scene (in scene
+    order), each listing its shots in shot order. A shot depends only on
+    the shot before it in the same chain, which supplies its flow frame;
+    different chains can render concurrently.
+    """
+    shots = (
+        db.query(models.Shot)
+        .outerjoin(models.Scene, models.Scene.id == models.Shot.scene_id)
+        .filter(models.Shot.project_id == project_id)
+        .order_by(models.Scene.index.asc(), models.Shot.index.asc())
+        .all()
+    )
+    chains: Dict[ChainKey, List[models.Shot]] = OrderedDict()
+    for shot in shots:
+        chains.setdefault(chain_key(shot), []).append(shot)
+    return list(chains.values())
+
+
+def previous_shot(db: Session, shot: models.Shot) -> Optional[models.Shot]:
+    """The shot this one depends on: its predecessor in the same scene chain."""
+    query = db.query(models.Shot).filter(
+        models.Shot.project_id == shot.project_id,
+        models.Shot.index < shot.index,
+    )
+    if shot.scene_id is None:
+        query = query.filter(models.Shot.scene_id.is_(None))
+    else:
+        query = query.filter(models.Shot.scene_id == shot.scene_id)
+    return query.order_by(models.Shot.index.desc()).first()
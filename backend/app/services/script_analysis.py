@@ -13,12 +13,8 @@ load_dotenv()
 
 # Choose your LLM provider
 USE_OPENAI = True  # Set to False to use Vertex AI Gemini
-
-if USE_OPENAI:
-    from openai import OpenAI
-else:
-    import vertexai
-    from vertexai.generative_models import GenerativeModel, SafetySetting
+# Provider SDKs are imported in ScriptAnalysisService.__init__, not at module
+# import, so loading the API doesn't pay for them.
 
 
 @dataclass
@@ -52,9 +48,14 @@ class ScriptAnalysisService:
 
     def __init__(self):
         if USE_OPENAI:
+            from openai import OpenAI
+
             self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         else:
+            import vertexai
+            from vertexai.generative_models import GenerativeModel
             from app.core.config import settings
+
             vertexai.init(
                 project=settings.GOOGLE_CLOUD_PROJECT_ID,
                 location=settings.GOOGLE_CLOUD_LOCATION
@@ -180,6 +181,8 @@ class ScriptAnalysisService:
 
     def _call_gemini(self, system_prompt: str, user_context: dict) -> dict:
         """Call Vertex AI Gemini for script breakdown."""
+        from vertexai.generative_models import SafetySetting
+
         try:
             response = self.model.generate_content(
                 contents=[
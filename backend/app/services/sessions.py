@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+
+# Seconds a session -> project mapping is trusted without touching the DB
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "300"))
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "50000"))
+
+# ContinuityState.session_id of projects created through the REST API. Chat
+# session IDs may not start with it, so an MCP session can't resolve to one.
+REST_SESSION_PREFIX = "rest:"
+
+
+def rest_session_id(project_id) -> str:
+    return f"{REST_SESSION_PREFIX}{project_id}"
+
+
+class SessionProjectCache:
+    """
+    Process-local TTL cache of chat session ID -> project ID, in front of the
+    unique, indexed ContinuityState.session_id column.
+    """
+
+    def __init__(self, ttl: float = SESSION_CACHE_TTL, max_entries: int = SESSION_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[int, float]] = {}
+
+    def get(self, session_id: str) -> Optional[int]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry and entry[1] > now:
+                self.hits += 1
+                return entry[0]
+            if entry:
+                del self._entries[session_id]
+            self.misses += 1
+            return None
+
+    def put(self, session_id: str, project_id: int):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # Drop expired entries, then the oldest half if still full
+                now = time.monotonic()
+                self._entries = {k: v for k, v in self._entries.items() if v[1] > now}
+                if len(self._entries) >= self.max_entries:
+                    keep = sorted(self._entries.items(), key=lambda kv: kv[1][1])[self.max_entries // 2:]
+                    self._entries = dict(keep)
+            self._entries[session_id] = (project_id, time.monotonic() + self.ttl)
+
+    def invalidate(self, session_id: str):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+
+session_projects = SessionProjectCache()
+
+
+def _lookup(db: Session, session_id: str) -> Optional[int]:
+    row = (
+        db.query(models.ContinuityState.project_id)
+        .filter(models.ContinuityState.session_id == session_id)
+        .first()
+    )
+    return row[0] if row else None
+
+
+def get_session_project(db: Session, session_id: str, create: bool = True) -> Optional[models.Project]:
+    """
+    The project backing a chat session, via ContinuityState.session_id.
+
+    With create=True a missing session gets its Project and ContinuityState
+    inserted together inside a savepoint and committed right away (so the
+    cached ID can't outlive a rolled-back insert; call this before making
+    other changes). If a concurrent call wins the race, the unique
+    session_id makes our insert fail; we roll back to the savepoint and use
+    the winner's project, so no duplicates are created.
+
+    Raises ValueError for IDs in the reserved REST_SESSION_PREFIX namespace.
+    """
+    if session_id.startswith(REST_SESSION_PREFIX):
+        raise ValueError(f"Session IDs starting with '{REST_SESSION_PREFIX}' are reserved")
+
+    project_id = session_projects.get(session_id)
+    if project_id is not None:
+        project = db.get(models.Project, project_id)
+        if project is not None:
+            return project
+        session_projects.invalidate(session_id)  # project was deleted
+
+    project_id = _lookup(db, session_id)
+    if project_id is None:
+        if not create:
+            return None
+        try:
+            with db.begin_nested():
+                project = models.Project(name=f"Chat {session_id}", description=f"Session: {session_id}")
+                db.add(project)
+                db.flush()
+                db.add(models.ContinuityState(project_id=project.id, session_id=session_id))
+                db.flush()
+                project_id = project.id
+            db.commit()
+        except IntegrityError:
+            project_id = _lookup(db, session_id)
+            if project_id is None:
+                raise
+
+    session_projects.put(session_id, project_id)
+    return db.get(models.Project, project_id)
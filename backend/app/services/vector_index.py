@@ -0,0 +1,250 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within a process
+    fcntl = None
+
+# Optional: approximate search graph. Falls back to exact brute force.
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "media/index")
+VECTOR_INDEX_HNSW = os.getenv("VECTOR_INDEX_HNSW", "0") == "1"
+
+
+class VectorIndex:
+    """
+    Cosine-similarity index over CLIP embeddings.
+
+    Rows are L2-normalized float32 vectors appended to `<name>.f32`, with the
+    owning IDs in `<name>.ids` (int64). Both files are memory-mapped, so a
+    reader (API / MCP process) sees rows appended by a writer (RQ worker)
+    on its next search without rebuilding anything. Writers in different
+    processes (RQ workers, MCP server, API) serialize on an flock over
+    `<name>.lock`, so appends to the two files never interleave.
+
+    `<name>.json` records the dimension and, when given, the embedding model
+    (e.g. "openai/clip-vit-base-patch32:onnx-int8"); adds and searches with
+    a different model are refused rather than compared across backends.
+
+    Search is an exact matrix-vector product by default. With
+    VECTOR_INDEX_HNSW=1 and hnswlib installed, an in-memory HNSW graph is
+    built on top of the mapped rows and used for approximate search.
+    """
+
+    def __init__(self, name: str, directory: str = VECTOR_INDEX_DIR, use_hnsw: bool = VECTOR_INDEX_HNSW):
+        self.vectors_path = os.path.join(directory, f"{name}.f32")
+        self.ids_path = os.path.join(directory, f"{name}.ids")
+        self.meta_path = os.path.join(directory, f"{name}.json")
+        self.lock_path = os.path.join(directory, f"{name}.lock")
+        self.use_hnsw = use_hnsw and hnswlib is not None
+
+        self._lock = threading.RLock()
+        self._dim: Optional[int] = None
+        self._model: Optional[str] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._ids: Optional[np.ndarray] = None
+        self._row_of = {}
+        self._rows = 0
+        self._inode: Optional[int] = None
+        self._hnsw = None
+
+    @contextmanager
+    def _write_lock(self):
+        """Exclusive across threads (RLock) and processes (flock on the lock file)."""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+            with open(self.lock_path, "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _reset(self):
+        self._dim = None
+        self._model = None
+        self._vectors = None
+        self._ids = None
+        self._row_of = {}
+        self._rows = 0
+        self._inode = None
+        self._hnsw = None
+
+    # -------------------------------------------------
+    # Loading
+    # -------------------------------------------------
+
+    def _read_dim(self) -> Optional[int]:
+        if self._dim is None and os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            self._dim = meta["dim"]
+            self._model = meta.get("model")  # absent in indexes built before it was recorded
+        return self._dim
+
+    def _check_model(self, model: Optional[str]):
+        if model and self._model and model != self._model:
+            raise ValueError(f"Index holds {self._model} embeddings, got {model}; rebuild it")
+
+    def _refresh(self):
+        """Re-map the files if another process appended rows."""
+        try:
+            inode = os.stat(self.ids_path).st_ino
+        except FileNotFoundError:
+            inode = None
+        if self._inode is not None and inode != self._inode:
+            self._reset()  # another process rebuilt the index: start over
+        dim = self._read_dim()
+        if dim is None or inode is None:
+            return
+        self._inode = inode
+
+        # Vectors are written before IDs, so the ID file bounds complete rows
+        rows = min(
+            os.path.getsize(self.ids_path) // 8,
+            os.path.getsize(self.vectors_path) // (4 * dim),
+        )
+        if rows == self._rows:
+            return
+
+        old_rows = self._rows
+        self._vectors = np.memmap(self.vectors_path, dtype="<f4", mode="r", shape=(rows, dim))
+        self._ids = np.memmap(self.ids_path, dtype="<i8", mode="r", shape=(rows,))
+        for row in range(old_rows, rows):
+            self._row_of[int(self._ids[row])] = row
+        self._rows = rows
+
+        if self.use_hnsw:
+            self._extend_hnsw(old_rows, rows)
+
+    def _extend_hnsw(self, start: int, end: int):
+        if self._hnsw is None:
+            self._hnsw = hnswlib.Index(space="ip", dim=self._dim)
+            self._hnsw.init_index(max_elements=max(1024, end * 2), ef_construction=200, M=16)
+        elif end > self._hnsw.get_max_elements():
+            self._hnsw.resize_index(end * 2)
+        if end > start:
+            self._hnsw.add_items(np.asarray(self._vectors[start:end]), np.arange(start, end))
+
+    # -------------------------------------------------
+    # Writes
+    # -------------------------------------------------
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype="<f4")
+        norm = np.linalg.norm(v)
+        return v / norm if norm > 0 else v
+
+    def add(self, item_id: int, vector: Sequence[float], model: Optional[str] = None):
+        """Insert or replace the vector for `item_id`, produced by `model`."""
+        with self._write_lock():
+            self._add_locked(item_id, vector, model)
+
+    def _add_locked(self, item_id: int, vector: Sequence[float], model: Optional[str]):
+        v = self._normalize(vector)
+        self._refresh()
+        if self._read_dim() is None:
+            # First vector: publish the dimension (and model) atomically
+            tmp_path = f"{self.meta_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"dim": int(v.shape[0]), "model": model}, f)
+            os.replace(tmp_path, self.meta_path)
+            self._dim = int(v.shape[0])
+            self._model = model
+        self._check_model(model)
+        if v.shape[0] != self._dim:
+            raise ValueError(f"Expected {self._dim}-d vector, got {v.shape[0]}")
+
+        row = self._row_of.get(item_id)
+        if row is not None:
+            # Re-extraction: overwrite the existing row in place
+            writable = np.memmap(self.vectors_path, dtype="<f4", mode="r+", shape=(self._rows, self._dim))
+            writable[row] = v
+            writable.flush()
+            if self._hnsw is not None:
+                self._hnsw.add_items(v[None, :], np.array([row]))
+            return
+
+        # Under the write lock, bytes past the last complete row can only be
+        # left over from a writer that died mid-append; drop them first
+        for path, size in ((self.vectors_path, self._rows * 4 * self._dim), (self.ids_path, self._rows * 8)):
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+        with open(self.vectors_path, "ab") as f:
+            f.write(v.tobytes())
+        with open(self.ids_path, "ab") as f:
+            f.write(np.array([item_id], dtype="<i8").tobytes())
+        self._refresh()
+
+    def rebuild(self, items: Iterable[Tuple[int, Sequence[float]]], model: Optional[str] = None):
+        """Replace the whole index, e.g. from embeddings already in the DB."""
+        with self._write_lock():
+            for path in (self.vectors_path, self.ids_path, self.meta_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._reset()
+            for item_id, vector in items:
+                self._add_locked(item_id, vector, model)
+
+    # -------------------------------------------------
+    # Queries
+    # -------------------------------------------------
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._rows
+
+    def search(
+        self, vector: Sequence[float], k: int = 5, exclude_ids: Iterable[int] = (), model: Optional[str] = None
+    ) -> List[Tuple[int, float]]:
+        """Return up to k (id, cosine similarity) pairs, best first. Raises ValueError on a model mismatch."""
+        q = self._normalize(vector)
+        exclude = set(exclude_ids)
+
+        with self._lock:
+            self._refresh()
+            if self._rows == 0:
+                return []
+            self._check_model(model)
+
+            want = min(self._rows, k + len(exclude))
+            if self._hnsw is not None:
+                self._hnsw.set_ef(max(50, want * 2))
+                labels, distances = self._hnsw.knn_query(q, k=want)
+                rows = labels[0]
+                scores = 1.0 - distances[0]  # hnswlib "ip" distance is 1 - dot
+            else:
+                all_scores = self._vectors @ q
+                rows = np.argpartition(-all_scores, want - 1)[:want]
+                rows = rows[np.argsort(-all_scores[rows])]
+                scores = all_scores[rows]
+
+            results = []
+            for row, score in zip(rows, scores):
+                item_id = int(self._ids[row])
+                # Skip rows superseded by a later append for the same id
+                if item_id in exclude or self._row_of.get(item_id) != row:
+                    continue
+                results.append((item_id, float(score)))
+                if len(results) == k:
+                    break
+            return results
+
+
+character_index = VectorIndex("characters")
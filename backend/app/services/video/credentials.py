@@ -0,0 +1,128 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
+
+# Refresh in the background once the token is this close to expiry...
+REFRESH_MARGIN = timedelta(minutes=5)
+# ...and block on a synchronous refresh only when it is this close (or expired)
+MIN_VALIDITY = timedelta(seconds=30)
+
+
+def _service_account_credentials(path: str):
+    from google.oauth2 import service_account
+
+    return service_account.Credentials.from_service_account_file(path, scopes=SCOPES)
+
+
+def _default_request():
+    import google.auth.transport.requests
+
+    return google.auth.transport.requests.Request()
+
+
+class CachedAccessToken:
+    """
+    Thread-safe OAuth2 access token cache for a service account.
+
+    The key file is read once. `get()` returns the cached token while it is
+    valid; inside REFRESH_MARGIN of expiry it starts a single background
+    refresh and keeps serving the current token, so callers only block when
+    there is no usable token at all.
+
+    `credentials_factory` / `request_factory` let tests point this at a fake
+    token endpoint.
+    """
+
+    def __init__(
+        self,
+        credentials_path: str,
+        credentials_factory: Callable = _service_account_credentials,
+        request_factory: Callable = _default_request,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ):
+        self.credentials_path = credentials_path
+        self._credentials_factory = credentials_factory
+        self._request_factory = request_factory
+        self._clock = clock
+
+        # _lock guards the token fields and is only held briefly; _refresh_lock
+        # serializes refreshes so the token endpoint is hit once at a time
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._credentials = None
+        self._token: Optional[str] = None
+        self._expiry: Optional[datetime] = None  # naive UTC, like google-auth
+        self._refreshing = False
+        self.refresh_count = 0
+
+    def _state(self) -> Tuple[Optional[str], timedelta]:
+        """The token and its remaining validity, read together under the lock."""
+        with self._lock:
+            if self._token is None or self._expiry is None:
+                return None, timedelta(0)
+            return self._token, self._expiry - self._clock()
+
+    def _refresh(self) -> str:
+        # Caller holds _refresh_lock; readers keep getting the current token
+        # while the request to the token endpoint is in flight
+        if self._credentials is None:
+            self._credentials = self._credentials_factory(self.credentials_path)
+        self._credentials.refresh(self._request_factory())
+        token = self._credentials.token
+        with self._lock:
+            self._token = token
+            self._expiry = self._credentials.expiry
+            self.refresh_count += 1
+        return token
+
+    def _background_refresh(self):
+        try:
+            with self._refresh_lock:
+                if self._state()[1] > REFRESH_MARGIN:
+                    return  # someone else already refreshed
+                self._refresh()
+        except Exception as e:
+            # The current token is still valid; the next get() will retry
+            print(f"[AUTH] Background token refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def get(self) -> str:
+        token, remaining = self._state()
+        if remaining > REFRESH_MARGIN:
+            return token
+
+        if remaining > MIN_VALIDITY:
+            with self._lock:
+                start = not self._refreshing
+                self._refreshing = True
+            if start:
+                threading.Thread(target=self._background_refresh, daemon=True).start()
+            return token
+
+        with self._refresh_lock:
+            token, remaining = self._state()
+            if remaining <= MIN_VALIDITY:
+                token = self._refresh()
+            return token
+
+    def invalidate(self):
+        """Drop the cached token, e.g. after the API answers 401."""
+        with self._lock:
+            self._token = None
+            self._expiry = None
+
+
+_caches: Dict[str, CachedAccessToken] = {}
+_caches_lock = threading.Lock()
+
+
+def get_access_token_cache(credentials_path: str) -> CachedAccessToken:
+    """One shared cache per key file for the whole process."""
+    with _caches_lock:
+        if credentials_path not in _caches:
+            _caches[credentials_path] = CachedAccessToken(credentials_path)
+        return _caches[credentials_path]
@@ -1,17 +1,16 @@
-import time
-import base64
+import io
 from typing import Any, Dict, List, Optional
 
-import requests
-from google.oauth2 import service_account
-import google.auth.transport.requests
-
 from app.core.config_video import (
     GOOGLE_CLOUD_PROJECT_ID,
     GOOGLE_CLOUD_LOCATION,
     VEO_MODEL_ID,
 )
 from app.services.video.base import BaseVideoService
+from app.services.video.credentials import get_access_token_cache
+from app.services.video import http_client
+from app.services.video.polling import PollSchedule
+from app.services.video.streaming import Destination, download_gcs, open_destination, write_base64
 
 
 class GoogleFlowVideoService(BaseVideoService):
@@ -22,30 +21,67 @@ class GoogleFlowVideoService(BaseVideoService):
     CREDENTIALS_PATH = "app/keys/veo.json"
 
     def _get_access_token(self) -> str:
-        """Generate OAuth2 access token via service account."""
-        scopes = ["https://www.googleapis.com/auth/cloud-platform"]
-        credentials = service_account.Credentials.from_service_account_file(
-            self.CREDENTIALS_PATH, scopes=scopes
+        """OAuth2 access token via service account, cached until near expiry."""
+        return get_access_token_cache(self.CREDENTIALS_PATH).get()
+
+    def _model_url(self, method: str) -> str:
+        return (
+            f"https://{GOOGLE_CLOUD_LOCATION}-aiplatform.googleapis.com/v1/"
+            f"projects/{GOOGLE_CLOUD_PROJECT_ID}/locations/{GOOGLE_CLOUD_LOCATION}"
+            f"/publishers/google/models/{VEO_MODEL_ID}:{method}"
         )
-        req = google.auth.transport.requests.Request()
-        credentials.refresh(req)
-        return credentials.token
 
-    def generate_video(self, prompt: str, num_frames: int = 60, reference_images=None, seed=None) -> bytes:
-        access_token = self._get_access_token()
+    def _headers(self) -> Dict[str, str]:
+        # Token is cached; re-read per call so renders outliving it stay authorised
+        return {
+            "Authorization": f"Bearer {self._get_access_token()}",
+            "Content-Type": "application/json",
+        }
+
+    def generate_video(
+        self,
+        prompt: str,
+        num_frames: int = 60,
+        reference_images=None,
+        seed=None,
+        poll_schedule: PollSchedule = None,
+    ) -> bytes:
+        """
+        Submit a Veo render and wait for it. `poll_schedule` controls polling
+        (deadline, cancellation); by default one is built for VEO_MODEL_ID.
+        """
+        operation_name = self.submit(prompt, reference_images=reference_images, seed=seed)
+        return self.video_from_operation(self.wait_for_operation(operation_name, poll_schedule))
+
+    def generate_video_to_file(
+        self,
+        prompt: str,
+        dest: Destination,
+        num_frames: int = 60,
+        reference_images=None,
+        seed=None,
+        poll_schedule: PollSchedule = None,
+    ) -> int:
+        """Like generate_video, but streams the result to `dest`; returns its size."""
+        operation_name = self.submit(prompt, reference_images=reference_images, seed=seed)
+        poll_data = self.wait_for_operation(operation_name, poll_schedule)
+        return self.save_video_from_operation(poll_data, dest)
+
+    def wait_for_operation(self, operation_name: str, poll_schedule: PollSchedule = None) -> Dict[str, Any]:
+        schedule = poll_schedule or PollSchedule(VEO_MODEL_ID)
+        for _ in schedule:
+            poll_data = self.fetch_operation(operation_name)
+            if poll_data.get("done"):
+                schedule.completed()
+                return poll_data
 
+    def submit(self, prompt: str, reference_images=None, seed=None) -> str:
+        """STEP 1 — Submit predictLongRunning request; returns the operation name."""
         # Veo 2 models only support 720p, Veo 3 supports 1080p
         resolution = "720p" if VEO_MODEL_ID.startswith("veo-2") else "1080p"
         sample_count = 1
 
-        # -----------------------------------------------------
-        # STEP 1 — Submit predictLongRunning request
-        # -----------------------------------------------------
-        url = (
-            f"https://{GOOGLE_CLOUD_LOCATION}-aiplatform.googleapis.com/v1/"
-            f"projects/{GOOGLE_CLOUD_PROJECT_ID}/locations/{GOOGLE_CLOUD_LOCATION}"
-            f"/publishers/google/models/{VEO_MODEL_ID}:predictLongRunning"
-        )
+        url = self._model_url("predictLongRunning")
 
         # Build parameters
         params: Dict[str, Any] = {
@@ -74,14 +110,15 @@ class GoogleFlowVideoService(BaseVideoService):
         if reference_images:
             print(f"  - referenceImages count: {len(reference_images)}")
 
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json",
-        }
-
-        resp = requests.post(url, headers=headers, json=payload)
+        # Not idempotent: a retried submit after a read timeout could start a second render
+        resp = http_client.request(
+            "POST", url, "veo.predictLongRunning",
+            retry=http_client.RETRY_NOT_SENT, headers=self._headers(), json=payload,
+        )
 
         print(f"DEBUG google_flow: Response status: {resp.status_code}")
+        if resp.status_code == 401:
+            get_access_token_cache(self.CREDENTIALS_PATH).invalidate()
         if resp.status_code != 200:
             print(f"DEBUG google_flow: Error response: {resp.text}")
             raise Exception(f"Veo LRO error: {resp.status_code} - {resp.text}")
@@ -90,85 +127,59 @@ class GoogleFlowVideoService(BaseVideoService):
         operation_name = data.get("name")
         if not operation_name:
             raise Exception(f"No operation name returned: {resp.text}")
-
-        # -----------------------------------------------------
-        # STEP 2 — Poll using :fetchPredictOperation endpoint
-        # Reference: https://docs.cloud.google.com/vertex-ai/generative-ai/docs/video/generate-videos-from-text#rest
-        # -----------------------------------------------------
-        fetch_url = (
-            f"https://{GOOGLE_CLOUD_LOCATION}-aiplatform.googleapis.com/v1/"
-            f"projects/{GOOGLE_CLOUD_PROJECT_ID}/locations/{GOOGLE_CLOUD_LOCATION}"
-            f"/publishers/google/models/{VEO_MODEL_ID}:fetchPredictOperation"
+        return operation_name
+
+    def fetch_operation(self, operation_name: str) -> Dict[str, Any]:
+        """
+        STEP 2 — Poll once using the :fetchPredictOperation endpoint.
+        Reference: https://docs.cloud.google.com/vertex-ai/generative-ai/docs/video/generate-videos-from-text#rest
+        """
+        poll_resp = http_client.request(
+            "POST",
+            self._model_url("fetchPredictOperation"),
+            "veo.fetchPredictOperation",
+            headers=self._headers(),
+            json={"operationName": operation_name},
         )
-        
-        fetch_payload = {"operationName": operation_name}
 
-        while True:
-            poll_resp = requests.post(fetch_url, headers=headers, json=fetch_payload)
-
-            if poll_resp.status_code != 200:
-                raise Exception(
-                    f"Failed to poll Veo operation: {poll_resp.status_code} - {poll_resp.text}"
-                )
-
-            poll_data = poll_resp.json()
-
-            if poll_data.get("done"):
-                break
-
-            time.sleep(5)  # delay between polls
+        if poll_resp.status_code != 200:
+            raise Exception(
+                f"Failed to poll Veo operation: {poll_resp.status_code} - {poll_resp.text}"
+            )
+
+        return poll_resp.json()
+
+    def video_from_operation(self, poll_data: Dict[str, Any]) -> bytes:
+        """Whole video in memory; prefer save_video_from_operation for renders."""
+        buf = io.BytesIO()
+        self.save_video_from_operation(poll_data, buf)
+        return buf.getvalue()
+
+    def save_video_from_operation(self, poll_data: Dict[str, Any], dest: Destination) -> int:
+        """
+        STEP 3 — Write the finished operation's video to `dest` (path or binary
+        file object) without buffering it: inline base64 is decoded in slices,
+        gcsUri results are downloaded in ranged chunks. Returns bytes written.
+        """
+        video = self._video_entry(poll_data)
+        if "bytesBase64Encoded" not in video and "gcsUri" not in video:
+            raise Exception(f"Unknown Veo response format: {video}")
+
+        with open_destination(dest) as f:
+            if "bytesBase64Encoded" in video:
+                return write_base64(video["bytesBase64Encoded"], f)
+            return download_gcs(video["gcsUri"], f, GOOGLE_CLOUD_PROJECT_ID)
 
-        # -----------------------------------------------------
-        # STEP 3 — Extract predictions from completed operation
-        # -----------------------------------------------------
+    def _video_entry(self, poll_data: Dict[str, Any]) -> Dict[str, Any]:
         response = poll_data.get("response", {})
-        
+
         # Check for videos (new Veo API format)
         videos = response.get("videos", [])
         if videos:
-            video = videos[0]
-            if "bytesBase64Encoded" in video:
-                return base64.b64decode(video["bytesBase64Encoded"])
-            if "gcsUri" in video:
-                from google.cloud import storage
-                uri = video["gcsUri"]
-                if not uri.startswith("gs://"):
-                    raise Exception(f"Invalid gcsUri: {uri}")
-                _, bucket, *path_parts = uri.split("/")
-                blob_path = "/".join(path_parts)
-                client = storage.Client(project=GOOGLE_CLOUD_PROJECT_ID)
-                blob = client.bucket(bucket).blob(blob_path)
-                return blob.download_as_bytes()
-        
+            return videos[0]
+
         # Fallback: check for predictions (old format)
         predictions = response.get("predictions", [])
         if not predictions:
             raise Exception(f"No videos or predictions found: {poll_data}")
-
-        pred = predictions[0]
-
-        # -----------------------------------------------------
-        # STEP 4 — Extract inline base64 video if available
-        # -----------------------------------------------------
-        if "bytesBase64Encoded" in pred:
-            return base64.b64decode(pred["bytesBase64Encoded"])
-
-        # -----------------------------------------------------
-        # STEP 5 — Fallback: download from GCS
-        # -----------------------------------------------------
-        if "gcsUri" in pred:
-            uri = pred["gcsUri"]
-
-            from google.cloud import storage
-
-            if not uri.startswith("gs://"):
-                raise Exception(f"Invalid gcsUri: {uri}")
-
-            _, bucket, *path_parts = uri.split("/")
-            blob_path = "/".join(path_parts)
-
-            client = storage.Client(project=GOOGLE_CLOUD_PROJECT_ID)
-            blob = client.bucket(bucket).blob(blob_path)
-            return blob.download_as_bytes()
-
-        raise Exception(f"Unknown Veo response format: {pred}")
+        return predictions[0]
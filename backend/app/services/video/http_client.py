@@ -0,0 +1,205 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+# Connection pool per host; raise for workers driving many renders concurrently
+VEO_HTTP_POOL_SIZE = int(os.getenv("VEO_HTTP_POOL_SIZE", "10"))
+VEO_HTTP_MAX_RETRIES = int(os.getenv("VEO_HTTP_MAX_RETRIES", "5"))
+VEO_HTTP_BACKOFF_BASE = float(os.getenv("VEO_HTTP_BACKOFF_BASE", "0.5"))   # seconds
+VEO_HTTP_BACKOFF_MAX = float(os.getenv("VEO_HTTP_BACKOFF_MAX", "30"))      # seconds
+VEO_HTTP_TIMEOUT = (10, 120)  # (connect, read) seconds
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    What request() may retry. `statuses` are retried responses;
+    `ambiguous_errors` allows retrying read timeouts / dropped connections,
+    where the server may already have acted on the request.
+    """
+    statuses: FrozenSet[int]
+    ambiguous_errors: bool
+
+
+# Polls and other reads: safe to repeat
+RETRY_IDEMPOTENT = RetryPolicy(statuses=frozenset(RETRY_STATUSES), ambiguous_errors=True)
+# predictLongRunning starts a (paid) render: only retry when the request
+# provably wasn't accepted - never connected, or rate limited
+RETRY_NOT_SENT = RetryPolicy(statuses=frozenset({429}), ambiguous_errors=False)
+
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Process-wide keep-alive session, so polls reuse one TLS connection
+    instead of handshaking per request. Recreated after fork.
+    """
+    global _session, _session_pid
+
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=VEO_HTTP_POOL_SIZE,
+                pool_maxsize=VEO_HTTP_POOL_SIZE,
+                max_retries=0,  # retries are handled (with jitter) in request()
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+            _session_pid = os.getpid()
+        return _session
+
+
+class RequestMetrics:
+    """
+    Per-endpoint latency / retry counters for outbound HTTP calls. Counts
+    are also summed in Redis so GET /render/http/stats covers every worker.
+    """
+
+    REDIS_KEY = "http_metrics:stats"
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._window = window
+        self._stats: Dict[str, dict] = {}
+
+    def record(self, name: str, seconds: float, status: Optional[int], retried: bool):
+        with self._lock:
+            s = self._stats.setdefault(name, {
+                "count": 0, "errors": 0, "retries": 0, "total_s": 0.0, "max_s": 0.0,
+                "recent": deque(maxlen=self._window),
+            })
+            s["count"] += 1
+            s["total_s"] += seconds
+            s["max_s"] = max(s["max_s"], seconds)
+            s["recent"].append(seconds)
+            if retried:
+                s["retries"] += 1
+            if status is None or status >= 400:
+                s["errors"] += 1
+        try:
+            from app.core.redis import redis_client
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.hincrby(self.REDIS_KEY, f"{name}:count", 1)
+            pipe.hincrbyfloat(self.REDIS_KEY, f"{name}:total_ms", 1000 * seconds)
+            if retried:
+                pipe.hincrby(self.REDIS_KEY, f"{name}:retries", 1)
+            if status is None or status >= 400:
+                pipe.hincrby(self.REDIS_KEY, f"{name}:errors", 1)
+            pipe.execute()
+        except Exception:
+            pass
+
+    def shared_snapshot(self) -> Dict[str, dict]:
+        """Counters summed over all processes (empty if Redis is down)."""
+        try:
+            from app.core.redis import redis_client
+            raw = redis_client.hgetall(self.REDIS_KEY)
+        except Exception:
+            return {}
+        out: Dict[str, dict] = {}
+        for key, value in raw.items():
+            key = key.decode() if isinstance(key, bytes) else key
+            name, _, field = key.rpartition(":")
+            out.setdefault(name, {"count": 0, "errors": 0, "retries": 0, "total_ms": 0.0})[field] = float(value)
+        for s in out.values():
+            s["mean_ms"] = s["total_ms"] / s["count"] if s["count"] else 0.0
+            for field in ("count", "errors", "retries"):
+                s[field] = int(s[field])
+        return out
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            out = {}
+            for name, s in self._stats.items():
+                recent = sorted(s["recent"])
+                out[name] = {
+                    "count": s["count"],
+                    "errors": s["errors"],
+                    "retries": s["retries"],
+                    "mean_ms": 1000 * s["total_s"] / s["count"],
+                    "p50_ms": 1000 * recent[len(recent) // 2],
+                    "p95_ms": 1000 * recent[min(len(recent) - 1, int(len(recent) * 0.95))],
+                    "max_ms": 1000 * s["max_s"],
+                }
+            return out
+
+
+metrics = RequestMetrics()
+
+
+def _backoff(attempt: int, retry_after: Optional[str]) -> float:
+    if retry_after:
+        try:
+            return min(float(retry_after), VEO_HTTP_BACKOFF_MAX)
+        except ValueError:
+            pass  # HTTP-date form; fall through to computed backoff
+    # "Full jitter": uniform over [0, base * 2^attempt], capped
+    return random.uniform(0, min(VEO_HTTP_BACKOFF_MAX, VEO_HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+
+def _never_sent(e: requests.RequestException) -> bool:
+    """True if the request provably never reached the server."""
+    if isinstance(e, requests.ConnectTimeout):
+        return True
+    reason = getattr(e.args[0], "reason", None) if e.args else None
+    return isinstance(reason, NewConnectionError)  # incl. DNS failures
+
+
+def request(
+    method: str,
+    url: str,
+    name: str,
+    max_retries: int = VEO_HTTP_MAX_RETRIES,
+    retry: RetryPolicy = RETRY_IDEMPOTENT,
+    **kwargs,
+) -> requests.Response:
+    """
+    Send a request on the shared session, retrying per `retry` with
+    jittered exponential backoff: by default 429/5xx and connection errors;
+    non-idempotent calls pass RETRY_NOT_SENT. `name` labels the metrics.
+    The last response (or exception) is returned/raised once retries run out.
+    """
+    kwargs.setdefault("timeout", VEO_HTTP_TIMEOUT)
+    session = get_session()
+
+    for attempt in range(max_retries + 1):
+        start = time.perf_counter()
+        try:
+            resp = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            metrics.record(name, time.perf_counter() - start, None, attempt > 0)
+            if attempt == max_retries or not (retry.ambiguous_errors or _never_sent(e)):
+                raise
+            delay = _backoff(attempt, None)
+            print(f"[HTTP] {name}: {type(e).__name__}, retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+
+        metrics.record(name, time.perf_counter() - start, resp.status_code, attempt > 0)
+        if resp.status_code not in retry.statuses or attempt == max_retries:
+            return resp
+
+        delay = _backoff(attempt, resp.headers.get("Retry-After"))
+        print(f"[HTTP] {name}: {resp.status_code}, retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+        time.sleep(delay)
+
+    return resp
+
+
+def http_metrics() -> Dict[str, Any]:
+    return {"this_process": metrics.snapshot(), "all_workers": metrics.shared_snapshot()}
@@ -0,0 +1,190 @@
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, Iterator, Optional
+
+# Hard ceiling for one operation; hung renders fail instead of pinning a worker
+VEO_POLL_DEADLINE = float(os.getenv("VEO_POLL_DEADLINE", "900"))       # seconds
+VEO_POLL_MIN_INTERVAL = float(os.getenv("VEO_POLL_MIN_INTERVAL", "2"))  # seconds
+VEO_POLL_MAX_INTERVAL = float(os.getenv("VEO_POLL_MAX_INTERVAL", "30"))  # seconds
+VEO_POLL_BACKOFF = 1.5
+
+# First-poll delay before any history exists, by model prefix
+DEFAULT_EXPECTED_SECONDS = {
+    "veo-2": 45.0,
+    "veo-3": 60.0,
+}
+FALLBACK_EXPECTED_SECONDS = 30.0
+
+HISTORY_SIZE = 50
+# Wait for this quantile of past completion times before the first poll
+FIRST_POLL_QUANTILE = 0.2
+
+
+class OperationTimeout(Exception):
+    """The long-running operation did not finish before its deadline."""
+
+
+class OperationCancelled(Exception):
+    """Polling was cancelled by the caller."""
+
+
+class CompletionHistory:
+    """
+    Recent completion times per model. Kept in-process and, when Redis is
+    reachable, shared across workers so a fresh worker starts calibrated.
+
+    A completion time is only known to lie between the last poll that saw
+    the operation pending and the poll that saw it done; PollSchedule
+    records the midpoint. Recording the done poll itself would bias every
+    sample up by the polling gap, and the first-poll delay could then only
+    ever grow.
+    """
+
+    REDIS_KEY = "veo:completion_seconds:{model}"
+
+    def __init__(self, size: int = HISTORY_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._local: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.size))
+        self._loaded = set()
+
+    def _redis(self):
+        try:
+            from app.core.redis import redis_client
+            return redis_client
+        except Exception:
+            return None
+
+    def _load(self, model: str):
+        if model in self._loaded:
+            return
+        self._loaded.add(model)
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            values = client.lrange(self.REDIS_KEY.format(model=model), 0, self.size - 1)
+            self._local[model].extend(float(v) for v in reversed(values))
+        except Exception as e:
+            print(f"[POLL] Could not load completion history for {model}: {e}")
+
+    def record(self, model: str, seconds: float):
+        with self._lock:
+            self._load(model)
+            self._local[model].append(seconds)
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            key = self.REDIS_KEY.format(model=model)
+            pipe = client.pipeline()
+            pipe.lpush(key, f"{seconds:.1f}")
+            pipe.ltrim(key, 0, self.size - 1)
+            pipe.execute()
+        except Exception as e:
+            print(f"[POLL] Could not save completion time for {model}: {e}")
+
+    def expected_first_poll(self, model: str) -> float:
+        with self._lock:
+            self._load(model)
+            samples = sorted(self._local[model])
+        if samples:
+            return samples[int(len(samples) * FIRST_POLL_QUANTILE)]
+        for prefix, seconds in DEFAULT_EXPECTED_SECONDS.items():
+            if model.startswith(prefix):
+                return seconds
+        return FALLBACK_EXPECTED_SECONDS
+
+
+completion_history = CompletionHistory()
+
+
+class PollSchedule:
+    """
+    Polling strategy for one long-running operation.
+
+    Iterating sleeps and then yields the attempt number: the first wait is
+    the model's typical early completion time, later waits grow by
+    VEO_POLL_BACKOFF from min_interval up to max_interval. Raises
+    OperationTimeout past the deadline and OperationCancelled as soon as
+    `cancel_event` is set. Call `completed()` when the operation is done so
+    the model's history learns from it. Callers that schedule polls
+    themselves call `poll_started()` as each poll goes out.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        deadline_seconds: float = VEO_POLL_DEADLINE,
+        min_interval: float = VEO_POLL_MIN_INTERVAL,
+        max_interval: float = VEO_POLL_MAX_INTERVAL,
+        backoff: float = VEO_POLL_BACKOFF,
+        cancel_event: Optional[threading.Event] = None,
+        history: CompletionHistory = completion_history,
+    ):
+        self.model = model
+        self.deadline_seconds = deadline_seconds
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.cancel_event = cancel_event or threading.Event()
+        self.history = history
+        self.started_at = time.monotonic()
+        self.polls = 0
+        self._delay_iter = None
+        # elapsed() at the latest poll and at the one before it
+        self._poll_at = 0.0
+        self._pending_at = 0.0
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def _delays(self) -> Iterator[float]:
+        yield max(self.min_interval, self.history.expected_first_poll(self.model))
+        interval = self.min_interval
+        while True:
+            yield interval
+            interval = min(self.max_interval, interval * self.backoff)
+
+    def next_delay(self) -> float:
+        """
+        Seconds to wait before the next poll, without sleeping (for callers
+        that schedule polls themselves, e.g. the async render executor).
+        Raises OperationTimeout once the deadline has passed.
+        """
+        if self._delay_iter is None:
+            self._delay_iter = self._delays()
+        remaining = self.deadline_seconds - self.elapsed()
+        if remaining <= 0:
+            raise OperationTimeout(
+                f"{self.model} operation not done after {self.elapsed():.0f}s ({self.polls} polls)"
+            )
+        return min(next(self._delay_iter), remaining)
+
+    def __iter__(self) -> Iterator[int]:
+        while True:
+            if self.cancel_event.wait(self.next_delay()):
+                raise OperationCancelled(f"{self.model} polling cancelled after {self.polls} polls")
+            yield self.poll_started()
+
+    def poll_started(self) -> int:
+        """Note that a poll is going out now. Returns its attempt number."""
+        self._pending_at = self._poll_at
+        self._poll_at = self.elapsed()
+        self.polls += 1
+        return self.polls
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def completed(self):
+        """The latest poll saw the operation done; record when it likely finished."""
+        done_at = self._poll_at if self.polls else self.elapsed()
+        estimate = (self._pending_at + done_at) / 2
+        self.history.record(self.model, estimate)
+        print(
+            f"[POLL] {self.model} finished in ~{estimate:.0f}s "
+            f"({self._pending_at:.0f}-{done_at:.0f}s, {self.polls} polls)"
+        )
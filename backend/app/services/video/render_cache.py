@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.services.video.streaming import Destination, open_destination, part_path
+
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", "media/cache/renders")
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(20 * 1024 ** 3)))
+# Set RENDER_CACHE=0 to always call Veo. To re-roll one project's shots,
+# queue the render with use_cache=false instead.
+RENDER_CACHE_ENABLED = os.getenv("RENDER_CACHE", "1") != "0"
+# Other workers on the host store and evict too; re-walk the directory for
+# the true size this often
+SIZE_RESYNC_SECONDS = 300.0
+# Eviction frees down to this fraction of max_bytes
+EVICT_TO = 0.9
+
+# Bump when the request -> video mapping changes in a way the fields below miss
+FINGERPRINT_VERSION = 1
+
+
+def render_fingerprint(request: Dict[str, Any], model_id: str) -> str:
+    """
+    Deterministic SHA-256 of everything that decides a Veo render: model,
+    final prompt, seed and each reference image (content hash, type, weight).
+    `request` is the dict ContinuityEngine.build_request returns.
+    """
+    references = []
+    for ref in request.get("reference_images") or []:
+        image = ref.get("image", {})
+        references.append({
+            "type": ref.get("referenceType"),
+            "weight": ref.get("weight"),
+            "mime": image.get("mimeType"),
+            "sha256": hashlib.sha256((image.get("bytesBase64Encoded") or "").encode()).hexdigest(),
+        })
+    canonical = json.dumps(
+        {
+            "v": FINGERPRINT_VERSION,
+            "model": model_id,
+            "prompt": request.get("prompt"),
+            "seed": request.get("seed"),
+            "references": references,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class RenderCache:
+    """
+    Content-addressed store of finished renders: <dir>/<fp[:2]>/<fp>.mp4.
+
+    Files are shared by every worker on the host. Hits are hard-linked into
+    place when possible (outputs are only ever replaced by rename, never
+    rewritten in place, so sharing the inode is safe). Total size is kept
+    under max_bytes by evicting the least recently used videos; the size is
+    a running total, re-walked every SIZE_RESYNC_SECONDS and before evicting,
+    so storing a render doesn't scan the whole directory. Hit/miss
+    counts are kept per process and, when Redis is reachable, across workers.
+    """
+
+    REDIS_KEY = "render_cache:stats"
+
+    def __init__(self, directory: str = RENDER_CACHE_DIR, max_bytes: int = RENDER_CACHE_MAX_BYTES, enabled: bool = RENDER_CACHE_ENABLED):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total: Optional[int] = None  # bytes, as of the last walk plus our own stores
+        self._files = 0
+        self._synced_at = 0.0
+
+    def path_for(self, fingerprint: str) -> str:
+        return os.path.join(self.directory, fingerprint[:2], f"{fingerprint}.mp4")
+
+    def _count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+        try:
+            from app.core.redis import redis_client
+            redis_client.hincrby(self.REDIS_KEY, field, 1)
+        except Exception:
+            pass
+
+    def lookup(self, fingerprint: str) -> Optional[str]:
+        """Path of the cached video for `fingerprint`, or None (counted as a miss)."""
+        if not self.enabled:
+            return None
+        path = self.path_for(fingerprint)
+        if not os.path.exists(path):
+            self._count("misses")
+            return None
+        try:
+            os.utime(path)  # LRU clock
+        except OSError:
+            pass
+        self._count("hits")
+        return path
+
+    def fetch(self, fingerprint: str, dest: Destination) -> Optional[int]:
+        """Copy a cached render to `dest`. Returns its size, or None on a miss."""
+        cached = self.lookup(fingerprint)
+        if cached is None:
+            return None
+        if not hasattr(dest, "write"):
+            dest_path = os.fspath(dest)
+            os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+            tmp_path = part_path(dest_path)
+            try:
+                os.link(cached, tmp_path)
+                os.replace(tmp_path, dest_path)
+                return os.path.getsize(dest_path)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        with open_destination(dest) as out, open(cached, "rb") as src:
+            shutil.copyfileobj(src, out)
+            return os.path.getsize(cached)
+
+    def store(self, fingerprint: str, video_path: str) -> None:
+        """Add a finished render. Failures are logged, never raised."""
+        if not self.enabled:
+            return
+        path = self.path_for(fingerprint)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = part_path(path)
+            try:
+                os.link(video_path, tmp_path)
+            except OSError:
+                shutil.copyfile(video_path, tmp_path)
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = None
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._sync_if_stale()
+                self._total += size - (replaced or 0)
+                self._files += replaced is None
+                if self._total > self.max_bytes:
+                    self._evict()
+        except Exception as e:
+            print(f"[RENDER CACHE] Could not store {fingerprint[:12]}: {e}")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".mp4"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    def _sync(self, entries=None) -> None:
+        entries = list(self._entries()) if entries is None else entries
+        self._total = sum(size for _, size, _ in entries)
+        self._files = len(entries)
+        self._synced_at = time.monotonic()
+
+    def _sync_if_stale(self) -> None:
+        if self._total is None or time.monotonic() - self._synced_at > SIZE_RESYNC_SECONDS:
+            self._sync()
+
+    def _evict(self) -> None:
+        # Exact sizes first: other workers may already have evicted
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        self._sync(entries)
+        if self._total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * EVICT_TO)
+        for path, size, _ in entries:
+            if self._total <= target:
+                break
+            try:
+                os.remove(path)
+                self._total -= size
+                self._files -= 1
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._sync_if_stale()
+            total, files = self._total, self._files
+        lookups = self.hits + self.misses
+        stats = {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": files,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+        }
+        try:
+            from app.core.redis import redis_client
+            shared = {k.decode() if isinstance(k, bytes) else k: int(v) for k, v in redis_client.hgetall(self.REDIS_KEY).items()}
+            shared_lookups = shared.get("hits", 0) + shared.get("misses", 0)
+            stats["all_workers"] = {
+                "hits": shared.get("hits", 0),
+                "misses": shared.get("misses", 0),
+                "hit_rate": shared.get("hits", 0) / shared_lookups if shared_lookups else 0.0,
+            }
+        except Exception:
+            pass
+        return stats
+
+
+render_cache = RenderCache()
@@ -0,0 +1,103 @@
+import base64
+import binascii
+import os
+import threading
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Tuple, Union
+
+# Base64 characters decoded per step (multiple of 4) -> ~3 MiB of video per write
+BASE64_CHUNK_CHARS = 4 * 1024 * 1024
+# GCS ranged-download chunk; must be a multiple of 256 KiB
+VEO_DOWNLOAD_CHUNK_BYTES = int(os.getenv("VEO_DOWNLOAD_CHUNK_BYTES", str(8 * 1024 * 1024)))
+
+Destination = Union[str, os.PathLike, BinaryIO]
+
+
+class Base64StreamDecoder:
+    """
+    Incremental base64 decoder: feed text in pieces of any size, decoded
+    bytes go straight to `fileobj`. Only an incomplete 4-char group is held
+    back between writes.
+    """
+
+    def __init__(self, fileobj: BinaryIO):
+        self.fileobj = fileobj
+        self.bytes_written = 0
+        self._pending = ""
+
+    def write(self, text: str):
+        text = self._pending + text
+        cut = len(text) - len(text) % 4
+        self._pending = text[cut:]
+        if cut:
+            self._emit(text[:cut])
+
+    def close(self) -> int:
+        if self._pending.strip("="):
+            raise binascii.Error(f"Truncated base64 input ({len(self._pending)} trailing chars)")
+        self._pending = ""
+        return self.bytes_written
+
+    def _emit(self, text: str):
+        data = base64.b64decode(text, validate=True)
+        self.fileobj.write(data)
+        self.bytes_written += len(data)
+
+
+def write_base64(text: str, fileobj: BinaryIO, chunk_chars: int = BASE64_CHUNK_CHARS) -> int:
+    """Decode a (large) base64 string into `fileobj` one slice at a time."""
+    decoder = Base64StreamDecoder(fileobj)
+    for start in range(0, len(text), chunk_chars):
+        decoder.write(text[start:start + chunk_chars])
+    return decoder.close()
+
+
+def parse_gcs_uri(uri: str) -> Tuple[str, str]:
+    """'gs://bucket/path/to/obj' -> ('bucket', 'path/to/obj')."""
+    if not uri.startswith("gs://"):
+        raise Exception(f"Invalid gcsUri: {uri}")
+    bucket, _, blob_path = uri[len("gs://"):].partition("/")
+    if not bucket or not blob_path:
+        raise Exception(f"Invalid gcsUri: {uri}")
+    return bucket, blob_path
+
+
+def download_gcs(uri: str, fileobj: BinaryIO, project: str, chunk_size: int = VEO_DOWNLOAD_CHUNK_BYTES) -> int:
+    """Stream a GCS object into `fileobj` in ranged chunks of `chunk_size`."""
+    from google.cloud import storage
+
+    bucket, blob_path = parse_gcs_uri(uri)
+    client = storage.Client(project=project)
+    blob = client.bucket(bucket).blob(blob_path, chunk_size=chunk_size)
+    start = fileobj.tell()
+    blob.download_to_file(fileobj)
+    return fileobj.tell() - start
+
+
+def part_path(path: str) -> str:
+    """Temporary sibling of `path`, unique to this process and thread."""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+
+
+@contextmanager
+def open_destination(dest: Destination) -> Iterator[BinaryIO]:
+    """
+    Yield a writable binary file for `dest`. Paths are written to a `.part`
+    sibling and renamed into place on success, so readers never see a
+    half-written video and concurrent writers of one path don't clobber
+    each other's partial files; file objects are used as-is and left open.
+    """
+    if hasattr(dest, "write"):
+        yield dest
+        return
+
+    path = os.fspath(dest)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = part_path(path)
+    try:
+        with open(tmp_path, "wb") as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
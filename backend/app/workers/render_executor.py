@@ -0,0 +1,434 @@
+"""
+Async render executor: one process drives many Veo renders at once.
+
+Instead of an RQ worker sleeping through each render's poll loop, this
+submits predictLongRunning requests and tracks every outstanding operation
+in one asyncio event loop, polling whichever are due on a small thread
+pool. Each RenderJob row is completed as soon as its operation finishes.
+
+Shots of one scene are rendered one at a time, because each shot uses the
+previous shot's last frame as its flow reference; different scenes (and
+projects) render concurrently. The claim itself enforces this in SQL, so
+several executors can share one database: on SQLite the single writer
+serializes claims, on Postgres a per-chain advisory lock does (at READ
+COMMITTED two executors could otherwise both see the chain idle). Other
+databases are only safe with a single executor.
+
+In-flight jobs get their updated_at touched every HEARTBEAT_INTERVAL. On
+startup, running jobs older than RENDER_EXECUTOR_STALE_AFTER are taken to
+belong to a dead executor: ones already submitted to Veo are polled again,
+the rest go back to pending.
+
+Enable with RENDER_EXECUTOR=async (the API then leaves jobs pending in the
+DB instead of enqueueing RQ tasks) and run, from backend/:
+    python -m app.workers.render_executor
+"""
+
+import asyncio
+import json
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import aliased
+
+from app import models
+from app.core.config_video import VEO_MODEL_ID
+from app.db.session import SessionLocal
+from app.services.render_planner import ChainKey, chain_key
+from app.services.video.polling import PollSchedule
+from app.services.video.render_cache import render_cache
+from app.workers.tasks import (
+    fail_render_job,
+    finish_shot_render,
+    get_continuity_engine,
+    prepare_shot_render,
+    render_uses_cache,
+    shot_output_path,
+)
+
+RENDER_EXECUTOR_MAX_IN_FLIGHT = int(os.getenv("RENDER_EXECUTOR_MAX_IN_FLIGHT", "200"))
+# Threads for blocking HTTP / DB work; bounds concurrent polls and submits
+RENDER_EXECUTOR_THREADS = int(os.getenv("RENDER_EXECUTOR_THREADS", "16"))
+CLAIM_INTERVAL = 2.0  # seconds between scans for new pending jobs
+HEARTBEAT_INTERVAL = 60.0  # seconds between updated_at touches of in-flight jobs
+# A running job whose updated_at is older than this has lost its executor
+RENDER_EXECUTOR_STALE_AFTER = int(os.getenv("RENDER_EXECUTOR_STALE_AFTER", "600"))
+
+
+@dataclass
+class InFlightRender:
+    render_job_id: int
+    chain: ChainKey
+    operation_name: str
+    fingerprint: Optional[str]
+    schedule: PollSchedule
+    next_poll_at: float = 0.0
+    polling: bool = field(default=False)
+
+
+class AsyncRenderExecutor:
+
+    def __init__(self, max_in_flight: int = RENDER_EXECUTOR_MAX_IN_FLIGHT, threads: int = RENDER_EXECUTOR_THREADS):
+        self.max_in_flight = max_in_flight
+        self.in_flight: Dict[int, InFlightRender] = {}
+        self._claiming: Set[ChainKey] = set()  # scene chains with a job being claimed/submitted
+        self._threads = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="render")
+        self._tasks: Set[asyncio.Task] = set()
+        self._stopping = False
+
+    @staticmethod
+    def _chain_running(chain: ChainKey):
+        """EXISTS clause: some job of this scene chain is running."""
+        project_id, scene_id = chain
+        # Aliased so it isn't correlated with the render_jobs row being updated
+        other_job, other_shot = aliased(models.RenderJob), aliased(models.Shot)
+        return (
+            select(other_job.id)
+            .join(other_shot, other_shot.id == other_job.shot_id)
+            .where(
+                other_job.status == models.RenderJobStatus.running,
+                other_shot.project_id == project_id,
+                other_shot.scene_id == scene_id,  # IS NULL for shots without a scene
+            )
+            .exists()
+        )
+
+    @staticmethod
+    def _lock_chain(db, chain: ChainKey):
+        """On Postgres, hold the chain's advisory lock until the claim commits."""
+        if db.get_bind().dialect.name == "postgresql":
+            project_id, scene_id = chain
+            db.execute(
+                text("SELECT pg_advisory_xact_lock(:project_id, :scene_id)"),
+                {"project_id": project_id, "scene_id": scene_id or 0},  # ids start at 1
+            )
+
+    @property
+    def video_service(self):
+        return get_continuity_engine().video_service
+
+    async def _blocking(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._threads, fn, *args)
+
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    # -------------------------------------------------
+    # Claim + submit
+    # -------------------------------------------------
+
+    def _claim_jobs(self, limit: int, busy_chains: Set[ChainKey]) -> List[Tuple[int, ChainKey, Optional[dict]]]:
+        """
+        Atomically move up to `limit` pending jobs to running (at most one per
+        scene chain, skipping chains already rendering) and build their requests.
+        Jobs are created in shot order, so the oldest pending job of a chain is
+        the next one whose predecessor has finished.
+        """
+        db = SessionLocal()
+        claimed = []
+        try:
+            # One candidate per chain (its oldest pending job), so a long
+            # scene can't fill the window and starve the other scenes
+            heads = (
+                select(func.min(models.RenderJob.id))
+                .join(models.Shot, models.Shot.id == models.RenderJob.shot_id)
+                .where(models.RenderJob.status == models.RenderJobStatus.pending)
+                .group_by(models.Shot.project_id, models.Shot.scene_id)
+            )
+            pending = (
+                db.query(models.RenderJob, models.Shot)
+                .join(models.Shot, models.Shot.id == models.RenderJob.shot_id)
+                .filter(models.RenderJob.id.in_(heads))
+                .order_by(models.RenderJob.id)
+                .limit(limit + len(busy_chains))
+                .all()
+            )
+            for job, shot in pending:
+                if len(claimed) >= limit:
+                    break
+                chain = chain_key(shot)
+                if chain in busy_chains:
+                    continue
+                # Conditional update: another executor may have taken it, or
+                # be rendering another shot of the chain. One statement, so
+                # SQLite's write lock makes the check and the claim atomic;
+                # Postgres needs the chain lock for that
+                self._lock_chain(db, chain)
+                won = (
+                    db.query(models.RenderJob)
+                    .filter(
+                        models.RenderJob.id == job.id,
+                        models.RenderJob.status == models.RenderJobStatus.pending,
+                        ~self._chain_running(chain),
+                    )
+                    .update({models.RenderJob.status: models.RenderJobStatus.running}, synchronize_session=False)
+                )
+                db.commit()
+                if not won:
+                    continue
+                busy_chains.add(chain)
+                db.refresh(job)
+                claimed.append((job.id, chain, prepare_shot_render(db, job)))
+        finally:
+            db.close()
+        return claimed
+
+    def _render_cached(self, render_job_id: int, request: dict) -> Tuple[str, bool]:
+        """Fingerprint the job; finish it straight from the render cache on a hit (unless it is a re-render)."""
+        fingerprint = get_continuity_engine().fingerprint(request)
+        db = SessionLocal()
+        try:
+            job = db.query(models.RenderJob).filter(models.RenderJob.id == render_job_id).first()
+            job.fingerprint = fingerprint
+            db.commit()
+            if not render_uses_cache(job) or render_cache.fetch(fingerprint, shot_output_path(job)) is None:
+                return fingerprint, False
+            print(f"[EXECUTOR] Job {render_job_id} served from render cache ({fingerprint[:12]})")
+            print(f"[EXECUTOR] {finish_shot_render(db, job, shot_output_path(job))}")
+            return fingerprint, True
+        finally:
+            db.close()
+
+    def _submit(self, render_job_id: int, request: dict) -> Optional[str]:
+        try:
+            operation_name = self.video_service.submit(**request)
+        except Exception as e:
+            self._fail(render_job_id, e)
+            return None
+
+        db = SessionLocal()
+        try:
+            job = db.query(models.RenderJob).filter(models.RenderJob.id == render_job_id).first()
+            # Recorded so an operator can find / resume the remote operation
+            job.payload = json.dumps({"operation_name": operation_name})
+            db.commit()
+        finally:
+            db.close()
+        return operation_name
+
+    def _recover_stale_jobs(self) -> List[InFlightRender]:
+        """
+        Take over running jobs whose executor died (no heartbeat for
+        RENDER_EXECUTOR_STALE_AFTER seconds). Jobs with a recorded Veo
+        operation are returned for polling; the rest are reset to pending so
+        they are claimed again.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=RENDER_EXECUTOR_STALE_AFTER)
+        db = SessionLocal()
+        adopted = []
+        try:
+            stale = (
+                db.query(models.RenderJob, models.Shot)
+                .join(models.Shot, models.Shot.id == models.RenderJob.shot_id)
+                .filter(
+                    models.RenderJob.status == models.RenderJobStatus.running,
+                    models.RenderJob.updated_at < cutoff,
+                )
+                .all()
+            )
+            for job, shot in stale:
+                try:
+                    operation_name = json.loads(job.payload or "{}").get("operation_name")
+                except (ValueError, AttributeError):
+                    operation_name = None
+                values = {models.RenderJob.updated_at: datetime.utcnow()}
+                if not operation_name:
+                    values[models.RenderJob.status] = models.RenderJobStatus.pending
+                # Conditional on the stale timestamp: another executor starting
+                # up at the same time may recover it first
+                won = (
+                    db.query(models.RenderJob)
+                    .filter(
+                        models.RenderJob.id == job.id,
+                        models.RenderJob.status == models.RenderJobStatus.running,
+                        models.RenderJob.updated_at == job.updated_at,
+                    )
+                    .update(values, synchronize_session=False)
+                )
+                db.commit()
+                if not won:
+                    continue
+                if not operation_name:
+                    print(f"[EXECUTOR] Job {job.id} was never submitted; reset to pending")
+                    continue
+                schedule = PollSchedule(VEO_MODEL_ID)
+                adopted.append(
+                    InFlightRender(
+                        render_job_id=job.id,
+                        chain=chain_key(shot),
+                        operation_name=operation_name,
+                        fingerprint=job.fingerprint,
+                        schedule=schedule,
+                        next_poll_at=time.monotonic(),
+                    )
+                )
+                print(f"[EXECUTOR] Resuming job {job.id}: {operation_name}")
+        finally:
+            db.close()
+        return adopted
+
+    def _heartbeat(self, render_job_ids: List[int]):
+        db = SessionLocal()
+        try:
+            (
+                db.query(models.RenderJob)
+                .filter(
+                    models.RenderJob.id.in_(render_job_ids),
+                    models.RenderJob.status == models.RenderJobStatus.running,
+                )
+                .update({models.RenderJob.updated_at: datetime.utcnow()}, synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    async def _claim_and_submit(self):
+        capacity = self.max_in_flight - len(self.in_flight) - len(self._claiming)
+        if capacity <= 0:
+            return
+        busy = {r.chain for r in self.in_flight.values()} | set(self._claiming)
+        claimed = await self._blocking(self._claim_jobs, capacity, busy)
+
+        for render_job_id, chain, request in claimed:
+            if request is None:
+                continue  # prepare_shot_render already marked it failed
+            self._claiming.add(chain)
+            self._spawn(self._submit_one(render_job_id, chain, request))
+
+    async def _submit_one(self, render_job_id: int, chain: ChainKey, request: dict):
+        try:
+            fingerprint, cache_hit = await self._blocking(self._render_cached, render_job_id, request)
+            if cache_hit:
+                return
+            operation_name = await self._blocking(self._submit, render_job_id, request)
+            if operation_name:
+                schedule = PollSchedule(VEO_MODEL_ID)
+                self.in_flight[render_job_id] = InFlightRender(
+                    render_job_id=render_job_id,
+                    chain=chain,
+                    operation_name=operation_name,
+                    fingerprint=fingerprint,
+                    schedule=schedule,
+                    next_poll_at=time.monotonic() + schedule.next_delay(),
+                )
+                print(f"[EXECUTOR] Submitted job {render_job_id}: {operation_name}")
+        except Exception as e:
+            await self._blocking(self._fail, render_job_id, e)
+        finally:
+            self._claiming.discard(chain)
+
+    # -------------------------------------------------
+    # Poll + complete
+    # -------------------------------------------------
+
+    def _fail(self, render_job_id: int, error):
+        db = SessionLocal()
+        try:
+            job = db.query(models.RenderJob).filter(models.RenderJob.id == render_job_id).first()
+            if job:
+                fail_render_job(db, job, error)
+        finally:
+            db.close()
+        print(f"[EXECUTOR] Job {render_job_id} failed: {error}")
+
+    def _complete(self, render: InFlightRender, poll_data: dict):
+        render_job_id = render.render_job_id
+        db = SessionLocal()
+        try:
+            job = db.query(models.RenderJob).filter(models.RenderJob.id == render_job_id).first()
+            output_path = shot_output_path(job)
+            self.video_service.save_video_from_operation(poll_data, output_path)
+            if render.fingerprint:
+                render_cache.store(render.fingerprint, output_path)
+            print(f"[EXECUTOR] {finish_shot_render(db, job, output_path)}")
+        except Exception as e:
+            db.rollback()
+            self._fail(render_job_id, e)
+        finally:
+            db.close()
+
+    async def _poll_one(self, render: InFlightRender):
+        try:
+            render.schedule.poll_started()
+            poll_data = await self._blocking(self.video_service.fetch_operation, render.operation_name)
+            if poll_data.get("done"):
+                render.schedule.completed()
+                await self._blocking(self._complete, render, poll_data)
+                self.in_flight.pop(render.render_job_id, None)
+                return
+            render.next_poll_at = time.monotonic() + render.schedule.next_delay()
+        except Exception as e:  # includes OperationTimeout from next_delay()
+            self.in_flight.pop(render.render_job_id, None)
+            await self._blocking(self._fail, render.render_job_id, e)
+        finally:
+            render.polling = False
+
+    # -------------------------------------------------
+    # Main loop
+    # -------------------------------------------------
+
+    async def run(self):
+        print(f"[EXECUTOR] Running (max {self.max_in_flight} in flight, model {VEO_MODEL_ID})")
+        for render in await self._blocking(self._recover_stale_jobs):
+            self.in_flight[render.render_job_id] = render
+        next_claim = 0.0
+        next_heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
+
+        while not self._stopping or self.in_flight or self._claiming:
+            now = time.monotonic()
+
+            if now >= next_heartbeat:
+                if self.in_flight:
+                    self._spawn(self._blocking(self._heartbeat, list(self.in_flight)))
+                next_heartbeat = now + HEARTBEAT_INTERVAL
+
+            if not self._stopping and now >= next_claim:
+                await self._claim_and_submit()
+                next_claim = now + CLAIM_INTERVAL
+
+            # Poll every due operation concurrently; the thread pool bounds it
+            for render in list(self.in_flight.values()):
+                if not render.polling and render.next_poll_at <= now:
+                    render.polling = True
+                    self._spawn(self._poll_one(render))
+
+            upcoming = [r.next_poll_at for r in self.in_flight.values() if not r.polling]
+            wake = min(upcoming + [next_claim]) if not self._stopping else min(upcoming + [now + 1])
+            await asyncio.sleep(max(0.05, min(wake - time.monotonic(), CLAIM_INTERVAL)))
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._threads.shutdown(wait=True)
+        stats = render_cache.stats()
+        print(f"[EXECUTOR] Stopped (render cache: {stats['hits']} hits / {stats['misses']} misses)")
+
+    def stop(self):
+        """Stop claiming new jobs; the loop exits once in-flight renders finish."""
+        print(f"[EXECUTOR] Draining {len(self.in_flight)} in-flight renders...")
+        self._stopping = True
+
+
+def main():
+    executor = AsyncRenderExecutor()
+    loop = asyncio.new_event_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, executor.stop)
+        except NotImplementedError:
+            pass  # Windows: Ctrl+C raises KeyboardInterrupt instead
+    try:
+        loop.run_until_complete(executor.run())
+    finally:
+        loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,91 +1,317 @@
 # app/workers/tasks.py
 
+import json
 import os
-import base64
-import subprocess
 
+from app.core.config import settings
+from app.core.queue import dna_queue
 from app.db.session import SessionLocal
 from app import models
-from app.services.video.google_flow import GoogleFlowVideoService
+from app.services.frames import save_last_frame
 from app.services.prompt_builder import PromptBuilder
-from app.services.continuity.continuity_engine import ContinuityEngine
-from app.services.embedding import extract_character_dna, to_json_str
+from app.services.render_planner import last_frame_path, previous_shot
+from app.services.continuity.reference_images import reference_image
+from app.services.embedding import (
+    clip_cache_namespace,
+    extract_character_dna,
+    extract_character_dna_batch,
+    extract_scene_dna,
+    to_json_str,
+)
+from app.services.vector_index import character_index
 
 from rq import get_current_job
+from redis.exceptions import WatchError
+from rq.executions import Execution
+from rq.job import Job, JobStatus
 
 
-video_service = GoogleFlowVideoService()
 prompt_builder = PromptBuilder()
-continuity_engine = ContinuityEngine()
+
+# Created on first render so DNA-only workers (and importers) skip the video stack
+_continuity_engine = None
+
+
+def get_continuity_engine():
+    global _continuity_engine
+    if _continuity_engine is None:
+        from app.services.continuity.continuity_engine import ContinuityEngine
+        _continuity_engine = ContinuityEngine()
+    return _continuity_engine
 
 
 def extract_dna_task(character_id: int):
     """
     RQ worker task to calculate and save character embeddings asynchronously.
     This runs in the background to avoid blocking the user.
+
+    With DNA_BATCH_SIZE > 1 the worker also claims other pending DNA jobs
+    from dna_queue and embeds them all in a single CLIP batch.
     """
+    if settings.DNA_BATCH_SIZE > 1:
+        claimed = _claim_pending_dna_jobs(settings.DNA_BATCH_SIZE - 1)
+        if claimed:
+            try:
+                return extract_dna_batch_task([character_id] + [char_id for _, char_id, _ in claimed])
+            finally:
+                _finish_claimed_dna_jobs(claimed)
+
     db = SessionLocal()
     
     try:
         char = db.query(models.Character).filter_by(id=character_id).first()
         if not char or not char.ref_image_path:
+            _set_dna_status(db, models.Character, [character_id], models.DnaStatus.failed)
             return f"Character {character_id} not found or image path missing."
 
+        char.dna_status = models.DnaStatus.running
+        db.commit()
+
         # Load the image and run the slow embedding models (CLIP/FaceNet)
         dna = extract_character_dna(char.ref_image_path)
         
         # Save the results back to the database
-        char.face_embedding = to_json_str(dna["face_embedding"])
-        char.style_embedding = to_json_str(dna["style_embedding"])
+        char.set_embedding(dna["face_embedding"], model=dna["embedding_model"])
         char.dominant_colors = to_json_str(dna["dominant_colors"])
+        char.dominant_color_weights = to_json_str(dna["dominant_color_weights"])
+        char.dna_status = models.DnaStatus.done
         
         db.commit()
+        _index_character(char.id, dna["face_embedding"], dna["embedding_model"])
         print(f"[DNA] Completed extraction for Character {character_id} ({char.name})")
         return f"DNA extracted and saved for Character {character_id}."
         
     except Exception as e:
         db.rollback()
+        _set_dna_status(db, models.Character, [character_id], models.DnaStatus.failed)
         print(f"[DNA ERROR] Failed for Character {character_id}: {e}")
         return f"Error extracting DNA for {character_id}: {e}"
     finally:
         db.close()
 
 
+def extract_dna_batch_task(character_ids: list):
+    """
+    Batched variant of extract_dna_task: one CLIP forward pass for all
+    characters (e.g. a whole cast registered at once).
+    """
+    db = SessionLocal()
+
+    try:
+        chars = (
+            db.query(models.Character)
+            .filter(models.Character.id.in_(character_ids))
+            .all()
+        )
+        missing = [c.id for c in chars if not (c.ref_image_path and os.path.exists(c.ref_image_path))]
+        chars = [c for c in chars if c.id not in missing]
+        _set_dna_status(db, models.Character, missing, models.DnaStatus.failed)
+        if not chars:
+            return f"No characters with images found in {character_ids}."
+
+        _set_dna_status(db, models.Character, [c.id for c in chars], models.DnaStatus.running)
+
+        dnas = extract_character_dna_batch([c.ref_image_path for c in chars])
+
+        for char, dna in zip(chars, dnas):
+            char.set_embedding(dna["face_embedding"], model=dna["embedding_model"])
+            char.dominant_colors = to_json_str(dna["dominant_colors"])
+            char.dominant_color_weights = to_json_str(dna["dominant_color_weights"])
+            char.dna_status = models.DnaStatus.done
+
+        db.commit()
+        for char, dna in zip(chars, dnas):
+            _index_character(char.id, dna["face_embedding"], dna["embedding_model"])
+        print(f"[DNA] Completed batch extraction for Characters {[c.id for c in chars]}")
+        return f"DNA extracted and saved for {len(chars)} characters."
+
+    except Exception as e:
+        db.rollback()
+        _set_dna_status(db, models.Character, character_ids, models.DnaStatus.failed)
+        print(f"[DNA ERROR] Batch failed for Characters {character_ids}: {e}")
+        return f"Error extracting DNA for {character_ids}: {e}"
+    finally:
+        db.close()
+
+
+def extract_scene_dna_task(scene_id: int):
+    """
+    RQ worker task: scene embedding + palette for an uploaded reference image.
+    """
+    db = SessionLocal()
+
+    try:
+        scene = db.query(models.Scene).filter_by(id=scene_id).first()
+        if not scene or not scene.ref_image_path:
+            _set_dna_status(db, models.Scene, [scene_id], models.DnaStatus.failed)
+            return f"Scene {scene_id} not found or image path missing."
+
+        scene.dna_status = models.DnaStatus.running
+        db.commit()
+
+        dna = extract_scene_dna(scene.ref_image_path)
+
+        scene.set_embedding(dna["scene_embedding"], model=dna["embedding_model"])
+        scene.palette = to_json_str(dna["palette"])
+        scene.palette_weights = to_json_str(dna["palette_weights"])
+        scene.dna_status = models.DnaStatus.done
+
+        db.commit()
+        print(f"[DNA] Completed extraction for Scene {scene_id} ({scene.name})")
+        return f"DNA extracted and saved for Scene {scene_id}."
+
+    except Exception as e:
+        db.rollback()
+        _set_dna_status(db, models.Scene, [scene_id], models.DnaStatus.failed)
+        print(f"[DNA ERROR] Failed for Scene {scene_id}: {e}")
+        return f"Error extracting DNA for scene {scene_id}: {e}"
+    finally:
+        db.close()
+
+
+def _set_dna_status(db, model, ids: list, status: "models.DnaStatus"):
+    if not ids:
+        return
+    db.query(model).filter(model.id.in_(ids)).update(
+        {model.dna_status: status}, synchronize_session=False
+    )
+    db.commit()
+
+
+def _index_character(character_id: int, embedding: list, model: str):
+    """Add a fresh embedding to the identity index. Non-critical."""
+    try:
+        character_index.add(character_id, embedding, model=model)
+    except Exception as e:
+        print(f"[INDEX] Warning: failed to index Character {character_id}: {e}")
+
+
+def rebuild_character_index_task() -> str:
+    """
+    Rebuild the identity index from the embeddings stored in the DB that the
+    configured CLIP backend produced; others need re-extraction to be found.
+    """
+    model = clip_cache_namespace()
+    db = SessionLocal()
+    try:
+        chars = (
+            db.query(models.Character)
+            .filter(models.Character.embedding.isnot(None), models.Character.embedding_model == model)
+            .order_by(models.Character.id)
+            .yield_per(1000)
+        )
+        character_index.rebuild(((c.id, c.embedding_vector) for c in chars), model=model)
+        skipped = db.query(models.Character).filter(models.Character.embedding.isnot(None)).count() - len(character_index)
+        if skipped:
+            print(f"[INDEX] Skipped {skipped} characters embedded by another model than {model}")
+        return f"Character index rebuilt with {len(character_index)} vectors ({model})."
+    finally:
+        db.close()
+
+
+def _claim_pending_dna_jobs(limit: int) -> list:
+    """
+    Pull up to `limit` queued extract_dna_task jobs off the head of
+    dna_queue and return (job, character_id, execution) triples. Claimed
+    jobs are marked started so no other worker runs them, and registered in
+    the StartedJobRegistry with the batch's timeout: if this worker dies
+    mid-batch, RQ's abandoned-job cleanup fails (or retries) them like any
+    other started job. _finish_claimed_dna_jobs sets their final status once
+    the batch is over.
+    """
+    current = get_current_job()
+    func_name = f"{extract_dna_task.__module__}.{extract_dna_task.__name__}"
+    timeout = current.timeout if current and current.timeout and current.timeout > 0 else dna_queue.DEFAULT_TIMEOUT
+    ttl = int(timeout) + 60  # a minute of slack past the batch's own deadline
+    claimed = []
+
+    # Bounded scan: a few candidates past `limit`, fetched in one round trip
+    job_ids = dna_queue.get_job_ids(0, limit * 4)
+    for job in Job.fetch_many(job_ids, connection=dna_queue.connection):
+        if len(claimed) >= limit:
+            break
+        if job is None or job.func_name != func_name or not job.args:
+            continue
+        execution = _claim_dna_job(job, ttl, worker_name=f"batch:{current.id if current else ''}")
+        if execution is None:
+            continue
+        job.meta["batched_into"] = current.id if current else None
+        job.save_meta()
+        claimed.append((job, job.args[0], execution))
+
+    return claimed
+
+
+def _claim_dna_job(job: Job, ttl: int, worker_name: str):
+    """
+    Dequeue `job`, mark it started and add it to the StartedJobRegistry in
+    one transaction. WATCH on the job hash aborts it if a worker dequeued or
+    claimed the job since we read it; returns None then.
+    """
+    with dna_queue.connection.pipeline() as pipe:
+        try:
+            pipe.watch(job.key)
+            status = pipe.hget(job.key, "status")
+            if (status.decode() if isinstance(status, bytes) else status) != JobStatus.QUEUED.value:
+                return None
+            pipe.multi()
+            dna_queue.remove(job.id, pipeline=pipe)
+            job.set_status(JobStatus.STARTED, pipeline=pipe)
+            execution = Execution.create(job, ttl=ttl, pipeline=pipe, worker_name=worker_name)
+            removed = pipe.execute()[0]
+        except WatchError:
+            return None
+    if not removed:
+        # Gone from the queue without touching the job hash (e.g. deleted); undo
+        with dna_queue.connection.pipeline() as pipe:
+            execution.delete(job, pipeline=pipe)
+            pipe.execute()
+        return None
+    return execution
+
+
+def _finish_claimed_dna_jobs(claimed: list):
+    """Mark each claimed job finished or failed from its character's dna_status."""
+    db = SessionLocal()
+    try:
+        ids = [char_id for _, char_id, _ in claimed]
+        done = {
+            char_id
+            for (char_id,) in db.query(models.Character.id).filter(
+                models.Character.id.in_(ids),
+                models.Character.dna_status == models.DnaStatus.done,
+            )
+        }
+    except Exception:
+        done = set()
+    finally:
+        db.close()
+
+    for job, char_id, execution in claimed:
+        try:
+            pipe = dna_queue.connection.pipeline()
+            execution.delete(job, pipeline=pipe)
+            if char_id in done:
+                job.set_status(JobStatus.FINISHED, pipeline=pipe)
+                dna_queue.finished_job_registry.add(job, ttl=job.result_ttl or 500, pipeline=pipe)
+            else:
+                job.set_status(JobStatus.FAILED, pipeline=pipe)
+                dna_queue.failed_job_registry.add(
+                    job, exc_string=f"DNA extraction failed for Character {char_id} (batched)", pipeline=pipe
+                )
+            pipe.execute()
+        except Exception as e:
+            print(f"[DNA] Warning: could not record status of batched job {job.id}: {e}")
+
+
 def extract_frame(video_path: str, output_path: str):
-    """Extract last frame from video using ffmpeg."""
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    cmd = [
-        "ffmpeg", "-y",
-        "-sseof", "-0.1",  # Seek to 0.1 seconds before end
-        "-i", video_path,
-        "-frames:v", "1",
-        output_path
-    ]
-    subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    """Extract last frame from video (in-process, raises on failure)."""
+    save_last_frame(video_path, output_path)
 
 
 def to_ref(path: str, weight: float = 1.0) -> dict:
     """Convert image path to Veo reference image format."""
-    if not os.path.exists(path):
-        return None
-    with open(path, "rb") as f:
-        b64 = base64.b64encode(f.read()).decode()
-    
-    # Determine mime type from file extension
-    mime_type = "image/jpeg"
-    if path.lower().endswith(".png"):
-        mime_type = "image/png"
-    elif path.lower().endswith((".jpg", ".jpeg")):
-        mime_type = "image/jpeg"
-    
-    return {
-        "referenceType": "asset",
-        "image": {
-            "bytesBase64Encoded": b64,
-            "mimeType": mime_type
-        },
-        "weight": weight
-    }
+    return reference_image(path, weight=weight)
 
 
 # Removed: _get_or_create_continuity_state - now handled by ContinuityEngine
@@ -99,27 +325,87 @@ def render_shot_task(render_job_id: int) -> str:
 
     db = SessionLocal()
 
-    job = db.query(models.RenderJob).filter(models.RenderJob.id == render_job_id).first()
-    if not job:
-        return f"render_job_id={render_job_id} not found"
+    try:
+        job = db.query(models.RenderJob).filter(models.RenderJob.id == render_job_id).first()
+        if not job:
+            return f"render_job_id={render_job_id} not found"
 
+        request = prepare_shot_render(db, job)
+        if request is None:
+            return f"failed: {job.payload}"
+
+        try:
+            # --- 2) Call Veo with the Anchor + Flow request (or reuse an
+            # identical earlier render), streaming to disk ---
+            engine = get_continuity_engine()
+            job.fingerprint = engine.fingerprint(request)
+            db.commit()
+            output_path = shot_output_path(job)
+            engine.render_to_file(request, output_path, use_cache=render_uses_cache(job))
+        except Exception as e:
+            fail_render_job(db, job, e)
+            return f"failed: {e}"
+
+        return finish_shot_render(db, job, output_path)
+    finally:
+        db.close()
+
+
+def render_uses_cache(job: models.RenderJob) -> bool:
+    """False when the render was queued with use_cache=false (an explicit re-render)."""
+    try:
+        return json.loads(job.payload or "{}").get("use_cache", True) is not False
+    except (ValueError, AttributeError):
+        return True
+
+
+def fail_render_job(db, job: models.RenderJob, error) -> None:
+    job.status = models.RenderJobStatus.failed
+    job.payload = str(error)
+    db.commit()
+
+
+def prepare_shot_render(db, job: models.RenderJob):
+    """
+    Mark the job running and build its Veo request (prompt + reference
+    images). Returns None, with the job marked failed, if it can't render.
+    Shared by render_shot_task and the async render executor.
+    """
     # Mark as running
     job.status = models.RenderJobStatus.running
     db.commit()
 
     shot = db.query(models.Shot).filter(models.Shot.id == job.shot_id).first()
     if not shot:
-        job.status = models.RenderJobStatus.failed
-        job.payload = "Shot not found"
-        db.commit()
-        return "shot not found"
+        fail_render_job(db, job, "Shot not found")
+        return None
 
     project = db.query(models.Project).filter(models.Project.id == job.project_id).first()
     if not project:
-        job.status = models.RenderJobStatus.failed
-        job.payload = "Project not found"
-        db.commit()
-        return "project not found"
+        fail_render_job(db, job, "Project not found")
+        return None
+
+    # Flow frame comes from the previous shot in the same scene chain, which
+    # the planner made this job depend on; a scene's first shot has none.
+    # Only the predecessor's latest render counts: a frame left on disk by an
+    # older render is not used unless that latest render is done.
+    flow_frame_path = None
+    prev_shot = previous_shot(db, shot)
+    if prev_shot:
+        prev_job = (
+            db.query(models.RenderJob)
+            .filter(models.RenderJob.shot_id == prev_shot.id)
+            .order_by(models.RenderJob.id.desc())
+            .first()
+        )
+        if prev_job and prev_job.status == models.RenderJobStatus.failed:
+            fail_render_job(db, job, f"Previous shot {prev_shot.id} in this scene failed")
+            return None
+        if prev_job and prev_job.status != models.RenderJobStatus.done:
+            fail_render_job(db, job, f"Previous shot {prev_shot.id} in this scene has not rendered yet")
+            return None
+        if prev_job and os.path.exists(last_frame_path(prev_shot.id)):
+            flow_frame_path = last_frame_path(prev_shot.id)
 
     # --- 1) Build base prompt (scene + shot description) ---
     base_prompt = prompt_builder.build_shot_prompt(db, shot)
@@ -129,53 +415,49 @@ def render_shot_task(render_job_id: int) -> str:
     print(f"DEBUG: Base prompt: {base_prompt[:100]}...")
     print(f"{'='*60}\n")
 
-    # Decide number of frames: if you have a duration_seconds field, use it; else default
-    duration_seconds = getattr(shot, "duration_seconds", 6) or 6
-    num_frames = duration_seconds * 30  # ~30 fps
-
     try:
-        # --- 2) Use ContinuityEngine to generate with Anchor + Flow ---
-        # The engine handles: state lookup, reference images, prompt enhancement, and Veo call
-        video_bytes = continuity_engine.generate_segment(
+        # The engine handles: state lookup, reference images, prompt enhancement
+        return get_continuity_engine().build_request(
             db=db,
             project_id=project.id,
-            prompt=base_prompt
+            prompt=base_prompt,
+            flow_frame_path=flow_frame_path,
         )
-
     except Exception as e:
-        job.status = models.RenderJobStatus.failed
-        job.payload = str(e)
-        db.commit()
-        return f"failed: {e}"
+        fail_render_job(db, job, e)
+        return None
+
+
+def shot_output_path(job: models.RenderJob) -> str:
+    return os.path.join("media/generated", f"shot_{job.shot_id}.mp4")
 
-    # --- 3) Save output video ---
-    out_dir = "media/generated"
-    os.makedirs(out_dir, exist_ok=True)
 
-    output_path = os.path.join(out_dir, f"shot_{shot.id}.mp4")
-    with open(output_path, "wb") as f:
-        f.write(video_bytes)
+def finish_shot_render(db, job: models.RenderJob, output_path: str) -> str:
+    """Advance the continuity flow frame from the saved video and mark the job done."""
+    shot_id, project_id = job.shot_id, job.project_id
 
-    # --- 4) Extract last frame for next shot's reference ---
-    continuity_dir = "media/continuity"
-    os.makedirs(continuity_dir, exist_ok=True)
-    last_frame_path = os.path.join(continuity_dir, f"shot_{shot.id}_last_frame.jpg")
+    # --- 4) Extract last frame for the next shot in this scene chain ---
+    frame_path = last_frame_path(shot_id)
+    os.makedirs(os.path.dirname(frame_path), exist_ok=True)
     
     try:
-        extract_frame(output_path, last_frame_path)
+        extract_frame(output_path, frame_path)
         
-        # Update continuity state with new last frame
-        c_state = continuity_engine.get_or_create_state(db, project.id)
-        c_state.last_frame_path = last_frame_path
+        # Also the project's latest frame, for session-style continuation
+        c_state = get_continuity_engine().get_or_create_state(db, project_id)
+        c_state.last_frame_path = frame_path
         db.commit()
-        print(f"DEBUG: Updated continuity state with last frame: {last_frame_path}")
+        print(f"DEBUG: Updated continuity state with last frame: {frame_path}")
     except Exception as e:
-        # Non-critical - continue even if frame extraction fails
+        # Non-critical - continue even if frame extraction fails, but don't
+        # leave an older render's frame for the next shot to pick up
         print(f"Warning: Failed to extract frame: {e}")
+        if os.path.exists(frame_path):
+            os.remove(frame_path)
 
     # --- 5) Mark job as done in DB ---
     job.status = models.RenderJobStatus.done
     job.output_path = output_path
     db.commit()
 
-    return f"rendered shot {shot.id} (project {project.id}) with visual continuity"
+    return f"rendered shot {shot_id} (project {project_id}) with visual continuity"
@@ -1,16 +1,19 @@
 from rq import SimpleWorker, Queue
+from app.core.config import settings
 from app.core.redis import redis_client
 
-listen = ['render_queue']
+listen = ['dna_queue', 'render_queue']
 
 if __name__ == '__main__':
     # Pre-warm CLIP model to avoid first-request slowness
     print("[Worker] Pre-warming CLIP model...")
-    from app.services.embedding import _get_clip_model
-    _get_clip_model()  # Load model once at worker startup
-    print("[Worker] CLIP model ready!")
+    from app.services.embedding import clip_backend, warm_up
+    warm_up()  # Load model once at worker startup (torch or ONNX backend)
+    print(f"[Worker] CLIP model ready! (backend: {clip_backend()})")
     
     queues = [Queue(name, connection=redis_client) for name in listen]
     worker = SimpleWorker(queues, connection=redis_client)
     print(f"[Worker] Listening on queues: {listen}")
+    if settings.DNA_BATCH_SIZE > 1:
+        print(f"[Worker] DNA batching enabled: up to {settings.DNA_BATCH_SIZE} images per CLIP pass")
     worker.work()
\ No newline at end of file
@@ -0,0 +1,140 @@
+"""
+Benchmark: parallel writers + readers on one SQLite file, default engine vs WAL
+
+Mimics the API, RQ workers and MCP server sharing app.db: writer processes
+insert render jobs and flip their status (what prepare/finish_shot_render
+do) while reader processes list a project's render jobs (what the API
+polls). Compares a plain create_engine (rollback journal, FULL sync)
+against app.db.session.create_db_engine (WAL, synchronous=NORMAL,
+busy_timeout).
+"""
+import os
+import sys
+import tempfile
+import time
+import multiprocessing as mp
+from pathlib import Path
+
+backend_dir = Path(__file__).parent / "backend"
+sys.path.insert(0, str(backend_dir))
+os.environ.setdefault("GOOGLE_CLOUD_PROJECT_ID", "bench")
+
+WRITERS = 8
+READERS = 4
+TXNS_PER_WRITER = 150
+SEED_JOBS = 2000
+
+
+def _engine(mode, url):
+    if mode == "default":
+        from sqlalchemy import create_engine
+
+        return create_engine(url, connect_args={"check_same_thread": False})
+    from app.db.session import create_db_engine
+
+    return create_db_engine(url)
+
+
+def _setup(url):
+    from sqlalchemy import create_engine, insert
+    from app.db.base import Base
+    from app import models
+
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Project), [{"name": "bench"}])
+        conn.execute(insert(models.Shot), [{"project_id": 1, "index": i} for i in range(50)])
+        conn.execute(
+            insert(models.RenderJob),
+            [{"project_id": 1, "shot_id": 1 + i % 50, "status": models.RenderJobStatus.done} for i in range(SEED_JOBS)],
+        )
+    engine.dispose()
+
+
+def _writer(mode, url, start, result):
+    from sqlalchemy.orm import sessionmaker
+    from app import models
+
+    Session = sessionmaker(bind=_engine(mode, url))
+    start.wait()
+    latencies, errors = [], 0
+    for i in range(TXNS_PER_WRITER):
+        t0 = time.perf_counter()
+        db = Session()
+        try:
+            job = models.RenderJob(project_id=1, shot_id=1 + i % 50, status=models.RenderJobStatus.pending)
+            db.add(job)
+            db.commit()
+            job.status = models.RenderJobStatus.running
+            db.commit()
+            latencies.append(time.perf_counter() - t0)
+        except Exception:  # "database is locked"
+            db.rollback()
+            errors += 1
+        finally:
+            db.close()
+    result.put(("writer", latencies, errors))
+
+
+def _reader(mode, url, start, stop, result):
+    from sqlalchemy.orm import sessionmaker
+    from app import models
+
+    Session = sessionmaker(bind=_engine(mode, url))
+    start.wait()
+    queries, errors = 0, 0
+    while not stop.is_set():
+        db = Session()
+        try:
+            (
+                db.query(models.RenderJob)
+                .filter(models.RenderJob.project_id == 1)
+                .order_by(models.RenderJob.created_at.desc())
+                .limit(50)
+                .all()
+            )
+            queries += 1
+        except Exception:
+            errors += 1
+        finally:
+            db.close()
+    result.put(("reader", queries, errors))
+
+
+def _run(mode):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        _setup(url)
+        start, stop, result = mp.Event(), mp.Event(), mp.Queue()
+        writers = [mp.Process(target=_writer, args=(mode, url, start, result)) for _ in range(WRITERS)]
+        readers = [mp.Process(target=_reader, args=(mode, url, start, stop, result)) for _ in range(READERS)]
+        for p in writers + readers:
+            p.start()
+        time.sleep(1.0)  # let every process import and connect
+
+        t0 = time.perf_counter()
+        start.set()
+        outcomes = [result.get() for _ in writers]
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        outcomes += [result.get() for _ in readers]
+        for p in writers + readers:
+            p.join()
+
+    latencies = sorted(l for kind, ls, _ in outcomes if kind == "writer" for l in ls)
+    write_errors = sum(e for kind, _, e in outcomes if kind == "writer")
+    reads = sum(q for kind, q, _ in outcomes if kind == "reader")
+    read_errors = sum(e for kind, _, e in outcomes if kind == "reader")
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else float("nan")
+    print(
+        f"{mode:<8} {len(latencies) / elapsed:>9.0f} {p99:>9.1f} {write_errors:>8} "
+        f"{reads / elapsed:>9.0f} {read_errors:>8}"
+    )
+
+
+if __name__ == "__main__":
+    print(f"{WRITERS} writers x {TXNS_PER_WRITER} txns, {READERS} readers, one SQLite file\n")
+    print(f"{'engine':<8} {'writes/s':>9} {'p99 ms':>9} {'w errors':>8} {'reads/s':>9} {'r errors':>8}")
+    for mode in ("default", "tuned"):
+        _run(mode)
@@ -0,0 +1,73 @@
+"""
+Benchmark: full-size decode vs reduced-resolution (draft mode) decode for DNA extraction
+"""
+import os
+import sys
+import time
+import resource
+import tempfile
+import multiprocessing as mp
+from pathlib import Path
+
+backend_dir = Path(__file__).parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from PIL import Image
+
+RUNS = 5
+SIZES = [(1920, 1080), (4032, 3024), (6000, 4000)]  # 2 MP, 12 MP (phone), 24 MP
+
+
+def _make_jpeg(size, path):
+    # Gradient + noise so the encoder can't trivially compress it
+    img = Image.linear_gradient("L").resize(size).convert("RGB")
+    noise = Image.effect_noise(size, 40).convert("RGB")
+    Image.blend(img, noise, 0.3).save(path, quality=90)
+
+
+def _decode(mode, path, result):
+    from app.services.embedding import _load_image
+
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        if mode == "full":
+            img = Image.open(path).convert("RGB")
+        else:
+            img = _load_image(path)
+    elapsed = (time.perf_counter() - start) / RUNS
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss / 1024 if sys.platform != "darwin" else rss / (1024 * 1024)
+    result.put((elapsed, rss_mb, img.size))
+
+
+def _measure(mode, path):
+    # Fresh process per measurement so peak RSS isn't polluted by the other mode
+    result = mp.Queue()
+    proc = mp.Process(target=_decode, args=(mode, path, result))
+    proc.start()
+    out = result.get()
+    proc.join()
+    return out
+
+
+if __name__ == "__main__":
+    print("=" * 78)
+    print("DNA IMAGE DECODE BENCHMARK")
+    print("=" * 78)
+    print(f"{'Source':<14}{'Mode':<10}{'Decoded':>14}{'Latency':>14}{'Peak RSS':>14}")
+    print("-" * 78)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in SIZES:
+            path = os.path.join(tmp, f"{size[0]}x{size[1]}.jpg")
+            _make_jpeg(size, path)
+
+            full = _measure("full", path)
+            reduced = _measure("reduced", path)
+            label = f"{size[0] * size[1] / 1e6:.0f} MP"
+
+            for mode, (elapsed, rss_mb, dims) in (("full", full), ("draft", reduced)):
+                print(f"{label:<14}{mode:<10}{f'{dims[0]}x{dims[1]}':>14}{elapsed * 1000:>11.1f} ms{rss_mb:>11.1f} MB")
+            print(f"{'':<14}{'speedup':<10}{'':>14}{full[0] / reduced[0]:>12.1f} x{full[1] - reduced[1]:>11.1f} MB saved")
+            print("-" * 78)
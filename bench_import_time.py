@@ -0,0 +1,90 @@
+"""
+Startup budget check: API / MCP cold import time via `python -X importtime`.
+Fails (exit 1) if a target exceeds its budget or pulls in a heavy module.
+"""
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent / "backend"
+
+RUNS = 3
+
+# target module -> cumulative import budget in ms (override: IMPORT_BUDGET_MS)
+TARGETS = {
+    "app.main": 1500,
+}
+
+# Must only load on first use (worker / first request), never at import
+FORBIDDEN = [
+    "torch",
+    "transformers",
+    "onnxruntime",
+    "numpy",
+    "openai",
+    "vertexai",
+    "google.cloud",
+    "google.oauth2",
+    "hnswlib",
+]
+
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)")
+
+
+def _import_profile(module):
+    env = dict(os.environ)
+    env.setdefault("GOOGLE_CLOUD_PROJECT_ID", "import-time-check")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=backend_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        m = LINE.match(line)
+        if m:
+            cumulative[m.group(4)] = int(m.group(2))
+    return cumulative
+
+
+if __name__ == "__main__":
+    failures = []
+
+    print("=" * 70)
+    print("COLD IMPORT BUDGET")
+    print("=" * 70)
+
+    for module, budget_ms in TARGETS.items():
+        budget_ms = int(os.getenv("IMPORT_BUDGET_MS", budget_ms))
+        profiles = [_import_profile(module) for _ in range(RUNS)]
+        best_ms = min(p[module] for p in profiles) / 1000
+
+        loaded = [
+            heavy for heavy in FORBIDDEN
+            if any(name == heavy or name.startswith(heavy + ".") for name in profiles[0])
+        ]
+        heaviest = sorted(profiles[0].items(), key=lambda kv: kv[1], reverse=True)[1:6]
+
+        status = "OK" if best_ms <= budget_ms else "OVER BUDGET"
+        print(f"{module:.<40} {best_ms:>8.1f} ms (budget {budget_ms} ms) {status}")
+        for name, us in heaviest:
+            print(f"    {name:<36} {us / 1000:>8.1f} ms")
+
+        if best_ms > budget_ms:
+            failures.append(f"{module}: {best_ms:.0f} ms > {budget_ms} ms")
+        if loaded:
+            failures.append(f"{module}: imports heavy modules at startup: {', '.join(loaded)}")
+
+    print("=" * 70)
+    if failures:
+        for failure in failures:
+            print(f"FAIL {failure}")
+        sys.exit(1)
+    print("All startup budgets met.")
@@ -0,0 +1,102 @@
+"""
+Soak test: thousands of MCP tool calls must not leak DB sessions or memory
+
+Calls the DB-backed tools of mcp_server directly (no stdio transport) and
+tracks pooled connections via checkout/checkin events plus process RSS.
+Fails (exit 1) if any connection is still checked out after a tool returns
+or RSS keeps growing past the warm-up sample.
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CALLS = int(os.getenv("SOAK_CALLS", "6000"))
+SAMPLE_EVERY = 500
+RSS_GROWTH_BUDGET_MB = float(os.getenv("SOAK_RSS_BUDGET_MB", "16"))
+
+tmp_dir = tempfile.mkdtemp(prefix="mcp_soak_")
+os.environ["DATABASE_URL"] = f"sqlite:///{tmp_dir}/soak.db"
+os.environ.setdefault("GOOGLE_CLOUD_PROJECT_ID", "bench")
+sys.path.insert(0, str(Path(__file__).parent))
+
+import mcp_server  # noqa: E402  (chdirs into backend/, creates tables)
+from sqlalchemy import event  # noqa: E402
+from app import models  # noqa: E402
+from app.services.sessions import get_session_project  # noqa: E402
+
+
+def _rss_mb():
+    # Current (not peak) RSS, so a plateau is visible
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+checked_out = 0
+
+
+def _on_checkout(*args):
+    global checked_out
+    checked_out += 1
+
+
+def _on_checkin(*args):
+    global checked_out
+    checked_out -= 1
+
+
+def _seed(session_id, names):
+    with mcp_server.db_session() as db:
+        project = get_session_project(db, session_id)
+        for name in names:
+            db.add(models.Character(project_id=project.id, name=name, description=name))
+        db.commit()
+
+
+def main():
+    session_id = "soak_session"
+    names = ["Ada", "Ben", "Cy"]
+    _seed(session_id, names)
+
+    event.listen(mcp_server.engine.pool, "checkout", _on_checkout)
+    event.listen(mcp_server.engine.pool, "checkin", _on_checkin)
+
+    calls = [
+        lambda i: mcp_server.update_narrative_state(session_id, f"fact_{i % 20}", f"value {i}"),
+        lambda i: mcp_server.set_active_characters(session_id, names[: 1 + i % 3]),
+        lambda i: mcp_server.update_narrative_state("unknown_session", "location", "nowhere"),
+    ]
+
+    samples = []
+    leaked_after = []
+    t0 = time.perf_counter()
+    for i in range(CALLS):
+        calls[i % len(calls)](i)
+        if checked_out:
+            leaked_after.append(i)
+        if (i + 1) % SAMPLE_EVERY == 0:
+            samples.append((i + 1, _rss_mb(), mcp_server.engine.pool.checkedout()))
+    elapsed = time.perf_counter() - t0
+
+    print(f"{CALLS} tool calls in {elapsed:.1f}s ({CALLS / elapsed:.0f}/s)\n")
+    print(f"{'calls':>7} {'RSS MB':>8} {'checked out':>12}")
+    for n, rss, out in samples:
+        print(f"{n:>7} {rss:>8.1f} {out:>12}")
+
+    # First sample is the warm-up (imports, caches, pool filled)
+    growth = samples[-1][1] - samples[0][1]
+    ok = True
+    if leaked_after:
+        print(f"\n[FAIL] {len(leaked_after)} calls returned with a connection still checked out (first: call {leaked_after[0]})")
+        ok = False
+    if growth > RSS_GROWTH_BUDGET_MB:
+        print(f"\n[FAIL] RSS grew {growth:.1f} MB after warm-up (budget {RSS_GROWTH_BUDGET_MB} MB)")
+        ok = False
+    if ok:
+        print(f"\n[OK] no connections held between calls, RSS growth {growth:.1f} MB after warm-up")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
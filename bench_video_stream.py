@@ -0,0 +1,85 @@
+"""
+Benchmark: peak RSS of saving a finished Veo operation, buffered vs streamed
+
+Simulates the final fetchPredictOperation response for inline
+(bytesBase64Encoded) results of several sizes and compares the old path
+(b64decode whole video, then write) against save_video_from_operation.
+"""
+import base64
+import json
+import os
+import sys
+import resource
+import tempfile
+import multiprocessing as mp
+from pathlib import Path
+
+backend_dir = Path(__file__).parent / "backend"
+sys.path.insert(0, str(backend_dir))
+os.environ.setdefault("GOOGLE_CLOUD_PROJECT_ID", "bench")
+
+VIDEO_SIZES_MB = [16, 64, 160]  # ~8s 720p .. long 1080p clip
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 if sys.platform != "darwin" else rss / (1024 * 1024)
+
+
+def _make_response(size_mb, path):
+    video = os.urandom(size_mb * 1024 * 1024)
+    body = {"done": True, "response": {"videos": [{"bytesBase64Encoded": base64.b64encode(video).decode()}]}}
+    with open(path, "w") as f:
+        json.dump(body, f)
+
+
+def _save(mode, response_path, out_path, result):
+    from app.services.video.google_flow import GoogleFlowVideoService
+
+    # What the worker holds after resp.json() on the final poll
+    with open(response_path) as f:
+        poll_data = json.loads(f.read())
+    before = _peak_rss_mb()
+
+    if mode == "buffered":
+        video_bytes = base64.b64decode(poll_data["response"]["videos"][0]["bytesBase64Encoded"])
+        with open(out_path, "wb") as f:
+            f.write(video_bytes)
+    else:
+        GoogleFlowVideoService().save_video_from_operation(poll_data, out_path)
+
+    result.put((before, _peak_rss_mb(), os.path.getsize(out_path)))
+
+
+def _measure(mode, response_path, out_path):
+    # Fresh process per measurement so peak RSS isn't polluted by the other mode
+    result = mp.Queue()
+    proc = mp.Process(target=_save, args=(mode, response_path, out_path, result))
+    proc.start()
+    out = result.get()
+    proc.join()
+    return out
+
+
+if __name__ == "__main__":
+    print("=" * 78)
+    print("VEO RESULT SAVE BENCHMARK (inline base64)")
+    print("=" * 78)
+    print(f"{'Video':<10}{'Mode':<12}{'Parsed resp':>16}{'Peak RSS':>14}{'Save overhead':>18}")
+    print("-" * 78)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in VIDEO_SIZES_MB:
+            response_path = os.path.join(tmp, "response.json")
+            _make_response(size_mb, response_path)
+
+            rows = {}
+            for mode in ("buffered", "streamed"):
+                out_path = os.path.join(tmp, f"{mode}.mp4")
+                before, peak, written = _measure(mode, response_path, out_path)
+                assert written == size_mb * 1024 * 1024, f"{mode}: wrote {written} bytes"
+                rows[mode] = peak - before
+                print(f"{f'{size_mb} MB':<10}{mode:<12}{before:>13.1f} MB{peak:>11.1f} MB{peak - before:>15.1f} MB")
+            print(f"{'':<10}{'saved':<12}{'':>16}{'':>14}{rows['buffered'] - rows['streamed']:>15.1f} MB")
+            print("-" * 78)
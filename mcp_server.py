@@ -3,8 +3,9 @@ import os
 import sys
 import json
 import base64
-import subprocess
+import uuid
 from pathlib import Path
+from contextlib import contextmanager, redirect_stdout
 from typing import List
 from datetime import datetime
 
@@ -16,23 +17,30 @@ sys.path.insert(0, str(backend_dir))
 os.chdir(str(backend_dir))
 
 from mcp.server.fastmcp import FastMCP
-from app.db.session import SessionLocal, engine
-from app.db.base import Base
+from app.db.session import SessionLocal
+from app.db.migrate_schema import migrate
 from app import models
+from sqlalchemy.exc import IntegrityError
 from app.services.continuity.continuity_engine import ContinuityEngine
-from app.services.embedding import extract_character_dna, to_json_str
+from app.services.sessions import get_session_project
 from app.core.files import save_character_image_bytes
-from app.core.queue import render_queue
-from app.workers.tasks import extract_dna_task
+from app.core.queue import dna_queue
 
-# Ensure all tables are created
-Base.metadata.create_all(bind=engine)
+# Embedding / index modules (numpy, PIL, CLIP on demand) are imported inside
+# the tools that need them so the stdio server starts quickly.
+
+# Ensure all tables exist and the schema is at the latest revision
+# (its progress lines go to stderr: stdout is the stdio transport)
+with redirect_stdout(sys.stderr):
+    migrate()
 
 # Initialize the MCP Server
 mcp = FastMCP("VideoMemoryLayer")
 continuity_engine = ContinuityEngine()
 
-def get_db():
+@contextmanager
+def db_session():
+    """One session per tool call, closed (returning its connection) however the tool exits."""
     db = SessionLocal()
     try:
         yield db
@@ -43,16 +51,10 @@ def get_db():
 
 
 def _extract_last_frame(video_path: str, output_path: str):
-    """Extract last frame from video using ffmpeg."""
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    cmd = [
-        "ffmpeg", "-y",
-        "-sseof", "-0.1",  # Seek to 0.1 seconds before end
-        "-i", video_path,
-        "-frames:v", "1",
-        output_path
-    ]
-    subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    """Extract last frame from video (in-process); returns it as a PIL image."""
+    from app.services.frames import save_last_frame
+
+    return save_last_frame(video_path, output_path)
 
 
 def _handle_character_logic(db, project_id: int, name: str, desc: str, is_new: bool, video_path: str):
@@ -68,6 +70,9 @@ def _handle_character_logic(db, project_id: int, name: str, desc: str, is_new: b
     """
     if not name:
         return None  # No character specified, pure scene/flow generation
+
+    from app.services.embedding import extract_character_dna, to_json_str
+    from app.services.vector_index import character_index
     
     # 1. Check if character exists
     char = db.query(models.Character).filter(
@@ -84,17 +89,18 @@ def _handle_character_logic(db, project_id: int, name: str, desc: str, is_new: b
         anchor_frame_path = f"media/characters/{os.path.basename(video_path).replace('.mp4', '_anchor.jpg')}"
         
         # Extract anchor frame
+        anchor_frame = None
         try:
-            _extract_last_frame(video_path, anchor_frame_path)
+            anchor_frame = _extract_last_frame(video_path, anchor_frame_path)
         except Exception as e:
             print(f"Warning: Failed to extract anchor frame: {e}")
             anchor_frame_path = None
         
-        # Extract DNA
+        # Extract DNA straight from the decoded frame (no JPEG re-read)
         dna = None
-        if anchor_frame_path and os.path.exists(anchor_frame_path):
+        if anchor_frame is not None:
             try:
-                dna = extract_character_dna(anchor_frame_path)
+                dna = extract_character_dna(anchor_frame)
             except Exception as e:
                 print(f"Warning: Failed to extract character DNA: {e}")
         
@@ -103,12 +109,28 @@ def _handle_character_logic(db, project_id: int, name: str, desc: str, is_new: b
             name=name,
             description=desc or f"{name} - auto-created from video",
             ref_image_path=anchor_frame_path,
-            face_embedding=to_json_str(dna["face_embedding"]) if dna else None,
-            style_embedding=to_json_str(dna["style_embedding"]) if dna else None,
+            dna_status=models.DnaStatus.done if dna else models.DnaStatus.failed,
             dominant_colors=to_json_str(dna["dominant_colors"]) if dna else None,
+            dominant_color_weights=to_json_str(dna["dominant_color_weights"]) if dna else None,
         )
-        db.add(char)
-        db.flush()
+        if dna:
+            char.set_embedding(dna["face_embedding"], model=dna["embedding_model"])
+        try:
+            with db.begin_nested():
+                db.add(char)
+                db.flush()
+        except IntegrityError:
+            # A concurrent call created the same (project, name) first; reuse it
+            char = db.query(models.Character).filter(
+                models.Character.project_id == project_id,
+                models.Character.name == name
+            ).one()
+            print(f"[~] Reusing concurrently created Anchor: {name}")
+            return char
+        # Commit before indexing so a rollback can't leave a phantom ID in the index
+        db.commit()
+        if dna:
+            character_index.add(char.id, dna["face_embedding"], model=dna["embedding_model"])
         print(f"[+] Created new Anchor: {name}")
     
     else:
@@ -160,90 +182,97 @@ def register_character_anchor(
             characters_in_shot=[{"name": "Sarah"}]
         )
     """
-    db = next(get_db())
+    with db_session() as db:
     
-    # --- FAST OPERATION 1: Resolve Project (Session) ---
-    project = db.query(models.Project).filter(
-        models.Project.description == f"Session: {session_id}"
-    ).first()
+        # --- FAST OPERATION 1: Resolve Project (Session) ---
+        # Cached, indexed lookup; atomic get-or-create for new sessions
+        project = get_session_project(db, session_id)
     
-    if not project:
-        project = models.Project(
-            name=f"Chat {session_id}",
-            description=f"Session: {session_id}"
-        )
-        db.add(project)
-        db.flush()  # Get ID
-    
-    # --- FAST OPERATION 2: Check if Character Already Exists ---
-    existing_char = db.query(models.Character).filter(
-        models.Character.project_id == project.id,
-        models.Character.name == character_name
-    ).first()
+        # --- FAST OPERATION 2: Check if Character Already Exists ---
+        existing_char = db.query(models.Character).filter(
+            models.Character.project_id == project.id,
+            models.Character.name == character_name
+        ).first()
     
-    if existing_char:
-        return f"[!] Character '{character_name}' already exists with anchor image. Use generate_video_segment to create videos."
+        if existing_char:
+            return f"[!] Character '{character_name}' already exists with anchor image. Use generate_video_segment to create videos."
     
-    # --- FAST OPERATION 3: Decode Base64 (~50ms) ---
-    try:
-        image_bytes = base64.b64decode(image_base64)
-    except Exception as e:
-        return f"[ERROR] Failed to decode image: {e}"
+        # --- FAST OPERATION 3: Decode Base64 (~50ms) ---
+        try:
+            image_bytes = base64.b64decode(image_base64)
+        except Exception as e:
+            return f"[ERROR] Failed to decode image: {e}"
     
-    # --- FAST OPERATION 4: Write File to Disk (~100ms) ---
-    # Use placeholder ID of 0 for initial file naming
-    image_path = save_character_image_bytes(0, image_bytes, extension=".jpg")
-    
-    # --- FAST OPERATION 5: Create Character Record (~50ms) ---
-    # NOTE: Embeddings are NULL - filled by background worker!
-    character = models.Character(
-        project_id=project.id,
-        name=character_name,
-        description=character_desc,
-        ref_image_path=image_path,
-        face_embedding=None,  # Background worker fills this
-        style_embedding=None,  # Background worker fills this
-        dominant_colors=None,  # Background worker fills this
-    )
-    db.add(character)
-    db.flush()  # Get the character ID
-    
-    # --- FAST OPERATION 6: Rename File with Correct ID (~50ms) ---
-    final_image_path = image_path.replace("/0_", f"/{character.id}_")
-    try:
-        os.rename(image_path, final_image_path)
-        character.ref_image_path = final_image_path
-    except Exception as e:
-        # If rename fails, keep original path (not critical)
-        print(f"[WARN] Failed to rename file: {e}")
+        # --- FAST OPERATION 4: Write File to Disk (~100ms) ---
+        # Use placeholder ID of 0 for initial file naming
+        image_path = save_character_image_bytes(0, image_bytes, extension=".jpg")
     
-    # --- FAST OPERATION 7: Update Continuity State (~50ms) ---
-    state = db.query(models.ContinuityState).filter_by(project_id=project.id).first()
-    if not state:
-        state = models.ContinuityState(
+        # --- FAST OPERATION 5: Create Character Record (~50ms) ---
+        # NOTE: Embeddings are NULL - filled by background worker!
+        character = models.Character(
             project_id=project.id,
-            session_id=session_id,
-            active_character_ids=json.dumps([character.id])
+            name=character_name,
+            description=character_desc,
+            ref_image_path=image_path,
+            embedding=None,  # Background worker fills this
+            dominant_colors=None,  # Background worker fills this
+            dna_status=models.DnaStatus.pending,
         )
-        db.add(state)
-    else:
-        # Add to existing active characters
-        active_ids = json.loads(state.active_character_ids or "[]")
-        if character.id not in active_ids:
-            active_ids.append(character.id)
-        state.active_character_ids = json.dumps(active_ids)
+        try:
+            with db.begin_nested():
+                db.add(character)
+                db.flush()  # Get the character ID
+        except IntegrityError:
+            # Registered concurrently under the same name (unique per project)
+            os.remove(image_path)
+            return f"[!] Character '{character_name}' already exists with anchor image. Use generate_video_segment to create videos."
+    
+        # --- FAST OPERATION 6: Rename File with Correct ID (~50ms) ---
+        final_image_path = image_path.replace("/0_", f"/{character.id}_")
+        try:
+            os.rename(image_path, final_image_path)
+            character.ref_image_path = final_image_path
+        except Exception as e:
+            # If rename fails, keep original path (not critical)
+            print(f"[WARN] Failed to rename file: {e}")
+    
+        # --- FAST OPERATION 7: Update Continuity State (~50ms) ---
+        state = db.query(models.ContinuityState).filter_by(project_id=project.id).first()
+        if not state:
+            state = models.ContinuityState(
+                project_id=project.id,
+                session_id=session_id,
+                active_character_ids=json.dumps([character.id])
+            )
+            db.add(state)
+        else:
+            # Add to existing active characters
+            active_ids = json.loads(state.active_character_ids or "[]")
+            if character.id not in active_ids:
+                active_ids.append(character.id)
+            state.active_character_ids = json.dumps(active_ids)
     
-    # --- FAST OPERATION 8: Enqueue Background Job (~50ms) ---
-    # This is where the magic happens - offload slow work to worker
-    job = render_queue.enqueue(extract_dna_task, character.id)
+        # --- FAST OPERATION 8: Commit Transaction (~50ms) ---
+        # Commit before enqueueing so the worker can never pick up the job
+        # before the character row exists.
+        character.dna_job_id = uuid.uuid4().hex
+        db.commit()
     
-    # --- FAST OPERATION 9: Commit Transaction (~50ms) ---
-    db.commit()
+        # --- FAST OPERATION 9: Enqueue Background Job (~50ms) ---
+        # This is where the magic happens - offload slow work to worker
+        try:
+            job = dna_queue.enqueue(
+                "app.workers.tasks.extract_dna_task", character.id, job_id=character.dna_job_id
+            )
+        except Exception as e:
+            character.dna_status = models.DnaStatus.failed
+            db.commit()
+            return f"[ERROR] Anchor '{character_name}' saved, but DNA extraction could not be queued: {e}"
     
-    # Total time: ~400-500ms (INSTANT!)
-    print(f"[+] Registered Anchor: {character_name} (ID: {character.id})")
-    print(f"[DNA] Background job enqueued: {job.id}")
-    return f"[OK] Anchor '{character_name}' registered instantly! DNA extraction started in background (Job {job.id}). You can now generate videos with this character."
+        # Total time: ~400-500ms (INSTANT!)
+        print(f"[+] Registered Anchor: {character_name} (ID: {character.id})")
+        print(f"[DNA] Background job enqueued: {job.id}")
+        return f"[OK] Anchor '{character_name}' registered instantly! DNA extraction started in background (Job {job.id}). You can now generate videos with this character."
 
 
 @mcp.tool()
@@ -305,135 +334,121 @@ def generate_video_segment(
             ]
         )
     """
-    db = next(get_db())
+    with db_session() as db:
     
-    # --- STEP 0: Resolve Session & State ---
-    # Find or Create Project (Session)
-    project = db.query(models.Project).filter(
-        models.Project.description == f"Session: {session_id}"
-    ).first()
+        # --- STEP 0: Resolve Session & State ---
+        # Find or Create Project (Session)
+        project = get_session_project(db, session_id)
     
-    if not project:
-        project = models.Project(
-            name=f"Chat {session_id}", 
-            description=f"Session: {session_id}"
-        )
-        db.add(project)
-        db.flush()  # Get ID
+        # Get/Create Continuity State
+        state = continuity_engine.get_or_create_state(db, project.id, session_id)
     
-    # Get/Create Continuity State
-    state = continuity_engine.get_or_create_state(db, project.id, session_id)
+        # --- STEP 1: Handle Multi-Character Logic (LLM-Driven Intelligence) ---
+        active_ids = []
+        new_characters = []
+        existing_characters = []
     
-    # --- STEP 1: Handle Multi-Character Logic (LLM-Driven Intelligence) ---
-    active_ids = []
-    new_characters = []
-    existing_characters = []
-    
-    # Iterate through every character the LLM identified in the current shot
-    for char_data in characters_in_shot or []:
-        char_name = char_data.get("name")
-        char_desc = char_data.get("desc")
+        # Iterate through every character the LLM identified in the current shot
+        for char_data in characters_in_shot or []:
+            char_name = char_data.get("name")
+            char_desc = char_data.get("desc")
         
-        if not char_name:
-            continue
+            if not char_name:
+                continue
         
-        # Check if character already exists
-        existing_char = db.query(models.Character).filter(
-            models.Character.project_id == project.id,
-            models.Character.name == char_name
-        ).first()
+            # Check if character already exists
+            existing_char = db.query(models.Character).filter(
+                models.Character.project_id == project.id,
+                models.Character.name == char_name
+            ).first()
         
-        if existing_char:
-            # Existing character - add to active list
-            active_ids.append(existing_char.id)
-            existing_characters.append(char_name)
-            print(f"[~] Reusing existing Anchor: {char_name}")
-        else:
-            # New character - we'll create after video generation
-            new_characters.append({"name": char_name, "desc": char_desc})
+            if existing_char:
+                # Existing character - add to active list
+                active_ids.append(existing_char.id)
+                existing_characters.append(char_name)
+                print(f"[~] Reusing existing Anchor: {char_name}")
+            else:
+                # New character - we'll create after video generation
+                new_characters.append({"name": char_name, "desc": char_desc})
+    
+        # Update active characters (existing ones for now)
+        if active_ids:
+            state.active_character_ids = json.dumps(active_ids)
+            db.commit()
     
-    # Update active characters (existing ones for now)
-    if active_ids:
-        state.active_character_ids = json.dumps(active_ids)
-        db.commit()
+        # --- STEP 2: Generate Video (with Multi-Anchor + Flow) ---
+        # --- STEP 3: Save Video Output (streamed straight to disk) ---
+        output_filename = f"media/generated/{session_id}_{os.urandom(4).hex()}.mp4"
+        continuity_engine.generate_segment_to_file(db, project.id, prompt, output_filename, session_id)
     
-    # --- STEP 2: Generate Video (with Multi-Anchor + Flow) ---
-    video_bytes = continuity_engine.generate_segment(db, project.id, prompt, session_id)
-
-    # --- STEP 3: Save Video Output ---
-    os.makedirs("media/generated", exist_ok=True)
-    output_filename = f"media/generated/{session_id}_{os.urandom(4).hex()}.mp4"
-    with open(output_filename, "wb") as f:
-        f.write(video_bytes)
-    
-    # --- STEP 4: Multi-Character DNA Anchoring (for new characters) ---
-    # Create anchor for each new character from the generated video
-    for char_data in new_characters:
-        try:
-            character = _handle_character_logic(
-                db, project.id,
-                char_data["name"],
-                char_data["desc"],
-                True,  # is_new = True
-                output_filename
-            )
+        # --- STEP 4: Multi-Character DNA Anchoring (for new characters) ---
+        # Create anchor for each new character from the generated video
+        for char_data in new_characters:
+            try:
+                character = _handle_character_logic(
+                    db, project.id,
+                    char_data["name"],
+                    char_data["desc"],
+                    True,  # is_new = True
+                    output_filename
+                )
             
-            if character:
-                active_ids.append(character.id)
-        except Exception as e:
-            print(f"Warning: Failed to handle character {char_data['name']}: {e}")
-    
-    # Update state with ALL active characters (existing + newly created)
-    if active_ids:
-        state.active_character_ids = json.dumps(active_ids)
-        # For new characters, set their anchor frame as the flow reference
-        if new_characters:
-            first_new_char = db.query(models.Character).get(active_ids[-1])
-            if first_new_char and first_new_char.ref_image_path:
-                state.last_frame_path = first_new_char.ref_image_path
-        db.commit()
+                if character:
+                    active_ids.append(character.id)
+            except Exception as e:
+                print(f"Warning: Failed to handle character {char_data['name']}: {e}")
+    
+        # Update state with ALL active characters (existing + newly created)
+        if active_ids:
+            state.active_character_ids = json.dumps(active_ids)
+            # For new characters, set their anchor frame as the flow reference
+            if new_characters:
+                first_new_char = db.query(models.Character).get(active_ids[-1])
+                if first_new_char and first_new_char.ref_image_path:
+                    state.last_frame_path = first_new_char.ref_image_path
+            db.commit()
     
-    # --- STEP 5: Update Flow Continuity (extract last frame for next shot) ---
-    # Only extract new flow frame if we didn't just create new characters
-    if not new_characters:
-        os.makedirs("media/continuity", exist_ok=True)
-        last_frame_path = f"media/continuity/{session_id}_last_frame.jpg"
+        # --- STEP 5: Update Flow Continuity (extract last frame for next shot) ---
+        # Only extract new flow frame if we didn't just create new characters
+        if not new_characters:
+            os.makedirs("media/continuity", exist_ok=True)
+            last_frame_path = f"media/continuity/{session_id}_last_frame.jpg"
         
-        try:
-            _extract_last_frame(output_filename, last_frame_path)
-            state.last_frame_path = last_frame_path
-            db.commit()
-            print(f"[*] Updated Flow: {last_frame_path}")
-        except Exception as e:
-            print(f"Warning: Failed to extract last frame: {e}")
+            try:
+                _extract_last_frame(output_filename, last_frame_path)
+                state.last_frame_path = last_frame_path
+                db.commit()
+                print(f"[*] Updated Flow: {last_frame_path}")
+            except Exception as e:
+                print(f"Warning: Failed to extract last frame: {e}")
 
-    # --- STEP 6: Log Shot History ---
-    shot_index = db.query(models.Shot).filter(
-        models.Shot.project_id == project.id
-    ).count() + 1
-    
-    shot_record = models.Shot(
-        project_id=project.id,
-        index=shot_index,
-        description=prompt,
-        duration_seconds=6,  # Default duration (Veo doesn't return actual duration)
-        created_at=datetime.utcnow(),
-    )
-    db.add(shot_record)
-    db.commit()
-    
-    print(f"[>] Logged Shot #{shot_index}: {prompt[:50]}...")
+        # --- STEP 6: Log Shot History ---
+        shot_index = db.query(models.Shot).filter(
+            models.Shot.project_id == project.id
+        ).count() + 1
+    
+        shot_record = models.Shot(
+            project_id=project.id,
+            index=shot_index,
+            description=prompt,
+            duration_seconds=6,  # Default duration (Veo doesn't return actual duration)
+            created_at=datetime.utcnow(),
+        )
+        db.add(shot_record)
+        db.commit()
+    
+        print(f"[>] Logged Shot #{shot_index}: {prompt[:50]}...")
 
-    # Build response message with character info
-    char_info = ""
-    if characters_in_shot:
-        char_names = [c.get("name") for c in characters_in_shot if c.get("name")]
-        if char_names:
-            char_info = f" | Characters: {', '.join(char_names)}"
+        # Build response message with character info
+        char_info = ""
+        if characters_in_shot:
+            char_names = [c.get("name") for c in characters_in_shot if c.get("name")]
+            if char_names:
+                char_info = f" | Characters: {', '.join(char_names)}"
     
-    new_anchor_info = f" ({len(new_characters)} NEW ANCHOR{'S' if len(new_characters) != 1 else ''})" if new_characters else ""
+        new_anchor_info = f" ({len(new_characters)} NEW ANCHOR{'S' if len(new_characters) != 1 else ''})" if new_characters else ""
     
-    return f"[OK] Video generated! Shot #{shot_index} saved at {output_filename}{char_info}{new_anchor_info}. Memory updated."
+        return f"[OK] Video generated! Shot #{shot_index} saved at {output_filename}{char_info}{new_anchor_info}. Memory updated."
 
 @mcp.tool()
 def update_narrative_state(session_id: str, fact_key: str, fact_value: str):
@@ -444,21 +459,21 @@ def update_narrative_state(session_id: str, fact_key: str, fact_value: str):
         fact_key: The narrative aspect being tracked (e.g., 'location', 'outfit', 'item_held').
         fact_value: The new description (e.g., 'dark forest', 'blue cloak', 'empty hand').
     """
-    db = next(get_db())
+    with db_session() as db:
     
-    project = db.query(models.Project).filter(models.Project.description == f"Session: {session_id}").first()
-    if not project:
-        return f"Error: Session {session_id} not found."
+        project = get_session_project(db, session_id, create=False)
+        if not project:
+            return f"Error: Session {session_id} not found."
     
-    state = continuity_engine.get_or_create_state(db, project.id, session_id)
+        state = continuity_engine.get_or_create_state(db, project.id, session_id)
     
-    # Load JSON, update key, save JSON
-    context = state.narrative_context or {}
-    context[fact_key] = fact_value
-    state.narrative_context = context
+        # Load JSON, update key, save JSON
+        context = state.narrative_context or {}
+        context[fact_key] = fact_value
+        state.narrative_context = context
     
-    db.commit()
-    return f"Narrative Memory Updated: {fact_key} is now '{fact_value}'."
+        db.commit()
+        return f"Narrative Memory Updated: {fact_key} is now '{fact_value}'."
 
 @mcp.tool()
 def set_active_characters(session_id: str, character_names: List[str]):
@@ -469,30 +484,67 @@ def set_active_characters(session_id: str, character_names: List[str]):
         session_id: The chat ID.
         character_names: List of character names that are currently in the scene.
     """
-    db = next(get_db())
+    with db_session() as db:
     
-    project = db.query(models.Project).filter(models.Project.description == f"Session: {session_id}").first()
-    if not project:
-        return f"Error: Session {session_id} not found."
+        project = get_session_project(db, session_id, create=False)
+        if not project:
+            return f"Error: Session {session_id} not found."
 
-    state = continuity_engine.get_or_create_state(db, project.id, session_id)
+        state = continuity_engine.get_or_create_state(db, project.id, session_id)
     
-    active_ids = []
+        active_ids = []
     
-    for name in character_names:
-        char = db.query(models.Character).filter(
-            models.Character.project_id == project.id, 
-            models.Character.name == name
-        ).first()
+        for name in character_names:
+            char = db.query(models.Character).filter(
+                models.Character.project_id == project.id, 
+                models.Character.name == name
+            ).first()
         
-        if char:
-            active_ids.append(char.id)
+            if char:
+                active_ids.append(char.id)
             
-    # Save the list of IDs as JSON string
-    state.active_character_ids = json.dumps(active_ids)
-    db.commit()
+        # Save the list of IDs as JSON string
+        state.active_character_ids = json.dumps(active_ids)
+        db.commit()
     
-    return f"Active characters set: {', '.join(character_names)}. {len(active_ids)} anchors ready for injection."
+        return f"Active characters set: {', '.join(character_names)}. {len(active_ids)} anchors ready for injection."
+
+@mcp.tool()
+def find_similar_characters(image_base64: str, top_k: int = 5) -> str:
+    """
+    Finds existing character Anchors (across all sessions) that look like an image.
+    Use this before registering a new anchor to reuse an existing identity.
+    Args:
+        image_base64: The image to match, encoded as base64 string.
+        top_k: Maximum number of matches to return.
+    """
+    from app.services.embedding import clip_cache_namespace, embed_image
+    from app.services.vector_index import character_index
+
+    try:
+        image_bytes = base64.b64decode(image_base64)
+    except Exception as e:
+        return f"[ERROR] Failed to decode image: {e}"
+
+    query_path = save_character_image_bytes(0, image_bytes, extension=".jpg")
+    try:
+        matches = character_index.search(embed_image(query_path), k=top_k, model=clip_cache_namespace())
+    except ValueError as e:
+        return f"[ERROR] {e}"
+    finally:
+        os.remove(query_path)
+
+    if not matches:
+        return "No similar characters found."
+
+    with db_session() as db:
+        scores = dict(matches)
+        chars = db.query(models.Character).filter(models.Character.id.in_(list(scores))).all()
+        lines = [
+            f"- {c.name} (ID: {c.id}, project {c.project_id}): similarity {scores[c.id]:.3f}"
+            for c in sorted(chars, key=lambda c: scores[c.id], reverse=True)
+        ]
+        return "Similar characters:\n" + "\n".join(lines)
 
 if __name__ == "__main__":
     mcp.run()
\ No newline at end of file
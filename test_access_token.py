@@ -0,0 +1,165 @@
+"""
+Regression test: CachedAccessToken against a fake OAuth2 token endpoint
+
+Writes a throwaway service-account key whose token_uri points at a local
+HTTP server, so the real google-auth JWT grant runs end to end. Checks that
+a valid token is served from cache, refreshed once before it expires,
+fetched once when many threads ask at the same time, and fetched again
+after invalidate() (what google_flow does on a 401).
+
+    python test_access_token.py      (or: pytest test_access_token.py)
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+backend_dir = Path(__file__).parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from cryptography.hazmat.primitives import serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import rsa  # noqa: E402
+
+from app.services.video.credentials import MIN_VALIDITY, REFRESH_MARGIN, CachedAccessToken  # noqa: E402
+
+TOKEN_LIFETIME = 3600
+ENDPOINT_DELAY = 0.2  # keeps a refresh in flight long enough for threads to pile up
+
+
+class _TokenEndpoint(BaseHTTPRequestHandler):
+    hits = 0
+    lifetime = TOKEN_LIFETIME  # expires_in of the next token handed out
+    hits_lock = threading.Lock()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        with _TokenEndpoint.hits_lock:
+            _TokenEndpoint.hits += 1
+            n = _TokenEndpoint.hits
+        time.sleep(ENDPOINT_DELAY)
+        body = json.dumps({"access_token": f"token-{n}", "expires_in": _TokenEndpoint.lifetime, "token_type": "Bearer"})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_endpoint() -> str:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _TokenEndpoint)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/token"
+
+
+def _write_key(token_uri: str) -> str:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    path = os.path.join(tempfile.mkdtemp(prefix="access_token_"), "key.json")
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "type": "service_account",
+                "project_id": "test",
+                "private_key_id": "test",
+                "private_key": pem,
+                "client_email": "test@test.iam.gserviceaccount.com",
+                "client_id": "1",
+                "token_uri": token_uri,
+            },
+            f,
+        )
+    return path
+
+
+KEY_PATH = _write_key(_start_endpoint())
+
+
+def _cache_holding(lifetime=TOKEN_LIFETIME):
+    """A cache whose first token was issued with `lifetime` seconds to live."""
+    cache = CachedAccessToken(KEY_PATH)
+    _TokenEndpoint.lifetime = lifetime
+    try:
+        token = cache.get()
+    finally:
+        _TokenEndpoint.lifetime = TOKEN_LIFETIME
+    return cache, token
+
+
+def _hits_during(fn):
+    before = _TokenEndpoint.hits
+    result = fn()
+    return result, _TokenEndpoint.hits - before
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_valid_token_is_served_from_cache():
+    cache = CachedAccessToken(KEY_PATH)
+    (first, second), hits = _hits_during(lambda: (cache.get(), cache.get()))
+    assert first == second
+    assert hits == 1
+
+
+def test_refreshes_in_background_before_expiry():
+    # Inside the refresh margin: the current token is returned without waiting
+    cache, old = _cache_holding((REFRESH_MARGIN - timedelta(seconds=10)).total_seconds())
+    t0 = time.perf_counter()
+    assert cache.get() == old
+    assert time.perf_counter() - t0 < ENDPOINT_DELAY
+
+    _wait_for(lambda: cache.refresh_count == 2)
+    new = cache.get()
+    assert new != old
+    assert cache.refresh_count == 2
+
+
+def test_concurrent_callers_share_one_refresh():
+    # No token yet, then one too close to expiry to hand out: both block on a refresh
+    for cache in (CachedAccessToken(KEY_PATH), _cache_holding((MIN_VALIDITY / 2).total_seconds())[0]):
+        before = cache.refresh_count
+
+        barrier = threading.Barrier(16)
+        tokens = []
+
+        def worker():
+            barrier.wait()
+            tokens.append(cache.get())
+
+        threads = [threading.Thread(target=worker) for _ in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert cache.refresh_count - before == 1
+        assert len(tokens) == 16 and len(set(tokens)) == 1 and tokens[0] is not None
+
+
+def test_invalidate_after_401_fetches_a_new_token():
+    cache, old = _cache_holding()
+    cache.invalidate()
+    new, hits = _hits_during(cache.get)
+    assert new != old
+    assert hits == 1
+
+
+if __name__ == "__main__":
+    test_valid_token_is_served_from_cache()
+    test_refreshes_in_background_before_expiry()
+    test_concurrent_callers_share_one_refresh()
+    test_invalidate_after_401_fetches_a_new_token()
+    print("\n[OK] access token cache refreshes once, early, and after invalidate()")
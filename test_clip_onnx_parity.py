@@ -0,0 +1,76 @@
+"""
+Regression test: the int8 ONNX CLIP backend must agree with fp32 PyTorch
+
+The ONNX backend preprocesses with PIL + numpy instead of transformers'
+CLIPImageProcessor; that has to produce the same pixel values. With torch,
+onnxruntime and an exported encoder (python -m app.services.clip_onnx
+export) it also runs the embedding parity check on the repo's sample
+images plus a few synthetic ones. Parts whose dependencies are missing
+are skipped.
+
+    python test_clip_onnx_parity.py      (or: pytest test_clip_onnx_parity.py)
+"""
+import glob
+import importlib.util
+import os
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent / "backend"
+sys.path.insert(0, str(backend_dir))
+os.chdir(str(backend_dir))
+
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from app.services import embedding  # noqa: E402
+
+
+def _skip(reason):
+    if "pytest" in sys.modules:
+        sys.modules["pytest"].skip(reason)
+    raise SystemExit(f"[SKIP] {reason}")
+
+
+def _images():
+    rng = np.random.default_rng(0)
+    # Portrait, landscape, square and off-by-one sizes exercise resize rounding and crop offsets
+    shapes = [(256, 341), (341, 256), (256, 256), (224, 300), (300, 225), (257, 999)]
+    images = [Image.fromarray(rng.integers(0, 256, (h, w, 3), dtype=np.uint8)) for h, w in shapes]
+    paths = sorted(glob.glob("media/characters/*.jpg"))
+    return images + [embedding._load_image(p) for p in paths]
+
+
+def test_preprocessing_matches_clip_image_processor():
+    if importlib.util.find_spec("transformers") is None:
+        _skip("transformers not installed")
+    import transformers
+
+    # The PIL implementation; newer transformers default to torchvision when present
+    processor_cls = getattr(transformers, "CLIPImageProcessorPil", transformers.CLIPImageProcessor)
+    processor = processor_cls()  # defaults are openai/clip-vit-base-patch32's
+
+    images = _images()
+    expected = np.asarray(processor(images=images, return_tensors="np")["pixel_values"])
+    actual = embedding._clip_pixel_values(images)
+    assert actual.shape == expected.shape and actual.dtype == np.float32
+    assert np.abs(actual - expected).max() < 1e-5
+
+
+def test_onnx_embeddings_match_torch():
+    missing = [m for m in ("torch", "transformers", "onnxruntime") if importlib.util.find_spec(m) is None]
+    if missing:
+        _skip(f"{', '.join(missing)} not installed")
+    if not os.path.exists(embedding.CLIP_ONNX_PATH):
+        _skip(f"no exported encoder at {embedding.CLIP_ONNX_PATH}")
+    from app.services import clip_onnx
+
+    paths = sorted(glob.glob("media/characters/*.jpg"))
+    assert clip_onnx.parity(paths + _images()[:3])
+
+
+if __name__ == "__main__":
+    test_preprocessing_matches_clip_image_processor()
+    print("[OK] numpy preprocessing matches CLIPImageProcessor")
+    test_onnx_embeddings_match_torch()
+    print("\n[OK] int8 ONNX embeddings match fp32 torch")
@@ -71,9 +71,9 @@ operations.append(("File Rename", time.time() - start))
 
 # 5. Queue enqueue (simulated)
 start = time.time()
-from app.core.queue import render_queue
+from app.core.queue import dna_queue
 from app.workers.tasks import extract_dna_task
-job = render_queue.enqueue(extract_dna_task, char.id)
+job = dna_queue.enqueue(extract_dna_task, char.id)
 operations.append(("Queue Job Enqueue", time.time() - start))
 
 # 6. DB commit
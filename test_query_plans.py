@@ -0,0 +1,68 @@
+"""
+Regression test: the hot list / lookup queries must be served by their indexes
+
+Runs app.db.query_plans against a scratch SQLite database, both freshly
+created and as a pre-index database upgraded by app.db.migrate_schema
+(including duplicate character names the unique index would reject).
+
+    python test_query_plans.py      (or: pytest test_query_plans.py)
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+backend_dir = Path(__file__).parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+_tmp = tempfile.mkdtemp(prefix="query_plans_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/plans.db"
+os.environ.setdefault("GOOGLE_CLOUD_PROJECT_ID", "test")
+
+from sqlalchemy import text  # noqa: E402
+
+from app.db import migrate_schema, query_plans  # noqa: E402
+from app.db.session import engine  # noqa: E402
+
+NEW_INDEXES = [
+    "ix_shots_project_id_index",
+    "ix_render_jobs_project_id_created_at",
+    "ix_render_jobs_shot_id_created_at",
+    "uq_characters_project_id_name",
+]
+
+
+def test_fresh_database_uses_indexes():
+    migrate_schema.migrate()
+    assert query_plans.check()
+
+
+def test_migrated_legacy_database_uses_indexes():
+    migrate_schema.migrate()
+    # Roll the file back to a pre-index database holding duplicate names
+    with engine.begin() as conn:
+        for name in NEW_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        conn.execute(text("DELETE FROM schema_revision"))
+        conn.execute(text("INSERT INTO projects (name) VALUES ('legacy')"))
+        project_id = conn.execute(text("SELECT MAX(id) FROM projects")).scalar()
+        for name in ["Ann", "Ann", "Bob"]:
+            conn.execute(text("INSERT INTO characters (project_id, name) VALUES (:p, :n)"), {"p": project_id, "n": name})
+    # Pooled connections keep prepared EXPLAINs from the first test; start fresh
+    engine.dispose()
+
+    assert not query_plans.check()
+
+    assert migrate_schema.migrate() == migrate_schema.LATEST_REVISION
+    assert query_plans.check()
+    with engine.begin() as conn:
+        names = conn.execute(
+            text("SELECT name FROM characters WHERE project_id = :p ORDER BY id"), {"p": project_id}
+        ).scalars().all()
+    assert names[0] == "Ann" and names[1].startswith("Ann #") and names[2] == "Bob"
+
+
+if __name__ == "__main__":
+    test_fresh_database_uses_indexes()
+    test_migrated_legacy_database_uses_indexes()
+    print("\n[OK] query plans use the expected indexes")